@@ -1,13 +1,21 @@
+import contextlib
 import os
 from shiny import App, render, ui, reactive
-import subprocess
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
 import presentation_utils as pu
+import render_jobs
+import tracing
 from pathlib import Path
 import shutil
-from presentation_utils import generate_slides, format_presentation_for_qmd
+import time
+from presentation_utils import format_presentation_for_qmd
+from qmd_fragments import FragmentStream
+from export_utils import export_single_file
 
-# Add near the top with other imports
-chalktalk_demo = open("assets/chalktalk_demo_for_llm.qmd").read()
+# Slide generation and rendering run on a worker pool shared by all sessions
+jobs = render_jobs.get_job_queue()
 
 app_ui = ui.page_fluid(
     ui.tags.head(
@@ -40,17 +48,59 @@ app_ui = ui.page_fluid(
             ui.input_numeric(
                 "num_slides", "Number of Slides", value=10, min=1, max=20, width="100%"
             ),
+            ui.input_select(
+                "tts_provider",
+                "Voice",
+                {
+                    "elevenlabs": "ElevenLabs",
+                    "local": "Local (espeak-ng, offline)",
+                },
+            ),
+            ui.input_checkbox(
+                "prewarm_tts",
+                "Start narration while generating",
+                value=True,
+            ),
             ui.input_action_button(
                 "generate_qmd",
                 "Generate Presentation",
                 class_="btn-primary btn-lg w-100",
             ),
             ui.br(),
+            ui.input_checkbox(
+                "incremental", "Only re-voice changed fragments", value=True
+            ),
+            ui.input_checkbox(
+                "draft_audio", "Draft (silent placeholder audio)", value=False
+            ),
+            ui.input_checkbox(
+                "join_audio", "One audio file per slide", value=False
+            ),
+            ui.input_select(
+                "audio_format",
+                "Audio format",
+                {
+                    "": "Original MP3",
+                    "opus": "Opus 24 kbps, loudness-normalized",
+                    "aac": "AAC 24 kbps, loudness-normalized",
+                },
+            ),
             ui.input_action_button(
                 "render_presentation",
                 "Render Presentation",
                 class_="btn-success btn-lg w-100",
             ),
+            ui.input_action_button(
+                "finalize_audio",
+                "Finalize Audio",
+                class_="btn-outline-success w-100",
+            ),
+            ui.br(),
+            ui.input_action_button(
+                "cancel_jobs",
+                "Cancel",
+                class_="btn-outline-danger w-100",
+            ),
         ),
         ui.div(
             {"class": "main-content"},
@@ -66,91 +116,306 @@ app_ui = ui.page_fluid(
             ui.br(),
             ui.output_ui("presentation_link"),
             ui.output_text("processing_status"),
+            ui.br(),
+            ui.h4("Jobs"),
+            ui.output_ui("job_status"),
         ),
     ),
 )
 
 
+def generate_job(job, topic, title, num_slides, prewarm_tts, tts_provider):
+    """
+    Background job: streams slides from the LLM and returns them as QMD.
+
+    Partial QMD is published after every token batch so the editor fills in
+    live. With prewarm_tts, each fragment's narration is synthesized into the
+    audio cache as soon as its closing ::: arrives, overlapping generation and
+    TTS so the later render finds the clips ready.
+    """
+    job.update("Generating slides with the LLM", 5)
+    stream = pu.generate_slides_stream(
+        topic=topic,
+        title=title,
+        num_slides=num_slides,
+        chalktalk_demo=pu.load_chalktalk_demo(),
+    )
+    fragments = FragmentStream()
+    text = ""
+    chunks = 0
+    published = 0.0
+    # The prewarmer's thread pool and scratch directory are only needed when
+    # narration is synthesized during generation
+    prewarmer = pu.VoiceoverPrewarmer(provider=tts_provider) if prewarm_tts else None
+
+    with tracing.trace("generate"), prewarmer or contextlib.nullcontext():
+        for delta in stream:
+            text += delta
+            chunks += 1
+            for fragment in fragments.feed(delta):
+                if prewarmer:
+                    prewarmer.submit(fragment.tts)
+            # Publishing copies the whole text, so do it a few times a second
+            # rather than on every delta
+            if time.monotonic() - published < 0.2:
+                job.check_cancelled()
+                continue
+            published = time.monotonic()
+            job.set_partial(format_presentation_for_qmd(text))
+            narrated = (
+                f", {prewarmer.done}/{prewarmer.total} fragments narrated"
+                if prewarmer
+                else ""
+            )
+            job.update(
+                f"Generating slides ({chunks} chunks{narrated})",
+                5 + min(75, chunks // 20),
+            )
+        for fragment in fragments.close():
+            if prewarmer:
+                prewarmer.submit(fragment.tts)
+
+        # Format as QMD
+        qmd_content = format_presentation_for_qmd(text)
+        job.set_partial(qmd_content)
+        if prewarmer:
+            prewarmer.wait(
+                lambda done, total: job.update(
+                    f"Narrating fragments ({done}/{total})", 80 + 20 * done / total
+                )
+            )
+
+    return qmd_content
+
+
+def render_job(
+    job,
+    qmd_path,
+    base_dir,
+    media_dir,
+    incremental,
+    join_audio,
+    audio_format,
+    tts_provider,
+):
+    """Background job: renders the QMD with Quarto and voices the presentation."""
+    # Narration is synthesized from the QMD source while Quarto renders;
+    # only changed fragments are re-synthesized
+    output_html = os.path.join(base_dir, "presentation_final.html")
+    with tracing.trace("render", tracing.report_path(base_dir)):
+        return pu.render_and_voice_qmd(
+            qmd_path,
+            base_dir,
+            media_dir,
+            output_html,
+            incremental=incremental,
+            join_audio=join_audio,
+            audio_format=audio_format or None,
+            provider=tts_provider,
+            progress=job.update,
+            cancel_event=job.cancel_event,
+        )
+
+
+def export_job(job, html_path):
+    """Background job: packs the rendered deck into one HTML file for download."""
+    job.update("Packing the deck into a single file", 10)
+    return export_single_file(html_path)["output"]
+
+
 def server(input, output, session):
     # Reactive values to store current presentation info
     current_presentation = reactive.Value(
         {"base_dir": None, "media_dir": None, "html_path": None}
     )
+    # IDs of the jobs started from this session, and of those already applied
+    session_jobs = reactive.Value([])
+    applied_jobs = set()
+    streamed_text = {}
+
+    def submit(kind, title, fn, *args):
+        job = jobs.submit(kind, title, fn, *args)
+        session_jobs.set(session_jobs.get() + [job.id])
+        return job
+
+    @reactive.calc
+    def job_snapshots():
+        snapshots = []
+        for job_id in session_jobs.get():
+            job = jobs.get(job_id)
+            if job:
+                snapshots.append(job.snapshot())
+        # Keep polling while anything is still queued or running
+        if any(s["state"] not in render_jobs.FINISHED_STATES for s in snapshots):
+            reactive.invalidate_later(0.5)
+        return snapshots
+
+    def active_job(kind):
+        for snapshot in job_snapshots():
+            if (
+                snapshot["kind"] == kind
+                and snapshot["state"] not in render_jobs.FINISHED_STATES
+            ):
+                return snapshot
+        return None
+
+    @reactive.effect
+    def _():
+        # Apply results of jobs that finished since the last poll
+        for snapshot in job_snapshots():
+            if snapshot["id"] in applied_jobs:
+                continue
+            # Push streamed slide text into the editor as it arrives
+            partial = snapshot["partial"]
+            if (
+                snapshot["kind"] == "generate"
+                and partial
+                and streamed_text.get(snapshot["id"]) != partial
+            ):
+                streamed_text[snapshot["id"]] = partial
+                ui.update_text("qmd_editor", value=partial)
+            if snapshot["state"] not in render_jobs.FINISHED_STATES:
+                continue
+            applied_jobs.add(snapshot["id"])
+            streamed_text.pop(snapshot["id"], None)
+            if snapshot["state"] == render_jobs.FAILED:
+                ui.notification_show(snapshot["message"], type="error", duration=10)
+                continue
+            if snapshot["state"] != render_jobs.DONE:
+                continue
+
+            result = jobs.get(snapshot["id"]).result
+            if snapshot["kind"] == "generate":
+                # Update the editor with the generated content
+                ui.update_text("qmd_editor", value=result)
+            elif snapshot["kind"] == "render":
+                # Update current presentation info
+                with reactive.isolate():
+                    current_info = dict(current_presentation.get())
+                current_info["html_path"] = result
+                current_info["standalone_path"] = None
+                current_presentation.set(current_info)
+                # Pack the single-file download in the background, so the
+                # download itself only serves a finished file
+                submit("export", "Single file", export_job, result)
+            elif snapshot["kind"] == "export":
+                with reactive.isolate():
+                    current_info = dict(current_presentation.get())
+                current_info["standalone_path"] = result
+                current_presentation.set(current_info)
 
     @reactive.effect
     @reactive.event(input.render_presentation)
     def _():
-        with ui.Progress(min=0, max=100) as p:
-            p.set(message="Starting presentation generation", value=0)
-
-            # Create presentation directory if not exists
-            title = input.title() or "presentation"
-            if not current_presentation.get()["base_dir"]:
-                base_dir, media_dir = pu.create_presentation_directory(title)
-                current_presentation.set(
-                    {"base_dir": base_dir, "media_dir": media_dir, "html_path": None}
-                )
+        start_render(draft=input.draft_audio())
 
-            # Get current directory info
-            current_info = current_presentation.get()
-            base_dir = current_info["base_dir"]
-            media_dir = current_info["media_dir"]
-
-            # Save QMD content
-            p.set(message="Saving QMD file", value=10)
-            qmd_path = os.path.join(base_dir, "presentation.qmd")
-            with open(qmd_path, "w") as f:
-                f.write(input.qmd_editor())
-
-            # Render QMD to HTML
-            p.set(message="Rendering QMD to HTML", value=20)
-            subprocess.run(["quarto", "render", qmd_path], check=True)
-
-            # Process HTML with media
-            p.set(message="Processing media elements", value=30)
-            html_path = qmd_path.replace(".qmd", ".html")
-            with open(html_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-
-            # Extract and process fragments
-            p.set(message="Generating audio", value=40)
-            fragments, modified_html = pu.extract_media_fragments(html_content)
-            processed_fragments = pu.process_media_fragments(
-                fragments, media_dir, base_dir
-            )
+    @reactive.effect
+    @reactive.event(input.finalize_audio)
+    def _():
+        # Same deck and fragment IDs; only the placeholder clips are replaced
+        start_render(draft=False)
+
+    def start_render(draft):
+        with reactive.isolate():
+            if active_job("render"):
+                ui.notification_show("A render is already running.", type="warning")
+                return
 
-            # Update HTML with media elements
-            p.set(message="Finalizing presentation", value=80)
-            modified_html = pu.insert_media_elements(modified_html, processed_fragments)
-            final_html = pu.modify_html_for_autoslide_and_controls(modified_html)
+        # Create presentation directory if not exists
+        title = input.title() or "presentation"
+        if not current_presentation.get()["base_dir"]:
+            base_dir, media_dir = pu.create_presentation_directory(title)
+            current_presentation.set(
+                {"base_dir": base_dir, "media_dir": media_dir, "html_path": None}
+            )
 
-            # Save final HTML
-            output_html = os.path.join(base_dir, "presentation_final.html")
-            with open(output_html, "w", encoding="utf-8") as f:
-                f.write(final_html)
+        # Get current directory info
+        current_info = current_presentation.get()
+        base_dir = current_info["base_dir"]
+        media_dir = current_info["media_dir"]
 
-            # Update current presentation info
-            current_info["html_path"] = output_html
-            current_presentation.set(current_info)
+        # Save QMD content
+        qmd_path = os.path.join(base_dir, "presentation.qmd")
+        with open(qmd_path, "w") as f:
+            f.write(input.qmd_editor())
 
-            p.set(message="Complete!", value=100)
+        submit(
+            "render",
+            f"{'Draft' if draft else 'Render'}: {title}",
+            render_job,
+            qmd_path,
+            base_dir,
+            media_dir,
+            input.incremental(),
+            input.join_audio(),
+            input.audio_format(),
+            "draft" if draft else input.tts_provider(),
+        )
 
     @reactive.effect
     @reactive.event(input.generate_qmd)
     def _():
-        # Generate presentation content
-        presentation = generate_slides(
-            topic=input.prompt(),
-            title=input.title(),
-            num_slides=input.num_slides(),
-            chalktalk_demo=chalktalk_demo,
+        submit(
+            "generate",
+            f"Generate: {input.title() or input.prompt()[:40]}",
+            generate_job,
+            input.prompt(),
+            input.title(),
+            input.num_slides(),
+            input.prewarm_tts(),
+            input.tts_provider(),
         )
 
-        # Format as QMD
-        qmd_content = format_presentation_for_qmd(presentation)
+    @reactive.effect
+    @reactive.event(input.cancel_jobs)
+    def _():
+        with reactive.isolate():
+            for snapshot in job_snapshots():
+                jobs.cancel(snapshot["id"])
 
-        # Update the editor with the generated content
-        ui.update_text("qmd_editor", value=qmd_content)
+    @output
+    @render.ui
+    def job_status():
+        snapshots = job_snapshots()
+        rows = [
+            ui.tags.tr(
+                ui.tags.td(s["title"]),
+                ui.tags.td(s["state"]),
+                ui.tags.td(
+                    ui.div(
+                        ui.div(
+                            class_="progress-bar",
+                            style=f"width: {s['progress']}%;",
+                        ),
+                        class_="progress",
+                    ),
+                    style="min-width: 120px;",
+                ),
+                ui.tags.td(s["message"]),
+                ui.tags.td(f"{s['elapsed']:.0f}s"),
+            )
+            for s in reversed(snapshots)
+        ]
+        return ui.div(
+            ui.tags.table(
+                ui.tags.thead(
+                    ui.tags.tr(
+                        *[
+                            ui.tags.th(h)
+                            for h in ("Job", "State", "Progress", "Status", "Time")
+                        ]
+                    )
+                ),
+                ui.tags.tbody(*rows),
+                class_="table table-sm",
+            )
+            if rows
+            else None,
+            ui.tags.p(
+                f"Jobs running on this server: {jobs.active_count()}",
+                class_="text-muted",
+            ),
+        )
 
     @output
     @render.text
@@ -173,6 +438,18 @@ def server(input, output, session):
                     target="_blank",
                     class_="btn btn-success",
                 ),
+                ui.download_button(
+                    "download_standalone",
+                    "Download Single File",
+                    class_="btn btn-outline-success",
+                    style="margin-left: 10px;",
+                )
+                if current_info.get("standalone_path")
+                else ui.tags.span(
+                    "Preparing single file...",
+                    class_="text-muted",
+                    style="margin-left: 10px;",
+                ),
                 ui.tags.p(
                     f"Presentation saved in: {current_info['base_dir']}",
                     style="margin-top: 10px;",
@@ -180,10 +457,18 @@ def server(input, output, session):
             )
         return None
 
+    @render.download(filename="presentation_standalone.html")
+    def download_standalone():
+        # Packed by export_job after the render (deck, reveal.js files and audio)
+        return current_presentation.get()["standalone_path"]
+
     @output
     @render.text
     def processing_status():
         current_info = current_presentation.get()
+        running = active_job("render")
+        if running:
+            return f"{running['message']} ({running['progress']}%)"
         if current_info["html_path"]:
             return "Processing complete!"
         elif current_info["base_dir"]:
@@ -191,4 +476,16 @@ def server(input, output, session):
         return ""
 
 
-app = App(app_ui, server)
+async def metrics(request):
+    # Prometheus scrape endpoint for the pipeline's span counters and latencies
+    return PlainTextResponse(
+        tracing.render_metrics(), media_type="text/plain; version=0.0.4"
+    )
+
+
+app = Starlette(
+    routes=[
+        Route("/metrics", metrics),
+        Mount("/", app=App(app_ui, server)),
+    ]
+)
@@ -0,0 +1,183 @@
+"""
+Content-addressed store for the static files Quarto copies into every deck.
+
+Each rendered presentation gets its own `<name>_files/` directory with
+reveal.js, themes and plugins (~2.7 MB), almost all of it identical across
+decks. The store keeps one copy of every distinct file under
+presentations/.assets and replaces the per-deck copies with hardlinks, so decks
+stay self-contained directories (they can still be served, zipped or moved
+within the filesystem) while the bytes are stored once.
+
+Linked files must never be edited in place, since every deck shares them:
+release_rendered_assets() removes a deck's `_files/` directory before Quarto
+re-renders into it.
+"""
+
+import hashlib
+import os
+import shutil
+import uuid
+
+DEFAULT_STORE_DIR = os.getenv(
+    "CHALKTALK_ASSET_STORE_DIR", os.path.join("presentations", ".assets")
+)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AssetStore:
+    """
+    Hardlink-based deduplicating store keyed by the SHA-256 of file contents.
+
+    Parameters:
+    - store_dir (str): Directory holding one copy of every distinct asset.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        # Digests a dry run would have stored, so later duplicates count as saved
+        self._dry_run_digests = set()
+
+    def _object_path(self, digest):
+        return os.path.join(self.store_dir, "objects", digest[:2], digest)
+
+    def link(self, path, dry_run=False):
+        """
+        Replaces the file at path with a hardlink to its stored copy.
+
+        The first file seen with given contents becomes the stored copy.
+
+        Returns:
+        - int: Bytes saved (0 if the file was new to the store or already linked).
+        """
+        digest = _file_hash(path)
+        object_path = self._object_path(digest)
+
+        if not os.path.exists(object_path):
+            if not dry_run:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.link(path, object_path)
+                return 0
+            if digest not in self._dry_run_digests:
+                self._dry_run_digests.add(digest)
+                return 0
+            return os.path.getsize(path)
+
+        if os.path.samefile(path, object_path):
+            return 0
+        size = os.path.getsize(path)
+        if not dry_run:
+            # Link next to the target, then swap it in atomically
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            os.link(object_path, tmp_path)
+            os.replace(tmp_path, path)
+        return size
+
+    def dedupe_tree(self, directory, dry_run=False):
+        """
+        Links every regular file under directory into the store.
+
+        Returns:
+        - dict: files, linked (files replaced by a link) and bytes_saved.
+        """
+        report = {"files": 0, "linked": 0, "bytes_saved": 0}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.islink(path) or not os.path.isfile(path):
+                    continue
+                report["files"] += 1
+                try:
+                    saved = self.link(path, dry_run=dry_run)
+                except OSError as e:
+                    # e.g. the store is on another filesystem
+                    print(f"Could not link {path}: {e}")
+                    continue
+                if saved:
+                    report["linked"] += 1
+                    report["bytes_saved"] += saved
+        return report
+
+    def prune(self):
+        """
+        Deletes stored assets no deck links to anymore.
+
+        Returns:
+        - int: Bytes freed.
+        """
+        freed = 0
+        objects_dir = os.path.join(self.store_dir, "objects")
+        for root, _, files in os.walk(objects_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                if stat.st_nlink <= 1:
+                    os.remove(path)
+                    freed += stat.st_size
+        return freed
+
+    def stats(self):
+        objects, total_bytes = 0, 0
+        for root, _, files in os.walk(os.path.join(self.store_dir, "objects")):
+            for name in files:
+                objects += 1
+                total_bytes += os.path.getsize(os.path.join(root, name))
+        return {"objects": objects, "bytes": total_bytes}
+
+
+def rendered_assets_dir(qmd_file):
+    """Returns the `<name>_files/` directory Quarto writes next to a rendered QMD."""
+    return os.path.splitext(qmd_file)[0] + "_files"
+
+
+def release_rendered_assets(qmd_file):
+    """
+    Removes a deck's asset directory before Quarto renders into it again.
+
+    Unlinking only drops this deck's links, so the store and other decks are
+    unaffected, and Quarto can never overwrite a shared file in place.
+    """
+    shutil.rmtree(rendered_assets_dir(qmd_file), ignore_errors=True)
+
+
+def dedupe_rendered_assets(qmd_file, store=None):
+    """Links the assets of a freshly rendered deck into the shared store."""
+    store = store if store is not None else AssetStore()
+    assets_dir = rendered_assets_dir(qmd_file)
+    if not os.path.isdir(assets_dir):
+        return {"files": 0, "linked": 0, "bytes_saved": 0}
+    return store.dedupe_tree(assets_dir)
+
+
+def dedupe_presentations(presentations_dir="presentations", store=None, dry_run=False):
+    """
+    Deduplicates the `_files/` asset directories of every deck.
+
+    Returns:
+    - dict: Totals over all decks (decks, files, linked, bytes_saved).
+    """
+    store = store if store is not None else AssetStore()
+    totals = {"decks": 0, "files": 0, "linked": 0, "bytes_saved": 0}
+    for entry in sorted(os.listdir(presentations_dir)):
+        deck_dir = os.path.join(presentations_dir, entry)
+        if entry.startswith(".") or not os.path.isdir(deck_dir):
+            continue
+        asset_dirs = [
+            os.path.join(deck_dir, name)
+            for name in os.listdir(deck_dir)
+            if name.endswith("_files") and os.path.isdir(os.path.join(deck_dir, name))
+        ]
+        if not asset_dirs:
+            continue
+        totals["decks"] += 1
+        for assets_dir in asset_dirs:
+            report = store.dedupe_tree(assets_dir, dry_run=dry_run)
+            for key, value in report.items():
+                totals[key] += value
+    return totals
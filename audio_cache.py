@@ -0,0 +1,215 @@
+"""
+Content-addressed on-disk cache for text-to-speech clips.
+
+Clips are stored once under a key derived from everything that affects the
+synthesized audio (text, voice, model, voice settings), so re-rendering a deck
+only pays for fragments whose narration actually changed. The cache is shared
+across all presentations and is bounded in size with least-recently-used
+eviction (file mtimes are bumped on every hit).
+
+Sizes and recency are tracked in memory, from one scan of the cache directory
+on first use, so storing a clip never walks the cache tree. Once over budget,
+eviction frees space down to a low-water mark, so evictions come in batches
+rather than on every store.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "CHALKTALK_TTS_CACHE_DIR", os.path.join("cache", "tts")
+)
+DEFAULT_MAX_BYTES = int(
+    os.getenv("CHALKTALK_TTS_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024))
+)
+# Eviction stops once the cache is back under this fraction of max_bytes
+LOW_WATER = 0.9
+
+
+class AudioCache:
+    """
+    Size-bounded LRU cache of audio clips keyed by a hash of the TTS request.
+
+    Each entry is a clip file plus a small JSON metadata file. Lookups link (or
+    copy) the cached clip to the requested destination path.
+
+    Parameters:
+    - cache_dir (str): Directory holding the cached clips.
+    - max_bytes (int): Upper bound on the total size of cached clips.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Clip path -> size, least recently used first; built on first use
+        self._index = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def key(**params):
+        """Returns a stable hash of the request parameters that shape the audio."""
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _clip_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.audio")
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key, dest_path):
+        """
+        Materializes a cached clip at dest_path.
+
+        Returns:
+        - dict or None: The entry's metadata on a hit, None on a miss.
+        """
+        clip_path = self._clip_path(key)
+        try:
+            _link_or_copy(clip_path, dest_path)
+            # Bump mtime so eviction treats the entry as recently used
+            os.utime(clip_path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if self._index is not None and clip_path in self._index:
+                self._index.move_to_end(clip_path)
+        return self.get_metadata(key)
+
+    def get_metadata(self, key):
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def put(self, key, src_path, metadata=None):
+        """Stores a copy of src_path under key, then evicts if over budget."""
+        clip_path = self._clip_path(key)
+        os.makedirs(os.path.dirname(clip_path), exist_ok=True)
+
+        # Write to a temporary name and rename so readers never see partial files
+        tmp_path = f"{clip_path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, clip_path)
+
+        if metadata is not None:
+            tmp_meta = f"{self._meta_path(key)}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, ensure_ascii=False)
+            os.replace(tmp_meta, self._meta_path(key))
+
+        with self._lock:
+            self.stores += 1
+            self._load_index()
+            self._total_bytes += size - self._index.pop(clip_path, 0)
+            self._index[clip_path] = size
+        self.evict()
+
+    def _scan(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".audio"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def iter_metadata(self):
+        """Yields the metadata of cached clips, most recently used first."""
+        for _, _, path in sorted(self._scan(), reverse=True):
+            metadata = self.get_metadata(os.path.basename(path)[: -len(".audio")])
+            if metadata:
+                yield metadata
+
+    def _load_index(self):
+        # Caller holds the lock; the only full scan of the cache directory
+        if self._index is None:
+            self._index = collections.OrderedDict(
+                (path, size) for _, size, path in sorted(self._scan())
+            )
+            self._total_bytes = sum(self._index.values())
+
+    def size(self):
+        """Returns the total size in bytes of all cached clips."""
+        with self._lock:
+            self._load_index()
+            return self._total_bytes
+
+    def evict(self):
+        """
+        Removes least recently used clips once the cache exceeds max_bytes,
+        down to LOW_WATER * max_bytes.
+        """
+        with self._lock:
+            self._load_index()
+            if self._total_bytes <= self.max_bytes:
+                return
+            target = self.max_bytes * LOW_WATER
+            while self._index and self._total_bytes > target:
+                path, size = self._index.popitem(last=False)
+                for victim in (path, path[: -len(".audio")] + ".json"):
+                    try:
+                        os.remove(victim)
+                    except FileNotFoundError:
+                        pass
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+def _link_or_copy(src, dest):
+    """Hardlinks src to dest, falling back to a copy across filesystems."""
+    if os.path.exists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        if not os.path.isfile(src):
+            raise FileNotFoundError(src)
+        shutil.copyfile(src, dest)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Returns the process-wide cache shared by all presentations."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AudioCache()
+        return _default_cache
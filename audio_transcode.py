@@ -0,0 +1,202 @@
+"""
+Optional post-synthesis stage: loudness normalization and transcoding of clips.
+
+Providers return MP3 at their default bitrate (128 kbps for ElevenLabs), which
+is far more than speech needs. ClipTranscoder runs ffmpeg on each clip as soon
+as it is synthesized, in a process pool so encoding never holds up the TTS
+fan-out, and writes a normalized copy in the target format next to the
+original. Every clip is brought to the same integrated loudness, so volume
+does not jump between fragments.
+
+The transcoded copy gets its own metadata sidecar (duration carried over from
+the original), so durations are still known without decoding.
+
+Configuration defaults come from the environment:
+- CHALKTALK_AUDIO_FORMAT: "opus", "aac" or "mp3" (stage disabled when unset)
+- CHALKTALK_AUDIO_BITRATE: e.g. "24k"
+- CHALKTALK_AUDIO_LOUDNESS: target integrated loudness in LUFS, e.g. "-16"
+"""
+
+import concurrent.futures
+import os
+import shutil
+import subprocess
+import threading
+
+from audio_utils import read_clip_metadata, write_clip_metadata
+
+# format -> (file extension, ffmpeg encoder, extra encoder args)
+AUDIO_FORMATS = {
+    "opus": (".opus", "libopus", ["-application", "voip"]),
+    "aac": (".m4a", "aac", []),
+    "mp3": (".mp3", "libmp3lame", []),
+}
+
+DEFAULT_FORMAT = os.getenv("CHALKTALK_AUDIO_FORMAT") or None
+DEFAULT_BITRATE = os.getenv("CHALKTALK_AUDIO_BITRATE", "24k")
+DEFAULT_LOUDNESS = float(os.getenv("CHALKTALK_AUDIO_LOUDNESS", "-16"))
+
+
+def transcoded_path(path, audio_format, bitrate, loudness):
+    """Returns where the transcoded copy of a clip is written for a given profile."""
+    extension = AUDIO_FORMATS[audio_format][0]
+    suffix = f"_{audio_format}{bitrate}_{abs(loudness):g}lufs"
+    stem = os.path.splitext(path)[0]
+    if stem.endswith(suffix):
+        # Already a copy for this profile (e.g. reused from the render manifest)
+        return path
+    return f"{stem}{suffix}{extension}"
+
+
+def transcode_clip(src_path, dest_path, audio_format, bitrate, loudness):
+    """
+    Normalizes loudness and re-encodes one clip with ffmpeg.
+
+    Runs in a worker process. Skips clips whose output is already up to date.
+
+    Returns:
+    - str: dest_path.
+
+    Raises:
+    - subprocess.CalledProcessError: If ffmpeg fails.
+    """
+    if os.path.exists(dest_path) and os.path.getmtime(
+        dest_path
+    ) >= os.path.getmtime(src_path):
+        return dest_path
+
+    _, encoder, encoder_args = AUDIO_FORMATS[audio_format]
+    tmp_path = f"{dest_path}.tmp{os.path.splitext(dest_path)[1]}"
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-i", src_path,
+        "-af", f"loudnorm=I={loudness}:TP=-1.5:LRA=11",
+        "-ac", "1",
+        "-c:a", encoder, "-b:a", bitrate, *encoder_args,
+        "-map_metadata", "-1",
+        tmp_path,
+    ]
+    subprocess.run(command, check=True, capture_output=True)
+    os.replace(tmp_path, dest_path)
+
+    metadata = dict(read_clip_metadata(src_path))
+    metadata.update(
+        {
+            "format": audio_format,
+            "bitrate": bitrate,
+            "loudness": loudness,
+            "source_bytes": os.path.getsize(src_path),
+        }
+    )
+    write_clip_metadata(dest_path, metadata)
+    return dest_path
+
+
+class ClipTranscoder:
+    """
+    Transcodes clips in a process pool while synthesis is still running.
+
+    Parameters:
+    - audio_format (str): Key of AUDIO_FORMATS.
+    - bitrate (str): Target bitrate passed to ffmpeg, e.g. "24k".
+    - loudness (float): Target integrated loudness in LUFS.
+    - max_workers (int): Worker processes; defaults to the CPU count.
+    """
+
+    def __init__(
+        self,
+        audio_format=DEFAULT_FORMAT,
+        bitrate=DEFAULT_BITRATE,
+        loudness=DEFAULT_LOUDNESS,
+        max_workers=None,
+    ):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(
+                f"Unknown audio format {audio_format!r}; "
+                f"choose from {', '.join(AUDIO_FORMATS)}"
+            )
+        self.audio_format = audio_format
+        self.bitrate = bitrate
+        self.loudness = loudness
+        self.available = shutil.which("ffmpeg") is not None
+        if not self.available:
+            print("ffmpeg not found; clips are kept in their original format")
+        self.executor = (
+            concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+            if self.available
+            else None
+        )
+        self.futures = {}
+        self.last_report = None
+        self._lock = threading.Lock()
+
+    def submit(self, path):
+        """Queues a clip; safe to call from any thread, e.g. as an on_clip callback."""
+        if not self.available:
+            return
+        dest_path = transcoded_path(
+            path, self.audio_format, self.bitrate, self.loudness
+        )
+        with self._lock:
+            if dest_path == path or path in self.futures:
+                return
+            self.futures[path] = self.executor.submit(
+                transcode_clip,
+                path,
+                dest_path,
+                self.audio_format,
+                self.bitrate,
+                self.loudness,
+            )
+
+    def results(self, paths):
+        """
+        Waits for the given clips (submitting any not seen yet).
+
+        Returns:
+        - dict: Original path -> path to use in the deck. Clips that failed to
+          transcode map to themselves.
+        """
+        for path in paths:
+            self.submit(path)
+        mapping = {}
+        for path in paths:
+            future = self.futures.get(path)
+            if future is None:
+                mapping[path] = path
+                continue
+            try:
+                mapping[path] = future.result()
+            except (subprocess.CalledProcessError, OSError) as e:
+                stderr = (getattr(e, "stderr", b"") or b"").decode(errors="replace")
+                print(f"Transcoding {path} failed: {e} {stderr}")
+                mapping[path] = path
+
+        # Copies reused from an earlier render remember their original size
+        unique = {dest: src for src, dest in mapping.items()}
+        before = sum(
+            read_clip_metadata(dest).get("source_bytes") or os.path.getsize(src)
+            for dest, src in unique.items()
+        )
+        after = sum(os.path.getsize(dest) for dest in unique)
+        print(
+            f"Audio {self.audio_format} {self.bitrate} at {self.loudness:g} LUFS: "
+            f"{before / 1e6:.2f} MB -> {after / 1e6:.2f} MB "
+            f"({1 - after / max(1, before):.0%} smaller) for {len(mapping)} clips"
+        )
+        self.last_report = {
+            "clips": len(mapping),
+            "bytes_before": before,
+            "bytes_after": after,
+        }
+        return mapping
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
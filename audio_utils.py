@@ -0,0 +1,328 @@
+"""
+Audio helpers that avoid decoding clips.
+
+Durations come, in order of preference, from:
+1. the clip's metadata sidecar (written when the clip was synthesized, from a
+   frame scan of the provider's audio; the character alignment is only a
+   fallback, as it ends before any trailing silence),
+2. a scan of the MP3 frame headers or the WAV header (no decoding),
+3. librosa, if it happens to be installed (for formats the scan cannot handle).
+"""
+
+import json
+import os
+import wave
+
+import tracing
+
+# Bitrates in kbps indexed by [version is MPEG1][layer][bitrate index]
+_BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+# Sample rates indexed by version bits (0 = MPEG2.5, 2 = MPEG2, 3 = MPEG1)
+_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+
+_MIME_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".opus": "audio/ogg; codecs=opus",
+    ".ogg": "audio/ogg",
+    ".m4a": "audio/mp4",
+    ".wav": "audio/wav",
+}
+
+
+def audio_mime_type(path):
+    """Returns the MIME type to put on a <source> element for a clip."""
+    return _MIME_TYPES.get(os.path.splitext(path)[1].lower(), "audio/mpeg")
+
+
+def metadata_path(audio_path):
+    """Returns the path of the JSON sidecar stored alongside a clip."""
+    return os.path.splitext(audio_path)[0] + ".json"
+
+
+def read_clip_metadata(audio_path):
+    try:
+        with open(metadata_path(audio_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_clip_metadata(audio_path, metadata):
+    with open(metadata_path(audio_path), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False)
+
+
+def alignment_duration(alignment):
+    """
+    Returns the duration in seconds covered by an ElevenLabs alignment payload.
+
+    Parameters:
+    - alignment (dict): The 'alignment' (or 'normalized_alignment') object of a
+      /with-timestamps response.
+
+    Returns:
+    - float or None: End time of the last character, or None if unavailable.
+    """
+    if not alignment:
+        return None
+    end_times = alignment.get("character_end_times_seconds") or []
+    if not end_times:
+        return None
+    return float(end_times[-1])
+
+
+def _parse_frame_header(data, pos):
+    """
+    Parses the MPEG audio frame header at data[pos].
+
+    Returns:
+    - tuple or None: (frame_length, samples_per_frame, sample_rate, is_mono, is_mpeg1)
+    """
+    if pos + 4 > len(data):
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_idx = (b2 >> 4) & 0x0F
+    sample_rate_idx = (b2 >> 2) & 0x03
+    padding = (b2 >> 1) & 0x01
+    if version_bits == 1 or layer_bits == 0 or bitrate_idx in (0, 15):
+        return None
+    if sample_rate_idx == 3:
+        return None
+
+    is_mpeg1 = version_bits == 3
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[is_mpeg1][layer][bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_idx]
+
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or is_mpeg1) else 576
+        frame_length = samples // 8 * bitrate // sample_rate + padding
+
+    is_mono = ((b3 >> 6) & 0x03) == 3
+    return frame_length, samples, sample_rate, is_mono, is_mpeg1
+
+
+def _id3v2_size(data):
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = 0
+        for b in data[6:10]:
+            size = (size << 7) | (b & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _scan_mp3(data):
+    """
+    Walks the MPEG frames of an MP3 file held in memory.
+
+    Returns:
+    - tuple: (start, end, seconds, header, info_frame_end). start/end bound the
+      audio frames (tags excluded), seconds is the duration (None without
+      frames), header is the first frame's parsed header and info_frame_end is
+      the end offset of a leading Xing/Info/VBRI frame (None if absent).
+    """
+    pos = _id3v2_size(data)
+    end = len(data)
+    # Ignore a trailing ID3v1 tag
+    if end >= 128 and data[end - 128 : end - 125] == b"TAG":
+        end -= 128
+
+    start = None
+    first_header = None
+    info_frame_end = None
+    total_seconds = 0.0
+    frames = 0
+    last_end = pos
+
+    while pos < end - 4:
+        header = _parse_frame_header(data, pos)
+        if header is None:
+            # Resynchronize on the next candidate sync byte
+            pos = data.find(b"\xff", pos + 1, end)
+            if pos < 0:
+                break
+            continue
+
+        frame_length, samples, sample_rate, is_mono, is_mpeg1 = header
+
+        if frames == 0 and start is None:
+            start = pos
+            first_header = header
+            # A leading Xing/Info/VBRI frame carries the total frame count
+            if is_mpeg1:
+                side_info = 17 if is_mono else 32
+            else:
+                side_info = 9 if is_mono else 17
+            xing = pos + 4 + side_info
+            tag = data[xing : xing + 4]
+            count = None
+            if tag in (b"Xing", b"Info"):
+                flags = int.from_bytes(data[xing + 4 : xing + 8], "big")
+                if flags & 0x01:
+                    count = int.from_bytes(data[xing + 8 : xing + 12], "big")
+                info_frame_end = pos + frame_length
+            elif data[pos + 36 : pos + 40] == b"VBRI":
+                count = int.from_bytes(data[pos + 50 : pos + 54], "big")
+                info_frame_end = pos + frame_length
+            if info_frame_end is not None:
+                # The info frame holds no audio
+                pos = info_frame_end
+                if count is not None:
+                    seconds = count * samples / sample_rate
+                    return start, end, seconds, header, info_frame_end
+                continue
+
+        total_seconds += samples / sample_rate
+        frames += 1
+        pos += max(frame_length, 1)
+        last_end = min(pos, end)
+
+    seconds = total_seconds if frames else None
+    return start, last_end, seconds, first_header, info_frame_end
+
+
+def mp3_duration(path):
+    """
+    Computes the duration of an MP3 file from its frame headers without decoding.
+
+    Uses the Xing/Info or VBRI frame count when present, otherwise walks every
+    frame header and sums the samples.
+
+    Returns:
+    - float or None: Duration in seconds, or None if no MPEG frames were found.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    return mp3_bytes_duration(data)
+
+
+def mp3_bytes_duration(data):
+    """
+    Computes the duration of MP3 data held in memory, as mp3_duration does.
+
+    Returns:
+    - float or None: Duration in seconds, or None if no MPEG frames were found.
+    """
+    return _scan_mp3(data)[2]
+
+
+def concat_mp3(paths, dest_path):
+    """
+    Joins MP3 clips into one file without re-encoding.
+
+    ID3 tags and Xing/Info frames are dropped so players see one continuous
+    frame stream. All clips must share sample rate and channel mode.
+
+    Parameters:
+    - paths (list): Clips to join, in playback order.
+    - dest_path (str): Output file.
+
+    Returns:
+    - list or None: (start, end) offsets in seconds of each clip within the
+      joined file, or None if the clips cannot be joined losslessly (the output
+      is then not written).
+    """
+    chunks, cues = [], []
+    offset = 0.0
+    stream_format = None
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        info = _scan_mp3(data)
+        if info[3] is None:
+            return None
+        clip_format = (info[3][2], info[3][3], info[3][4])  # rate, mono, mpeg1
+        if stream_format is None:
+            stream_format = clip_format
+        elif clip_format != stream_format:
+            return None
+        # Skip the info frame; its frame count would describe only the first clip
+        start = info[4] if info[4] is not None else info[0]
+        frames = data[start : info[1]]
+        duration = _scan_mp3(frames)[2] or 0.0
+        chunks.append(frames)
+        cues.append((offset, offset + duration))
+        offset += duration
+
+    tmp_path = f"{dest_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for frames in chunks:
+            f.write(frames)
+    os.replace(tmp_path, dest_path)
+    return cues
+
+
+# A silent MPEG-1 Layer III frame: 32 kbps, 44.1 kHz, mono. With all-zero side
+# information every granule decodes to silence. Each frame holds 1152 samples.
+_SILENT_FRAME = b"\xff\xfb\x10\xc0" + bytes(100)
+_SILENT_FRAME_SECONDS = 1152 / 44100
+
+
+def silent_mp3(duration_sec):
+    """
+    Returns MP3 bytes of silence lasting (at least) duration_sec.
+
+    Built from pre-computed frames, so it needs no encoder.
+    """
+    frames = max(1, int(-(-duration_sec // _SILENT_FRAME_SECONDS)))
+    return _SILENT_FRAME * frames
+
+
+def wav_duration(path):
+    """Returns the duration of a PCM WAV file in seconds from its header."""
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def get_audio_duration(path):
+    """
+    Returns the duration of an audio clip in seconds without decoding it when possible.
+
+    Raises:
+    - ValueError: If the duration cannot be determined.
+    """
+    metadata = read_clip_metadata(path)
+    if metadata.get("duration_ms") is not None:
+        return metadata["duration_ms"] / 1000
+
+    with tracing.span("audio.probe", path=path):
+        if path.lower().endswith(".mp3"):
+            duration = mp3_duration(path)
+            if duration is not None:
+                return duration
+        if path.lower().endswith(".wav"):
+            return wav_duration(path)
+
+        # librosa is optional: only needed for formats the header scan can't read
+        try:
+            import librosa
+        except ImportError:
+            raise ValueError(
+                f"Cannot determine duration of {path}; install librosa for this format"
+            )
+        return librosa.get_duration(path=path)
@@ -0,0 +1,268 @@
+"""
+Batch generation of presentations from a manifest.
+
+Each manifest row (CSV with a header, or JSON Lines) describes one deck:
+topic, title, num_slides and optionally voice (an ElevenLabs voice ID; other
+TTS providers use their default voice) and id. Rows run on a worker pool
+through three stages, each with its own concurrency limit so e.g. many decks
+can wait on the LLM while only a few Quarto processes run at once:
+
+    generate (LLM) -> render (Quarto) -> voice (TTS)
+
+Provider rate limits still apply across all rows through tts_scheduler.
+
+Progress is appended to a results file (JSON Lines, one record per stage
+transition) as it happens. Re-running the same manifest against the same
+results file resumes: finished rows are skipped, and a row interrupted after
+generation continues in its existing directory, reusing the QMD and any clips
+already synthesized.
+"""
+
+import concurrent.futures
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+
+import presentation_utils as pu
+import tracing
+import tts_providers
+from render_service import RenderService
+
+STAGES = ("generate", "render", "voice")
+
+
+def load_manifest(path):
+    """
+    Reads deck rows from a .csv or .jsonl manifest.
+
+    Returns:
+    - list of dict: Rows with topic, title, num_slides (int), voice and id.
+
+    Raises:
+    - ValueError: If a row has no topic, or two rows share an id.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            raw_rows = list(csv.DictReader(f))
+        else:
+            raw_rows = [json.loads(line) for line in f if line.strip()]
+
+    rows = []
+    seen = set()
+    for number, raw in enumerate(raw_rows, start=1):
+        topic = (raw.get("topic") or "").strip()
+        if not topic:
+            raise ValueError(f"{path}: row {number} has no topic")
+        row = {
+            "topic": topic,
+            "title": (raw.get("title") or "").strip() or topic[:50],
+            "num_slides": int(raw.get("num_slides") or 5),
+            # Empty means the TTS provider's default voice
+            "voice": (raw.get("voice") or "").strip() or None,
+        }
+        # Rows are identified by content and position unless the manifest
+        # names them, so identical rows still get their own results record
+        row["id"] = str(raw.get("id") or "").strip() or hashlib.sha256(
+            json.dumps({**row, "row": number}, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+        if row["id"] in seen:
+            raise ValueError(f"{path}: row {number} repeats id {row['id']!r}")
+        seen.add(row["id"])
+        rows.append(row)
+    return rows
+
+
+class ResultsLog:
+    """
+    Append-only JSON Lines log of row progress; the last record per row wins.
+
+    Parameters:
+    - path (str): Results file; created if missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash
+                    self.records[record["id"]] = record
+        except FileNotFoundError:
+            pass
+
+    def get(self, row_id):
+        with self._lock:
+            return dict(self.records.get(row_id) or {})
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.records[record["id"]] = record
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class BatchRunner:
+    """
+    Runs manifest rows through generate -> render -> voice.
+
+    Parameters:
+    - results_path (str): JSON Lines results file (also the resume state).
+    - workers (int): Rows processed at the same time.
+    - limits (dict): Stage name -> maximum concurrent rows in that stage.
+    - render_options (dict): Extra keyword arguments for voice_presentation_html
+      (e.g. join_audio, audio_format, provider).
+    """
+
+    def __init__(self, results_path, workers=8, limits=None, render_options=None):
+        self.results = ResultsLog(results_path)
+        self.workers = workers
+        limits = {"generate": 4, "render": 2, "voice": 4, **(limits or {})}
+        self.slots = {stage: threading.Semaphore(limits[stage]) for stage in STAGES}
+        # Quarto processes are bounded by the render service queue
+        self.render_service = RenderService(max_workers=limits["render"])
+        self.render_options = render_options or {}
+        # Manifest voices are ElevenLabs voice IDs; other providers would
+        # reject them, so they synthesize with their own default voice
+        provider = (
+            self.render_options.get("provider") or tts_providers.DEFAULT_PROVIDER
+        )
+        self.voice_ids = getattr(provider, "name", provider) == "elevenlabs"
+
+    def run(self, rows):
+        """
+        Processes every row that has not finished yet.
+
+        Returns:
+        - dict: Counts of rows per final status (done, failed, skipped).
+        """
+        counts = {"done": 0, "failed": 0, "skipped": 0}
+        pending = []
+        for row in rows:
+            if self.results.get(row["id"]).get("status") == "done":
+                counts["skipped"] += 1
+            else:
+                pending.append(row)
+        print(f"{len(pending)} rows to run, {counts['skipped']} already done")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.run_row, row) for row in pending]
+            for future in concurrent.futures.as_completed(futures):
+                record = future.result()
+                counts[record["status"]] += 1
+                print(
+                    f"[{sum(counts.values())}/{len(rows)}] {record['status']}: "
+                    f"{record['title']} ({record['elapsed']:.1f} s)"
+                )
+        return counts
+
+    def _stage(self, record, stage, fn):
+        """Runs one stage under its concurrency limit and logs its timings."""
+        queued = time.perf_counter()
+        with self.slots[stage]:
+            started = time.perf_counter()
+            record["status"] = "running"
+            record["stage"] = stage
+            self.results.write(record)
+            result = fn()
+        record["timings"][stage] = {
+            "wait": round(started - queued, 3),
+            "run": round(time.perf_counter() - started, 3),
+        }
+        record["completed"].append(stage)
+        self.results.write(record)
+        return result
+
+    def _skip(self, record, previous, stage):
+        """Marks a stage finished in an earlier run, keeping its timings."""
+        record["completed"].append(stage)
+        if stage in (previous.get("timings") or {}):
+            record["timings"][stage] = previous["timings"][stage]
+
+    def run_row(self, row):
+        previous = self.results.get(row["id"])
+        record = {
+            **row,
+            "status": "running",
+            "stage": None,
+            "base_dir": previous.get("base_dir"),
+            "output_html": previous.get("output_html"),
+            "completed": [],
+            "timings": {},
+            "error": None,
+        }
+        start = time.perf_counter()
+
+        # Resume in the same directory when the QMD from an earlier run survived
+        if not (
+            record["base_dir"]
+            and os.path.isfile(os.path.join(record["base_dir"], "presentation.qmd"))
+        ):
+            record["base_dir"], _ = pu.create_presentation_directory(row["title"])
+            previous = {}
+        base_dir = record["base_dir"]
+        media_dir = os.path.join(base_dir, "media")
+        os.makedirs(os.path.join(media_dir, "audio"), exist_ok=True)
+        qmd_file = os.path.join(base_dir, "presentation.qmd")
+        html_file = os.path.join(base_dir, "presentation.html")
+        output_html = os.path.join(base_dir, "presentation_final.html")
+
+        def generate():
+            presentation = pu.generate_slides(
+                topic=row["topic"],
+                title=row["title"],
+                num_slides=row["num_slides"],
+                chalktalk_demo=pu.load_chalktalk_demo(),
+            )
+            with open(qmd_file, "w", encoding="utf-8") as f:
+                f.write(pu.format_presentation_for_qmd(presentation))
+
+        def voice():
+            return pu.voice_presentation_html(
+                html_file,
+                base_dir,
+                media_dir,
+                output_html,
+                voice=row["voice"] if self.voice_ids else None,
+                **self.render_options,
+            )
+
+        try:
+            with tracing.trace(
+                "batch_row", tracing.report_path(base_dir), row_id=row["id"]
+            ):
+                done_before = set(previous.get("completed") or [])
+                if "generate" in done_before:
+                    self._skip(record, previous, "generate")
+                else:
+                    self._stage(record, "generate", generate)
+                if "render" in done_before and os.path.isfile(html_file):
+                    self._skip(record, previous, "render")
+                else:
+                    self._stage(
+                        record,
+                        "render",
+                        lambda: self.render_service.render(qmd_file),
+                    )
+                record["output_html"] = self._stage(record, "voice", voice)
+            record["status"] = "done"
+            record["stage"] = None
+        except Exception as e:
+            traceback.print_exc()
+            record["status"] = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+
+        record["elapsed"] = round(time.perf_counter() - start, 3)
+        self.results.write(record)
+        return record
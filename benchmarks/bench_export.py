@@ -0,0 +1,91 @@
+"""
+Compares a deck's single-file export with its multi-file layout.
+
+Reports total bytes for both layouts and, when playwright (with Chromium) is
+installed, the time from navigation until reveal.js is ready and the first
+slide is painted, loading each layout from disk.
+
+Usage:
+    python benchmarks/bench_export.py presentations/<deck>/presentation_final.html
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export_utils import export_single_file  # noqa: E402
+
+# Resolves once Reveal is ready and the browser has painted the first slide
+FIRST_SLIDE_JS = """
+() => new Promise(resolve => {
+  const done = () => requestAnimationFrame(() => resolve(performance.now()));
+  if (window.Reveal && Reveal.isReady()) done();
+  else if (window.Reveal) Reveal.on("ready", done);
+  else window.addEventListener("load", done);
+})
+"""
+
+
+def time_to_first_slide(paths, repeat):
+    """Returns {path: [milliseconds, ...]}, or None if playwright is unavailable."""
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        return None
+
+    timings = {path: [] for path in paths}
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        for _ in range(repeat):
+            for path in paths:
+                page = browser.new_page()
+                page.goto("file://" + os.path.abspath(path), wait_until="commit")
+                timings[path].append(page.evaluate(FIRST_SLIDE_JS))
+                page.close()
+        browser.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("html", help="The deck's final HTML")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "standalone.html")
+        report = export_single_file(args.html, output)
+
+        print(f"{'layout':<14} {'files':>6} {'bytes':>12}")
+        rows = [
+            ("multi-file", report["source_files"], report["source_bytes"]),
+            ("single-file", 1, report["bytes"]),
+        ]
+        for label, files, size in rows:
+            print(f"{label:<14} {files:>6} {size:>12}")
+        print(
+            f"export took {report['elapsed']:.2f} s; "
+            f"{report['audio_clips']} clips, {report['audio_unique']} embedded"
+        )
+
+        timings = time_to_first_slide([args.html, output], args.repeat)
+        if timings is None:
+            print(
+                "time-to-first-slide: skipped "
+                "(pip install playwright && playwright install chromium)"
+            )
+            return
+        for label, path in (("multi-file", args.html), ("single-file", output)):
+            print(
+                f"time-to-first-slide {label:<12} median "
+                f"{statistics.median(timings[path]):7.1f} ms  "
+                f"(min {min(timings[path]):.1f} ms over {args.repeat} loads)"
+            )
+
+
+if __name__ == "__main__":
+    main()
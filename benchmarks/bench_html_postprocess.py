@@ -0,0 +1,123 @@
+"""
+Benchmarks HTML post-processing of the decks in presentations/.
+
+Compares the legacy chain of three parse/prettify cycles
+(extract_media_fragments -> insert_media_elements ->
+modify_html_for_autoslide_and_controls) with the single-pass pipeline used by
+voice_presentation_html (parse once, edit the tree, serialize once), for each
+available BeautifulSoup parser backend. No audio is synthesized: every fragment
+is given a placeholder clip path and a fixed duration.
+
+Usage:
+    python benchmarks/bench_html_postprocess.py [--repeat 5] [--parser lxml]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import presentation_utils as pu  # noqa: E402
+
+
+def fake_processed(fragments, base_dir):
+    processed, durations = [], {}
+    for idx, (_, fragment, unique_id, media_type) in enumerate(fragments):
+        path = os.path.join(base_dir, "media", "audio", f"clip_{idx}.mp3")
+        processed.append(
+            (path, os.path.relpath(path, base_dir), fragment, unique_id, media_type)
+        )
+        durations[path] = 1000
+    return processed, durations
+
+
+def legacy(html_content, base_dir, parser):
+    # The legacy functions take no parser argument, so swap the module default
+    default_parser, pu.HTML_PARSER = pu.HTML_PARSER, parser
+    try:
+        fragments, html = pu.extract_media_fragments(html_content)
+        processed, durations = fake_processed(fragments, base_dir)
+        html = pu.insert_media_elements(html, processed, durations=durations)
+        return pu.modify_html_for_autoslide_and_controls(html)
+    finally:
+        pu.HTML_PARSER = default_parser
+
+
+def single_pass(html_content, base_dir, parser):
+    soup = pu.parse_html(html_content, parser=parser)
+    fragments = pu.tag_media_fragments(soup)
+    processed, durations = fake_processed(fragments, base_dir)
+    pu.attach_media_elements(soup, processed, durations=durations)
+    pu.add_autoslide_and_controls(soup)
+    return pu.serialize_html(soup)
+
+
+def measure(fn, html_content, base_dir, parser, repeat):
+    # Silence the per-fragment log lines while timing
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(html_content, base_dir, parser)
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        fn(html_content, base_dir, parser)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return min(times), peak
+
+
+def available_parsers(requested):
+    parsers = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+
+        parsers.append("lxml")
+    except ImportError:
+        pass
+    if requested:
+        parsers = [p for p in parsers if p in requested]
+    return parsers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--parser", action="append", help="Restrict to a backend")
+    parser.add_argument("--decks", default="presentations/*/presentation.html")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.decks))
+    if not paths:
+        sys.exit(f"No decks match {args.decks}")
+
+    header = f"{'deck':<45} {'parser':<12} {'legacy ms':>10} {'single ms':>10} {'speedup':>8} {'legacy MB':>10} {'single MB':>10}"
+    print(header)
+    print("-" * len(header))
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            html_content = f.read()
+        base_dir = os.path.dirname(path)
+        deck = os.path.basename(base_dir)[:44]
+        for backend in available_parsers(args.parser):
+            t_old, m_old = measure(legacy, html_content, base_dir, backend, args.repeat)
+            t_new, m_new = measure(
+                single_pass, html_content, base_dir, backend, args.repeat
+            )
+            print(
+                f"{deck:<45} {backend:<12} {t_old * 1000:>10.1f} {t_new * 1000:>10.1f} "
+                f"{t_old / t_new:>7.2f}x {m_old / 2**20:>10.1f} {m_new / 2**20:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
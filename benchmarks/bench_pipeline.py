@@ -0,0 +1,432 @@
+"""
+Benchmarks the pipeline offline against local OpenRouter and ElevenLabs stand-ins.
+
+Starts mock_llm_server and mock_tts_server (configurable latency, jitter, 429
+rate and payload size) and runs each scenario over the decks in presentations/:
+- generate: generate_slides and generate_slides_stream, one call each per deck;
+- tts: every narration line of the decks through fetch_voiceover_elevenlabs,
+  with the audio cache disabled;
+- voice: voice_presentation_html on each deck's presentation.html with an
+  empty audio cache;
+- postprocess: the same on a voiced deck, so only the HTML stages run;
+- e2e: create_presentation_from_prompt per deck (needs quarto; skipped
+  otherwise).
+
+Every scenario runs in a fresh interpreter, so its peak RSS is its own and no
+connection pool, scheduler or cache state leaks between scenarios. Latencies
+come from the tracing spans recorded during the run; the report gives
+throughput, p50/p95 latency, retries, requests answered 429 and peak RSS.
+Transcoding is disabled (CHALKTALK_AUDIO_FORMAT is cleared) so the numbers do
+not depend on ffmpeg.
+
+Results can be saved as JSON and compared against a previous run.
+
+Usage:
+    python benchmarks/bench_pipeline.py --output pipeline.json
+    python benchmarks/bench_pipeline.py tts voice --rate-limit 0.05 --jitter 0.2
+    python benchmarks/bench_pipeline.py --baseline pipeline.json --tolerance 1.5
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "presentations")
+
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm_server import start_llm_server  # noqa: E402
+from mock_tts_server import start_server  # noqa: E402
+
+SCENARIOS = ["generate", "tts", "voice", "postprocess", "e2e"]
+
+# Span whose durations are the per-operation latency of each scenario
+LATENCY_SPANS = {
+    "generate": "llm.generate",
+    "tts": "tts.request",
+    "voice": "bench.deck",
+    "postprocess": "bench.deck",
+    "e2e": "create_presentation",
+}
+
+# Stages whose p50/p95 are reported alongside the scenario latency
+STAGE_SPANS = ("llm.generate", "tts.request", "quarto.render", "html.serialize")
+
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+def percentile(values, q):
+    """Returns the q-th percentile (0-100) of values, by nearest rank."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def fixture_decks(names=None):
+    decks = sorted(
+        entry
+        for entry in os.listdir(FIXTURES_DIR)
+        if os.path.isfile(os.path.join(FIXTURES_DIR, entry, "presentation.html"))
+    )
+    if names:
+        decks = [deck for deck in decks if deck in names]
+    return decks
+
+
+def copy_deck_html(deck, scratch):
+    """Copies a deck's rendered HTML (no audio) to a fresh directory in scratch."""
+    base_dir = os.path.join(scratch, deck)
+    os.makedirs(os.path.join(base_dir, "media", "audio"))
+    shutil.copy(os.path.join(FIXTURES_DIR, deck, "presentation.html"), base_dir)
+    return base_dir
+
+
+def _walk(span_dict, skip=()):
+    yield span_dict
+    for child in span_dict["children"]:
+        if child["name"] not in skip:
+            yield from _walk(child, skip)
+
+
+def _latency_summary(values):
+    return {
+        "count": len(values),
+        "p50_ms": values and percentile(values, 50) * 1000 or None,
+        "p95_ms": values and percentile(values, 95) * 1000 or None,
+    }
+
+
+# Scenario bodies, run inside the worker process
+
+
+def run_generate(decks, runs, scratch):
+    import presentation_utils as pu
+
+    demo = pu.load_chalktalk_demo()
+    for _ in range(runs):
+        for deck in decks:
+            pu.generate_slides(deck, deck, 5, demo)
+            "".join(pu.generate_slides_stream(deck, deck, 5, demo))
+    return 2 * runs * len(decks)
+
+
+def run_tts(decks, runs, scratch):
+    import presentation_utils as pu
+
+    clips = 0
+    for _ in range(runs):
+        for deck in decks:
+            with open(os.path.join(FIXTURES_DIR, deck, "presentation.html")) as f:
+                fragments, _ = pu.extract_media_fragments(f.read())
+            lines = [fragment[0] for fragment in pu._tts_fragments(fragments)]
+            with tempfile.TemporaryDirectory(dir=scratch) as out:
+                pu.fetch_voiceover_elevenlabs(lines, out, cache=False)
+            clips += len(lines)
+    return clips
+
+
+def _voice(deck, base_dir, incremental):
+    import presentation_utils as pu
+    import tracing
+
+    with tracing.span("bench.deck", deck=deck):
+        pu.voice_presentation_html(
+            os.path.join(base_dir, "presentation.html"),
+            base_dir,
+            os.path.join(base_dir, "media"),
+            os.path.join(base_dir, "presentation_final.html"),
+            incremental=incremental,
+        )
+
+
+def run_voice(decks, runs, scratch):
+    import audio_cache
+
+    for run in range(runs):
+        # A new shared cache per run, so every clip is synthesized
+        audio_cache._default_cache = audio_cache.AudioCache(
+            os.path.join(scratch, f"cache_{run}")
+        )
+        for deck in decks:
+            _voice(deck, copy_deck_html(deck, os.path.join(scratch, str(run))), False)
+    return runs * len(decks)
+
+
+def run_postprocess(decks, runs, scratch):
+    import tracing
+
+    base_dirs = {deck: copy_deck_html(deck, scratch) for deck in decks}
+    # Voice every deck once, outside the measured spans
+    with tracing.span("bench.warmup"):
+        for deck, base_dir in base_dirs.items():
+            _voice(deck, base_dir, False)
+    for _ in range(runs):
+        for deck, base_dir in base_dirs.items():
+            _voice(deck, base_dir, True)
+    return runs * len(decks)
+
+
+def run_e2e(decks, runs, scratch):
+    import presentation_utils as pu
+
+    # create_presentation_from_prompt writes to presentations/ under the cwd
+    os.chdir(scratch)
+    for _ in range(runs):
+        for deck in decks:
+            pu.create_presentation_from_prompt(prompt=deck, title=deck, num_slides=5)
+    return runs * len(decks)
+
+
+SCENARIO_RUNNERS = {
+    "generate": run_generate,
+    "tts": run_tts,
+    "voice": run_voice,
+    "postprocess": run_postprocess,
+    "e2e": run_e2e,
+}
+
+
+def run_worker(scenario, decks, runs, scratch):
+    """Runs one scenario in this process and prints its measurements as JSON."""
+    import tracing
+
+    with tracing.span("bench") as root:
+        start = time.perf_counter()
+        items = SCENARIO_RUNNERS[scenario](decks, runs, scratch)
+        elapsed = time.perf_counter() - start
+
+    # Spans under the warm-up are not part of the measurement
+    tree = root.to_dict()
+    elapsed -= sum(
+        child["seconds"] for child in tree["children"] if child["name"] == "bench.warmup"
+    )
+    durations = {}
+    retries = 0
+    for node in _walk(tree, skip={"bench.warmup"}):
+        durations.setdefault(node["name"], []).append(node["seconds"])
+        retries += node["attrs"].get("retries", 0)
+
+    result = {
+        "items": items,
+        "seconds": elapsed,
+        "throughput": items / elapsed,
+        "latency": _latency_summary(durations.get(LATENCY_SPANS[scenario], [])),
+        "stages": {
+            name: _latency_summary(durations[name])
+            for name in STAGE_SPANS
+            if name in durations
+        },
+        "retries": retries,
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+    print(RESULT_PREFIX + json.dumps(result))
+
+
+def run_scenario(scenario, args, servers, scratch):
+    """Runs a scenario in a fresh interpreter; returns its result dict or None."""
+    llm, tts = servers
+    workdir = os.path.join(scratch, scenario)
+    os.makedirs(workdir)
+    env = dict(
+        os.environ,
+        OPENROUTER_BASE_URL=llm.base_url,
+        OPENROUTER_API_KEY="mock",
+        ELEVENLABS_BASE_URL=tts.base_url,
+        ELEVENLABS_API_KEY="mock",
+        CHALKTALK_TTS_PROVIDER="elevenlabs",
+        CHALKTALK_TTS_CACHE_DIR=os.path.join(workdir, "cache"),
+        CHALKTALK_AUDIO_FORMAT="",
+        CHALKTALK_TRACING="1",
+        CHALKTALK_ELEVENLABS_CONCURRENCY=str(args.concurrency),
+        CHALKTALK_ELEVENLABS_RPS=str(args.concurrency * 100),
+        CHALKTALK_OPENROUTER_CONCURRENCY=str(args.concurrency),
+        CHALKTALK_OPENROUTER_RPS=str(args.concurrency * 100),
+    )
+    before = llm.stats(), tts.stats()
+    process = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--worker",
+            scenario,
+            "--runs",
+            str(args.runs),
+            "--scratch",
+            workdir,
+            "--decks",
+            *args.decks,
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    results = [
+        line[len(RESULT_PREFIX) :]
+        for line in process.stdout.splitlines()
+        if line.startswith(RESULT_PREFIX)
+    ]
+    if process.returncode != 0 or not results:
+        tail = process.stderr.strip().splitlines()[-3:]
+        print(f"{scenario}: failed\n    " + "\n    ".join(tail))
+        return None
+
+    result = json.loads(results[-1])
+    after = llm.stats(), tts.stats()
+    result["requests"] = sum(a["requests"] - b["requests"] for a, b in zip(after, before))
+    result["throttled"] = sum(
+        a["throttled"] - b["throttled"] for a, b in zip(after, before)
+    )
+    return result
+
+
+def _ms(value):
+    return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+
+def compare(results, baseline, tolerance):
+    """Returns regressions in throughput, p95 latency or peak RSS vs a baseline."""
+    regressions = []
+    for scenario, result in results.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        if result["throughput"] * tolerance < before["throughput"]:
+            regressions.append(
+                f"{scenario}: throughput {before['throughput']:.2f}/s -> "
+                f"{result['throughput']:.2f}/s"
+            )
+        p95, p95_before = result["latency"]["p95_ms"], before["latency"]["p95_ms"]
+        if p95 and p95_before and p95 > p95_before * tolerance:
+            regressions.append(
+                f"{scenario}: p95 {p95_before:.1f} ms -> {p95:.1f} ms"
+            )
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * tolerance:
+            regressions.append(
+                f"{scenario}: peak RSS {before['peak_rss_mb']:.0f} MB -> "
+                f"{result['peak_rss_mb']:.0f} MB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("scenarios", nargs="*", default=SCENARIOS)
+    parser.add_argument("--decks", nargs="+", default=None, help="Fixture deck names")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="Fraction of requests -> 429"
+    )
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument(
+        "--padding", type=int, default=0, help="Extra bytes per TTS clip"
+    )
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Repeat each LLM reply this often"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="Fail if throughput, p95 or peak RSS is this many times worse",
+    )
+    parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--scratch", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.decks, args.runs, args.scratch)
+        return
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.decks = fixture_decks(args.decks)
+    if not args.decks:
+        parser.error("no fixture decks found")
+
+    faults = {
+        "jitter": args.jitter,
+        "rate_limit": args.rate_limit,
+        "retry_after": args.retry_after,
+        "seed": args.seed,
+    }
+    servers = (
+        start_llm_server(
+            latency=args.llm_latency,
+            token_delay=args.token_delay,
+            repeat=args.repeat,
+            **faults,
+        ),
+        start_server(latency=args.tts_latency, padding=args.padding, **faults),
+    )
+
+    print(
+        f"{len(args.decks)} decks, {args.runs} run(s), concurrency {args.concurrency}, "
+        f"LLM {args.llm_latency * 1000:.0f} ms, TTS {args.tts_latency * 1000:.0f} ms, "
+        f"429 rate {args.rate_limit:.0%}"
+    )
+    print(
+        f"{'scenario':<12} {'items':>6} {'seconds':>8} {'items/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'retries':>7} {'429s':>5} {'RSS MB':>7}"
+    )
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for scenario in args.scenarios:
+            if scenario == "e2e" and shutil.which("quarto") is None:
+                print(f"{scenario:<12} skipped: quarto not found on the PATH")
+                continue
+            result = run_scenario(scenario, args, servers, scratch)
+            if result is None:
+                continue
+            results[scenario] = result
+            print(
+                f"{scenario:<12} {result['items']:>6} {result['seconds']:8.2f} "
+                f"{result['throughput']:8.2f} {_ms(result['latency']['p50_ms'])} "
+                f"{_ms(result['latency']['p95_ms'])} {result['retries']:>7} "
+                f"{result['throttled']:>5} {result['peak_rss_mb']:7.0f}"
+            )
+            for name, stage in result["stages"].items():
+                if name != LATENCY_SPANS[scenario]:
+                    print(
+                        f"    {name:<26} {stage['count']:>6} "
+                        f"{_ms(stage['p50_ms'])} {_ms(stage['p95_ms'])}"
+                    )
+    for server in servers:
+        server.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Pipeline regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No pipeline regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compares cold and warm Quarto render latency on the decks in presentations/.
+
+Each deck is copied to a scratch directory and rendered:
+- cold: a plain `quarto render` per run (new Quarto, Pandoc and kernel);
+- warm: through RenderService, after one untimed render that starts the
+  kernel daemon, so each timed run reuses the live Jupyter kernel.
+
+Decks without Jupyter chunks have no kernel to keep warm; their warm and cold
+numbers only differ by noise.
+
+Usage:
+    python benchmarks/bench_quarto_render.py [--runs 3] [deck ...]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from presentation_utils import render_qmd  # noqa: E402
+from render_service import RenderService, uses_jupyter  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def copy_deck(deck_dir, scratch):
+    """Copies a deck's QMD and media (not its rendered output) to scratch."""
+    dest = os.path.join(scratch, os.path.basename(deck_dir))
+    os.makedirs(dest)
+    shutil.copy(os.path.join(deck_dir, "presentation.qmd"), dest)
+    if os.path.isdir(os.path.join(deck_dir, "media")):
+        shutil.copytree(os.path.join(deck_dir, "media"), os.path.join(dest, "media"))
+    return os.path.join(dest, "presentation.qmd")
+
+
+def timed(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("decks", nargs="*", help="Deck directories")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--daemon-seconds", type=int, default=300)
+    args = parser.parse_args()
+
+    if shutil.which("quarto") is None:
+        print("quarto not found on the PATH; nothing to benchmark")
+        return 1
+
+    decks = args.decks or sorted(
+        os.path.join(REPO_DIR, "presentations", entry)
+        for entry in os.listdir(os.path.join(REPO_DIR, "presentations"))
+        if os.path.isfile(
+            os.path.join(REPO_DIR, "presentations", entry, "presentation.qmd")
+        )
+    )
+    service = RenderService(max_workers=1, daemon_seconds=args.daemon_seconds)
+
+    print(f"{'deck':<48} {'jupyter':>7} {'cold s':>8} {'warm s':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as scratch:
+        for deck_dir in decks:
+            qmd_file = copy_deck(deck_dir, scratch)
+            with open(qmd_file, "r", encoding="utf-8") as f:
+                jupyter = uses_jupyter(f.read())
+
+            cold = timed(lambda: render_qmd(qmd_file, share_assets=False), args.runs)
+            service.render(qmd_file, share_assets=False)  # starts the kernel daemon
+            warm = timed(
+                lambda: service.render(qmd_file, share_assets=False), args.runs
+            )
+
+            cold_median = statistics.median(cold)
+            warm_median = statistics.median(warm)
+            print(
+                f"{os.path.basename(deck_dir)[:48]:<48} {'yes' if jupyter else 'no':>7} "
+                f"{cold_median:8.2f} {warm_median:8.2f} "
+                f"{cold_median / warm_median:7.2f}x"
+            )
+    service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
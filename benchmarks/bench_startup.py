@@ -0,0 +1,124 @@
+"""
+Records module import times with `python -X importtime`.
+
+Each target module is imported in a fresh interpreter (several times, keeping
+the fastest run) and the cumulative import time of the module plus its heaviest
+dependencies is reported. Results can be saved as JSON and compared against a
+previous run to catch start-up regressions.
+
+Usage:
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json --tolerance 1.5
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["presentation_utils", "app"]
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_times(module):
+    """
+    Imports module in a fresh interpreter and parses the -X importtime report.
+
+    Parameters:
+    - module (str): Module to import, or "" for bare interpreter start-up.
+
+    Returns:
+    - dict: module name -> (self_us, cumulative_us) for every import.
+    """
+    code = f"import {module}" if module else "pass"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:]
+        raise RuntimeError(f"import {module} failed: {' '.join(tail)}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            times[name] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(module, runs):
+    # Imports done by the interpreter itself (site, .pth hooks) are not ours
+    startup = set(import_times(""))
+    best = None
+    for _ in range(runs):
+        times = import_times(module)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+    ours = [
+        (name, cumulative)
+        for name, (_, cumulative) in best.items()
+        if name != module and name not in startup
+    ]
+    top = sorted(ours, key=lambda item: item[1], reverse=True)
+    return {
+        "cumulative_ms": best[module][1] / 1000,
+        "heaviest": {name: cumulative / 1000 for name, cumulative in top[:10]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="Fail if a module is this many times slower than the baseline",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        try:
+            results[module] = measure(module, args.runs)
+        except RuntimeError as e:
+            print(f"{module}: {e}")
+            continue
+        print(f"{module}: {results[module]['cumulative_ms']:.1f} ms")
+        for name, ms in results[module]["heaviest"].items():
+            print(f"    {name:<40} {ms:>8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = []
+        for module, result in results.items():
+            if module not in baseline:
+                continue
+            before = baseline[module]["cumulative_ms"]
+            after = result["cumulative_ms"]
+            if after > before * args.tolerance:
+                regressions.append(f"{module}: {before:.1f} ms -> {after:.1f} ms")
+        if regressions:
+            print("Start-up regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No start-up regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures TTS fan-out throughput against the local mock TTS server.
+
+Runs the same batch of lines through fetch_voiceover_elevenlabs (thread pool +
+pooled requests.Session) and fetch_voiceover_elevenlabs_async (asyncio + pooled
+httpx.AsyncClient) with the audio cache disabled, and reports clips per second
+and the peak concurrency observed by the server.
+
+Usage:
+    python benchmarks/bench_tts_throughput.py --lines 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_tts_server import start_server  # noqa: E402
+
+
+def server_stats(server):
+    with urllib.request.urlopen(server.base_url.replace("/v1", "/stats")) as r:
+        return json.load(r)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+
+    # Configure the pipeline before it is imported
+    os.environ["ELEVENLABS_BASE_URL"] = server.base_url
+    os.environ["ELEVENLABS_API_KEY"] = "mock"
+    os.environ["CHALKTALK_ELEVENLABS_CONCURRENCY"] = str(args.concurrency)
+    os.environ["CHALKTALK_ELEVENLABS_RPS"] = str(args.concurrency * 100)
+    import presentation_utils as pu
+
+    lines = [
+        f"Line {i}: the quick brown fox jumps over the lazy dog."
+        for i in range(args.lines)
+    ]
+
+    runs = [
+        ("threads + requests.Session", lambda out: pu.fetch_voiceover_elevenlabs(
+            lines, out, cache=False
+        )),
+        ("asyncio + httpx.AsyncClient", lambda out: asyncio.run(
+            pu.fetch_voiceover_elevenlabs_async(lines, out, cache=False)
+        )),
+    ]
+
+    print(
+        f"{args.lines} lines, concurrency {args.concurrency}, "
+        f"server latency {args.latency * 1000:.0f} ms"
+    )
+    for label, run in runs:
+        before = server_stats(server)["requests"]
+        with tempfile.TemporaryDirectory() as out:
+            start = time.perf_counter()
+            paths = run(out)
+            elapsed = time.perf_counter() - start
+        stats = server_stats(server)
+        assert all(paths) and stats["requests"] - before == args.lines
+        print(
+            f"  {label:<30} {elapsed:6.2f} s  {args.lines / elapsed:7.1f} clips/s  "
+            f"(peak in flight so far: {stats['peak_in_flight']})"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
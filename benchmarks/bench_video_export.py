@@ -0,0 +1,77 @@
+"""
+Measures MP4 export speed on the decks in presentations/.
+
+For each voiced deck (one with a presentation_final.html) the video is
+exported from scratch with 1 encoder process and with one per CPU, then once
+more incrementally with nothing changed (every segment reused). Reports
+capture and encode time and the real-time factor (seconds of video per second
+of export; above 1 means faster than real time).
+
+Needs playwright (with Chromium) and ffmpeg.
+
+Usage:
+    python benchmarks/bench_video_export.py [--fps 24] [deck ...]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_export import export_video  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("decks", nargs="*", help="Deck directories")
+    parser.add_argument("--fps", type=int, default=24)
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg not found on the PATH; nothing to benchmark")
+        return 1
+
+    presentations = os.path.join(REPO_DIR, "presentations")
+    decks = args.decks or sorted(
+        os.path.join(presentations, entry) for entry in os.listdir(presentations)
+    )
+    decks = [
+        deck
+        for deck in decks
+        if os.path.isfile(os.path.join(deck, "presentation_final.html"))
+    ]
+    worker_counts = sorted({1, os.cpu_count() or 1})
+
+    print(
+        f"{'deck':<40} {'workers':>7} {'video s':>8} {'capture s':>9} "
+        f"{'encode s':>8} {'realtime':>8}"
+    )
+    with tempfile.TemporaryDirectory() as scratch:
+        for deck in decks:
+            html = os.path.join(deck, "presentation_final.html")
+            runs = [(str(workers), workers, False) for workers in worker_counts]
+            runs.append(("reused", None, True))
+            for label, workers, incremental in runs:
+                report = export_video(
+                    html,
+                    os.path.join(scratch, "out.mp4"),
+                    fps=args.fps,
+                    max_workers=workers,
+                    incremental=incremental,
+                )
+                print(
+                    f"{os.path.basename(deck)[:40]:<40} {label:>7} "
+                    f"{report['duration']:8.1f} {report['capture_seconds']:9.1f} "
+                    f"{report['encode_seconds']:8.1f} "
+                    f"{report['realtime_factor']:7.1f}x"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Answers POST /v1/chat/completions with slide markdown taken from the decks in
+presentations/ (their presentation.qmd without the YAML header, which
+format_presentation_for_qmd adds back). A deck is picked when its directory
+name appears in the prompt, so callers choose the reply through the title;
+otherwise decks are served in turn. With "stream": true the reply is sent as
+server-sent events, one small chunk per emulated token.
+
+Shares the latency, jitter and 429 options of mock_tts_server; --token-delay
+sets the time between streamed tokens and --repeat multiplies the reply to
+emulate longer decks.
+
+Point the pipeline at it with:
+    OPENROUTER_BASE_URL=http://127.0.0.1:8766/v1
+
+Usage:
+    python benchmarks/mock_llm_server.py --port 8766 --latency 1.0 --token-delay 0.005
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_tts_server import (  # noqa: E402
+    MockHandler,
+    MockServer,
+    add_fault_arguments,
+    fault_options,
+    start_server,
+)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "presentations")
+
+# Characters per emulated token when streaming
+TOKEN_CHARS = 4
+
+_HEADER_RE = re.compile(r"\A---\n.*?\n---\n+", re.DOTALL)
+
+
+def load_fixture_replies(fixtures_dir=FIXTURES_DIR):
+    """
+    Reads the slide markdown of every fixture deck.
+
+    Returns:
+    - dict: deck directory name -> presentation.qmd content without YAML header.
+    """
+    replies = {}
+    for entry in sorted(os.listdir(fixtures_dir)):
+        qmd_file = os.path.join(fixtures_dir, entry, "presentation.qmd")
+        if os.path.isfile(qmd_file):
+            with open(qmd_file, "r", encoding="utf-8") as f:
+                replies[entry] = _HEADER_RE.sub("", f.read(), count=1)
+    return replies
+
+
+class MockLLMServer(MockServer):
+    """
+    Mock OpenRouter server.
+
+    Parameters:
+    - replies (dict): Reply name -> slide markdown; defaults to the fixtures.
+    - token_delay (float): Seconds between streamed tokens.
+    - repeat (int): Times the reply is repeated, to emulate larger payloads.
+    - Other parameters as for MockServer.
+    """
+
+    def __init__(self, address, replies=None, token_delay=0.0, repeat=1, **options):
+        super().__init__(address, MockLLMHandler, **options)
+        self.replies = replies or load_fixture_replies()
+        self.token_delay = token_delay
+        self.repeat = repeat
+        self._turns = itertools.cycle(list(self.replies))
+
+    def reply_for(self, prompt):
+        for name, text in self.replies.items():
+            if name in prompt:
+                break
+        else:
+            with self.lock:
+                text = self.replies[next(self._turns)]
+        return "\n\n".join([text] * self.repeat)
+
+
+class MockLLMHandler(MockHandler):
+    def do_POST(self):
+        payload = self._read_json()
+        if self.path != "/v1/chat/completions":
+            self._send_json(404, {"detail": "not found"})
+            return
+
+        if not self._throttle():
+            return
+        try:
+            prompt = " ".join(m.get("content", "") for m in payload.get("messages", []))
+            content = self.server.reply_for(prompt)
+            if payload.get("stream"):
+                self._stream(content, payload.get("model"))
+            else:
+                self._send_json(
+                    200,
+                    {
+                        "model": payload.get("model"),
+                        "choices": [
+                            {"message": {"role": "assistant", "content": content}}
+                        ],
+                    },
+                )
+        finally:
+            self.server.release()
+
+    def _stream(self, content, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(data):
+            self._send_chunk(f"data: {data}\n\n".encode("utf-8"))
+
+        self._send_chunk(b": OPENROUTER PROCESSING\n\n")  # keep-alive comment
+        for i in range(0, len(content), TOKEN_CHARS):
+            event = {
+                "model": model,
+                "choices": [{"delta": {"content": content[i : i + TOKEN_CHARS]}}],
+            }
+            send(json.dumps(event))
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+
+def start_llm_server(host="127.0.0.1", port=0, **options):
+    """Starts a mock OpenRouter server on a background thread and returns it."""
+    return start_server(host, port, server_class=MockLLMServer, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8766)
+    add_fault_arguments(parser)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        (args.host, args.port),
+        token_delay=args.token_delay,
+        repeat=args.repeat,
+        **fault_options(args),
+    )
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Local stand-in for the ElevenLabs /with-timestamps endpoint.
+
+Replies with silent MP3 audio whose length is proportional to the text (about
+15 characters per second) plus a matching character alignment, after a
+configurable delay. GET /stats reports request counts, how many were answered
+with 429, and the peak number of requests handled concurrently.
+
+Fault and load injection (shared with mock_llm_server):
+- latency / jitter: seconds added to every reply (jitter is uniform on top);
+- rate_limit: fraction of requests answered 429 with a Retry-After header;
+- padding: extra bytes per clip (an ID3 tag of zeros) to emulate larger,
+  higher-bitrate payloads without changing durations.
+
+Point the pipeline at it with:
+    ELEVENLABS_BASE_URL=http://127.0.0.1:8765/v1
+
+Usage:
+    python benchmarks/mock_tts_server.py --port 8765 --latency 0.3 --rate-limit 0.05
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_utils import silent_mp3  # noqa: E402
+
+CHARS_PER_SECOND = 15
+
+
+class MockServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server with request counting and fault injection.
+
+    Parameters:
+    - address (tuple): (host, port); port 0 picks a free port.
+    - handler (type): Request handler class.
+    - latency (float): Seconds before every reply.
+    - jitter (float): Extra uniform random delay, in seconds.
+    - rate_limit (float): Fraction of requests rejected with 429.
+    - retry_after (float): Retry-After sent with a 429, in seconds.
+    - seed (int): Seed for the 429 and jitter draws, for repeatable runs.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        handler,
+        latency=0.3,
+        jitter=0.0,
+        rate_limit=0.0,
+        retry_after=1.0,
+        seed=None,
+    ):
+        super().__init__(address, handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def admit(self):
+        """Counts a request and decides whether it is rate limited (429)."""
+        with self.lock:
+            self.requests += 1
+            throttled = self.random.random() < self.rate_limit
+            if throttled:
+                self.throttled += 1
+            else:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            delay = self.latency + self.random.uniform(0, self.jitter)
+        return throttled, max(0.0, delay)
+
+    def handle_error(self, request, client_address):
+        # Clients exiting with idle keep-alive connections are not errors
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _throttle(self):
+        """Applies latency and 429 injection; returns False if the request was rejected."""
+        throttled, delay = self.server.admit()
+        if throttled:
+            self._send_json(
+                429,
+                {"detail": "rate limited"},
+                headers={"Retry-After": f"{self.server.retry_after:g}"},
+            )
+            return False
+        time.sleep(delay)
+        return True
+
+    def do_GET(self):
+        if self.path != "/stats":
+            self._send_json(404, {"detail": "not found"})
+            return
+        self._send_json(200, self.server.stats())
+
+
+class MockTTSServer(MockServer):
+    """
+    Mock ElevenLabs server.
+
+    Parameters:
+    - padding (int): Extra bytes added to every clip.
+    - Other parameters as for MockServer.
+    """
+
+    def __init__(self, address, padding=0, **options):
+        super().__init__(address, MockTTSHandler, **options)
+        self.padding = padding
+
+
+def _id3_padding(size):
+    """Returns an ID3v2 tag holding size bytes of padding (skipped by decoders)."""
+    syncsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x04\x00\x00" + syncsafe + bytes(size)
+
+
+def tts_reply(text, padding=0):
+    duration = max(0.2, len(text) / CHARS_PER_SECOND)
+    step = duration / max(1, len(text))
+    audio = silent_mp3(duration)
+    if padding:
+        audio = _id3_padding(padding) + audio
+    return {
+        "audio_base64": base64.b64encode(audio).decode("ascii"),
+        "alignment": {
+            "characters": list(text),
+            "character_start_times_seconds": [i * step for i in range(len(text))],
+            "character_end_times_seconds": [(i + 1) * step for i in range(len(text))],
+        },
+    }
+
+
+class MockTTSHandler(MockHandler):
+    def do_POST(self):
+        payload = self._read_json()
+        if not (
+            self.path.startswith("/v1/text-to-speech/")
+            and self.path.endswith("/with-timestamps")
+        ):
+            self._send_json(404, {"detail": "not found"})
+            return
+
+        if not self._throttle():
+            return
+        try:
+            self._send_json(
+                200, tts_reply(payload.get("text", ""), padding=self.server.padding)
+            )
+        finally:
+            self.server.release()
+
+
+def start_server(host="127.0.0.1", port=0, server_class=MockTTSServer, **options):
+    """Starts a mock server on a background thread and returns it."""
+    server = server_class((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_fault_arguments(parser):
+    """Adds the latency/jitter/429 options shared by the mock servers."""
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="Fraction of requests -> 429"
+    )
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int)
+
+
+def fault_options(args):
+    return {
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "rate_limit": args.rate_limit,
+        "retry_after": args.retry_after,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    add_fault_arguments(parser)
+    parser.add_argument(
+        "--padding", type=int, default=0, help="Extra bytes per clip"
+    )
+    args = parser.parse_args()
+
+    server = MockTTSServer(
+        (args.host, args.port), padding=args.padding, **fault_options(args)
+    )
+    print(f"Mock TTS server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
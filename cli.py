@@ -0,0 +1,214 @@
+"""
+Command-line maintenance tasks for ChalkTalk presentations.
+
+Usage:
+    python cli.py dedupe-assets [--presentations-dir presentations] [--dry-run]
+    python cli.py export presentations/<deck>/presentation_final.html [-o out.html]
+    python cli.py video presentations/<deck>/presentation_final.html [-o out.mp4]
+    python cli.py batch decks.csv [--results decks.results.jsonl] [--workers 8]
+    python cli.py gc-audio [--presentations-dir presentations] [--strict] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+import asset_store
+
+
+def _mb(num_bytes):
+    return f"{num_bytes / 1e6:.1f} MB"
+
+
+def dedupe_assets(args):
+    store = asset_store.AssetStore(args.store_dir)
+    totals = asset_store.dedupe_presentations(
+        args.presentations_dir, store=store, dry_run=args.dry_run
+    )
+    verb = "Would save" if args.dry_run else "Saved"
+    print(
+        f"{totals['decks']} decks, {totals['files']} asset files, "
+        f"{totals['linked']} replaced by links. {verb} {_mb(totals['bytes_saved'])}."
+    )
+    if args.prune and not args.dry_run:
+        print(f"Pruned unreferenced assets: {_mb(store.prune())} freed")
+    stats = store.stats()
+    print(
+        f"Asset store {store.store_dir}: {stats['objects']} files, "
+        f"{_mb(stats['bytes'])}"
+    )
+
+
+def export(args):
+    from export_utils import export_single_file
+
+    export_single_file(args.html, args.output, minify=not args.no_minify)
+
+
+def video(args):
+    from video_export import export_video
+
+    width, height = (int(part) for part in args.size.lower().split("x"))
+    export_video(
+        args.html,
+        args.output,
+        size=(width, height),
+        fps=args.fps,
+        max_workers=args.workers,
+        incremental=not args.full,
+    )
+
+
+def batch(args):
+    from batch import BatchRunner, load_manifest
+
+    rows = load_manifest(args.manifest)
+    results_path = (
+        args.results or os.path.splitext(args.manifest)[0] + ".results.jsonl"
+    )
+    render_options = {"join_audio": args.join_audio}
+    if args.audio_format:
+        render_options["audio_format"] = args.audio_format
+    if args.tts_provider:
+        render_options["provider"] = args.tts_provider
+    runner = BatchRunner(
+        results_path,
+        workers=args.workers,
+        limits={
+            "generate": args.llm_concurrency,
+            "render": args.quarto_concurrency,
+            "voice": args.tts_concurrency,
+        },
+        render_options=render_options,
+    )
+    counts = runner.run(rows)
+    print(
+        f"{counts['done']} done, {counts['failed']} failed, "
+        f"{counts['skipped']} skipped. Results: {results_path}"
+    )
+    return 1 if counts["failed"] else 0
+
+
+def gc_audio(args):
+    from render_manifest import gc_audio as collect
+
+    total = {"decks": 0, "files": 0, "bytes": 0}
+    for entry in sorted(os.listdir(args.presentations_dir)):
+        base_dir = os.path.join(args.presentations_dir, entry)
+        if entry.startswith(".") or not os.path.isdir(os.path.join(base_dir, "media")):
+            continue
+        removed = collect(
+            base_dir, keep_checkpoint=not args.strict, dry_run=args.dry_run
+        )
+        total["decks"] += 1
+        total["files"] += removed["files"]
+        total["bytes"] += removed["bytes"]
+        if removed["files"]:
+            print(f"{base_dir}: {removed['files']} clips, {_mb(removed['bytes'])}")
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"{verb} {total['files']} orphaned clips ({_mb(total['bytes'])}) "
+        f"across {total['decks']} decks"
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    dedupe = commands.add_parser(
+        "dedupe-assets",
+        help="Replace per-deck reveal.js copies with links into the shared store",
+    )
+    dedupe.add_argument("--presentations-dir", default="presentations")
+    dedupe.add_argument("--store-dir", default=asset_store.DEFAULT_STORE_DIR)
+    dedupe.add_argument(
+        "--dry-run", action="store_true", help="Only report what would be saved"
+    )
+    dedupe.add_argument(
+        "--prune",
+        action="store_true",
+        help="Also delete stored assets no deck links to anymore",
+    )
+    dedupe.set_defaults(func=dedupe_assets)
+
+    export_cmd = commands.add_parser(
+        "export", help="Pack a voiced deck into one self-contained HTML file"
+    )
+    export_cmd.add_argument("html", help="The deck's final HTML")
+    export_cmd.add_argument(
+        "-o", "--output", help="Defaults to <name>_standalone.html next to the input"
+    )
+    export_cmd.add_argument(
+        "--no-minify", action="store_true", help="Inline scripts and styles as-is"
+    )
+    export_cmd.set_defaults(func=export)
+
+    video_cmd = commands.add_parser(
+        "video", help="Export a voiced deck as an MP4 video"
+    )
+    video_cmd.add_argument("html", help="The deck's final HTML")
+    video_cmd.add_argument(
+        "-o", "--output", help="Defaults to <name>.mp4 next to the input"
+    )
+    video_cmd.add_argument("--size", default="1280x720", help="WIDTHxHEIGHT")
+    video_cmd.add_argument("--fps", type=int, default=24)
+    video_cmd.add_argument(
+        "--workers", type=int, help="Parallel segment encoders (default: CPU count)"
+    )
+    video_cmd.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-encode every slide instead of reusing unchanged segments",
+    )
+    video_cmd.set_defaults(func=video)
+
+    batch_cmd = commands.add_parser(
+        "batch",
+        help="Generate, render and voice every deck in a CSV/JSONL manifest",
+    )
+    batch_cmd.add_argument(
+        "manifest", help="Rows of topic, title, num_slides and optional voice/id"
+    )
+    batch_cmd.add_argument(
+        "--results",
+        help="Results/resume file; defaults to <manifest>.results.jsonl",
+    )
+    batch_cmd.add_argument("--workers", type=int, default=8)
+    batch_cmd.add_argument("--llm-concurrency", type=int, default=4)
+    batch_cmd.add_argument("--quarto-concurrency", type=int, default=2)
+    batch_cmd.add_argument("--tts-concurrency", type=int, default=4)
+    batch_cmd.add_argument("--join-audio", action="store_true")
+    batch_cmd.add_argument("--audio-format", choices=["opus", "aac", "mp3"])
+    batch_cmd.add_argument(
+        "--tts-provider",
+        choices=["elevenlabs", "local", "draft"],
+        help="Defaults to CHALKTALK_TTS_PROVIDER (elevenlabs)",
+    )
+    batch_cmd.set_defaults(func=batch)
+
+    gc_cmd = commands.add_parser(
+        "gc-audio",
+        help="Delete clips no final HTML (or resume checkpoint) refers to",
+    )
+    gc_cmd.add_argument("--presentations-dir", default="presentations")
+    gc_cmd.add_argument(
+        "--strict",
+        action="store_true",
+        help="Ignore resume checkpoints; keep only clips used by a final HTML",
+    )
+    gc_cmd.add_argument(
+        "--dry-run", action="store_true", help="Only report what would be deleted"
+    )
+    gc_cmd.set_defaults(func=gc_audio)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Single-file export of a voiced presentation.
+
+A rendered deck is presentation_final.html plus presentation_files/ (reveal.js,
+themes, plugins) plus media/audio/*.mp3. export_single_file() folds all of it
+into one HTML file:
+
+- local scripts and stylesheets are inlined and minified (with rjsmin/rcssmin
+  when installed, otherwise CSS gets a light built-in pass and JS is kept as-is;
+  Quarto already ships most scripts minified),
+- images and CSS url() references become data URIs,
+- audio clips are embedded once per distinct clip as base64 text in inert
+  <script type="application/octet-stream"> blocks at the end of the body. The
+  browser skips over them without parsing, and a small loader decodes a clip
+  into a Blob URL only when its slide (or the one before it) is reached, so the
+  first slide paints about as fast as in the multi-file layout.
+"""
+
+import base64
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import unquote, urlparse
+
+from presentation_utils import parse_html, serialize_html
+
+AUDIO_BLOB_PREFIX = "ct-audio-"
+
+# Decodes embedded clips on demand; one slide of lookahead keeps playback seamless
+LAZY_AUDIO_SCRIPT = """
+(function () {
+  const urls = {};
+
+  function clipUrl(id) {
+    if (!urls[id]) {
+      const blob = document.getElementById("%(prefix)s" + id);
+      if (!blob) return null;
+      const bytes = Uint8Array.from(atob(blob.textContent.trim()), c => c.charCodeAt(0));
+      urls[id] = URL.createObjectURL(new Blob([bytes], { type: blob.dataset.type }));
+    }
+    return urls[id];
+  }
+
+  function materialize(root) {
+    if (!root) return;
+    root.querySelectorAll("source[data-clip]").forEach(source => {
+      const url = clipUrl(source.dataset.clip);
+      if (!url) return;
+      source.src = url;
+      source.removeAttribute("data-clip");
+      source.parentElement.load();
+    });
+  }
+
+  function materializeAround(slide) {
+    materialize(slide);
+    const indices = Reveal.getIndices(slide);
+    materialize(Reveal.getSlide(indices.h + 1, 0) || Reveal.getSlide(indices.h, (indices.v || 0) + 1));
+  }
+
+  function init() {
+    materializeAround(Reveal.getCurrentSlide());
+    Reveal.on("slidechanged", event => materializeAround(event.currentSlide));
+    // A fragment reached before its slide was prepared still gets its clip
+    Reveal.on("fragmentshown", event => {
+      const pending = event.fragment.querySelector("source[data-clip]");
+      if (pending) {
+        materialize(event.fragment);
+        const audio = event.fragment.querySelector("audio[data-autoplay]");
+        if (audio) audio.play();
+      }
+    });
+  }
+
+  if (Reveal.isReady()) init();
+  else Reveal.on("ready", init);
+})();
+"""
+
+
+def _is_local(url):
+    if not url:
+        return False
+    parsed = urlparse(url)
+    return not parsed.scheme and not parsed.netloc and not url.startswith("#")
+
+
+def _local_path(base_dir, url):
+    return os.path.normpath(os.path.join(base_dir, unquote(urlparse(url).path)))
+
+
+def _data_uri(path):
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("ascii")
+    return f"data:{mime};base64,{encoded}"
+
+
+def minify_css(css):
+    """Minifies CSS with rcssmin if installed, otherwise with a conservative pass."""
+    try:
+        import rcssmin
+    except ImportError:
+        css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+        css = re.sub(r"\s+", " ", css)
+        css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+        return css.strip()
+    return rcssmin.cssmin(css)
+
+
+def minify_js(js):
+    """Minifies JavaScript with rjsmin if installed, otherwise returns it unchanged."""
+    try:
+        import rjsmin
+    except ImportError:
+        return js
+    return rjsmin.jsmin(js)
+
+
+def _inline_css_urls(css, css_dir, sources):
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith("data:") or not _is_local(url):
+            return match.group(0)
+        path = _local_path(css_dir, url)
+        if not os.path.isfile(path):
+            return match.group(0)
+        sources.add(path)
+        return f'url("{_data_uri(path)}")'
+
+    return re.sub(r"""url\((['"]?)([^'")]+)\1\)""", replace, css)
+
+
+def export_single_file(html_path, output_path=None, minify=True):
+    """
+    Packs a voiced presentation and everything it references into one HTML file.
+
+    Parameters:
+    - html_path (str): The deck's final HTML (e.g. presentation_final.html).
+    - output_path (str): Where to write the export; defaults to
+      <name>_standalone.html next to html_path.
+    - minify (bool): Minify inlined scripts and stylesheets.
+
+    Returns:
+    - dict: output path, bytes of the export, bytes of the multi-file layout,
+      audio clip counts and elapsed seconds.
+    """
+    start = time.perf_counter()
+    base_dir = os.path.dirname(os.path.abspath(html_path))
+    if output_path is None:
+        output_path = os.path.splitext(html_path)[0] + "_standalone.html"
+
+    # Local files the multi-file layout needs, for the size comparison
+    sources = {os.path.abspath(html_path)}
+    with open(html_path, "r", encoding="utf-8") as f:
+        soup = parse_html(f.read())
+
+    # Scripts
+    for script in soup.find_all("script", src=True):
+        path = _local_path(base_dir, script["src"])
+        if not _is_local(script["src"]) or not os.path.isfile(path):
+            continue
+        sources.add(path)
+        with open(path, "r", encoding="utf-8") as f:
+            code = f.read()
+        if minify and not path.endswith(".min.js"):
+            code = minify_js(code)
+        del script["src"]
+        # A literal </script> would end the inline block early
+        script.string = code.replace("</script", "<\\/script")
+
+    # Stylesheets
+    for link in soup.find_all("link", href=True):
+        rel = link.get("rel") or []
+        path = _local_path(base_dir, link["href"])
+        if "stylesheet" not in rel or not _is_local(link["href"]):
+            continue
+        if not os.path.isfile(path):
+            continue
+        sources.add(path)
+        with open(path, "r", encoding="utf-8") as f:
+            css = f.read()
+        css = _inline_css_urls(css, os.path.dirname(path), sources)
+        if minify:
+            css = minify_css(css)
+        style = soup.new_tag("style")
+        for attr in ("id", "class", "media", "data-mode"):
+            if link.get(attr):
+                style[attr] = link[attr]
+        style.string = css
+        link.replace_with(style)
+
+    # Images
+    for img in soup.find_all("img", src=True):
+        path = _local_path(base_dir, img["src"])
+        if _is_local(img["src"]) and os.path.isfile(path):
+            sources.add(path)
+            img["src"] = _data_uri(path)
+
+    # Audio: one embedded blob per distinct clip, referenced by content hash
+    blobs = {}
+    clips = 0
+    for source in soup.find_all("source", src=True):
+        path = _local_path(base_dir, source["src"])
+        if not _is_local(source["src"]) or not os.path.isfile(path):
+            continue
+        sources.add(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        clip_id = hashlib.sha256(data).hexdigest()[:16]
+        if clip_id not in blobs:
+            blobs[clip_id] = (
+                source.get("type") or mimetypes.guess_type(path)[0] or "audio/mpeg",
+                base64.b64encode(data).decode("ascii"),
+            )
+        del source["src"]
+        source["data-clip"] = clip_id
+        clips += 1
+
+    body = soup.find("body")
+    if blobs and body is not None:
+        for clip_id, (mime, encoded) in blobs.items():
+            blob = soup.new_tag(
+                "script",
+                attrs={
+                    "type": "application/octet-stream",
+                    "id": f"{AUDIO_BLOB_PREFIX}{clip_id}",
+                    "data-type": mime,
+                },
+            )
+            blob.string = encoded
+            body.append(blob)
+        loader = soup.new_tag("script")
+        loader.string = LAZY_AUDIO_SCRIPT % {"prefix": AUDIO_BLOB_PREFIX}
+        body.append(loader)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(serialize_html(soup))
+
+    report = {
+        "output": output_path,
+        "bytes": os.path.getsize(output_path),
+        "source_bytes": sum(os.path.getsize(path) for path in sources),
+        "source_files": len(sources),
+        "audio_clips": clips,
+        "audio_unique": len(blobs),
+        "elapsed": time.perf_counter() - start,
+    }
+    print(
+        f"Exported {output_path}: {report['bytes'] / 1e6:.1f} MB in one file "
+        f"(multi-file layout: {report['source_bytes'] / 1e6:.1f} MB in "
+        f"{report['source_files']} files, {clips} clips, {len(blobs)} distinct)"
+    )
+    return report
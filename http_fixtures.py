@@ -0,0 +1,277 @@
+"""
+Record/replay of OpenRouter and ElevenLabs HTTP traffic.
+
+In record mode every provider request made through the pipeline's HTTP
+clients (the pooled requests.Session of get_http_session and the httpx client
+of fetch_voiceover_elevenlabs_async) goes to the network as usual, and each
+successful response is saved in a fixture store. In replay mode the network
+is never touched: responses are served from the store, and a request without a
+fixture fails with FixtureNotFoundError instead of reaching the provider.
+
+Fixtures are keyed by a hash of the method, URL path and JSON body (headers,
+and so API keys, are left out; so is the host, so fixtures recorded against
+the real APIs also replay when a base URL points elsewhere). Each one is a
+gzipped JSON file holding the status, content type and body, stored under
+<fixtures_dir>/<key[:2]>/<key>.json.gz. Streamed replies (generate_slides_stream)
+are recorded whole and replayed as one burst of the same events.
+
+Replayed runs are deterministic and spend no time waiting on providers; the
+provider schedulers still apply their request-rate budgets, so raise
+CHALKTALK_ELEVENLABS_RPS / CHALKTALK_OPENROUTER_RPS when profiling.
+
+Configuration defaults come from the environment:
+- CHALKTALK_HTTP_FIXTURES: "record" or "replay" (unset: live network only)
+- CHALKTALK_HTTP_FIXTURES_DIR: fixture store (default fixtures/http)
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import urllib.parse
+import uuid
+
+MODES = ("record", "replay")
+
+DEFAULT_MODE = os.getenv("CHALKTALK_HTTP_FIXTURES") or None
+DEFAULT_FIXTURES_DIR = os.getenv(
+    "CHALKTALK_HTTP_FIXTURES_DIR", os.path.join("fixtures", "http")
+)
+
+# Headers that describe how a body was sent rather than the body itself
+_WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class FixtureNotFoundError(LookupError):
+    """Raised in replay mode for a request that was never recorded."""
+
+    def __init__(self, method, url, key):
+        super().__init__(f"No HTTP fixture for {method} {url} (key {key[:12]})")
+        self.key = key
+
+
+def request_key(method, url, body):
+    """
+    Returns the fixture key of a request.
+
+    Parameters:
+    - method (str): HTTP method.
+    - url (str): Request URL; only the path and query are used.
+    - body (bytes or str): Request body; JSON bodies are canonicalized so key
+      order and whitespace do not matter.
+    """
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="surrogateescape")
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        body = body or ""
+    parts = urllib.parse.urlsplit(url)
+    payload = json.dumps(
+        {
+            "method": method.upper(),
+            "path": parts.path,
+            "query": parts.query,
+            "body": body,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+class FixtureStore:
+    """
+    On-disk store of recorded responses, one compressed file per request key.
+
+    Parameters:
+    - fixtures_dir (str): Directory holding the fixtures.
+    """
+
+    def __init__(self, fixtures_dir=DEFAULT_FIXTURES_DIR):
+        self.fixtures_dir = fixtures_dir
+        self.hits = 0
+        self.misses = 0
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.fixtures_dir, key[:2], f"{key}.json.gz")
+
+    def get(self, key):
+        """
+        Looks up a recorded response.
+
+        Returns:
+        - tuple: (status, content_type, body bytes), or None if not recorded.
+        """
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        if entry.get("encoding") == "base64":
+            body = base64.b64decode(entry["body"])
+        else:
+            body = entry["body"].encode("utf-8")
+        return entry["status"], entry.get("content_type"), body
+
+    def put(self, key, method, url, status, content_type, body):
+        """Saves a response; the write is atomic, so concurrent records are safe."""
+        entry = {
+            "method": method.upper(),
+            "path": urllib.parse.urlsplit(url).path,
+            "status": status,
+            "content_type": content_type,
+        }
+        try:
+            entry["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body"] = base64.b64encode(body).decode("ascii")
+            entry["encoding"] = "base64"
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.records += 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "records": self.records}
+
+
+def _check_mode(mode):
+    if mode not in MODES:
+        raise ValueError(f"Unknown HTTP fixture mode {mode!r}; expected one of {MODES}")
+    return mode
+
+
+def fixture_adapter(mode=DEFAULT_MODE, store=None, **adapter_options):
+    """
+    Returns a requests transport adapter that records or replays responses.
+
+    Parameters:
+    - mode (str): "record" or "replay".
+    - store (FixtureStore): Defaults to the shared store.
+    - adapter_options: Passed to requests.adapters.HTTPAdapter (pool sizes).
+    """
+    import io
+
+    import requests
+    from urllib3.response import HTTPResponse
+
+    mode = _check_mode(mode)
+    store = store or get_fixture_store()
+
+    class FixtureAdapter(requests.adapters.HTTPAdapter):
+        def send(self, request, **kwargs):
+            key = request_key(request.method, request.url, request.body)
+            if mode == "replay":
+                entry = store.get(key)
+                if entry is None:
+                    raise FixtureNotFoundError(request.method, request.url, key)
+                status, content_type, body = entry
+                raw = HTTPResponse(
+                    body=io.BytesIO(body),
+                    headers={"Content-Type": content_type or "application/json"},
+                    status=status,
+                    preload_content=False,
+                )
+                return self.build_response(request, raw)
+
+            response = super().send(request, **kwargs)
+            # Reads a streamed body too; iter_lines then serves it from memory
+            body = response.content
+            if response.ok:
+                store.put(
+                    key,
+                    request.method,
+                    request.url,
+                    response.status_code,
+                    response.headers.get("Content-Type"),
+                    body,
+                )
+            return response
+
+    return FixtureAdapter(**adapter_options)
+
+
+def fixture_transport(mode=DEFAULT_MODE, store=None, **transport_options):
+    """
+    Returns an httpx async transport that records or replays responses.
+
+    Parameters:
+    - mode (str): "record" or "replay".
+    - store (FixtureStore): Defaults to the shared store.
+    - transport_options: Passed to httpx.AsyncHTTPTransport (limits, ...).
+    """
+    import httpx
+
+    mode = _check_mode(mode)
+    store = store or get_fixture_store()
+
+    class FixtureTransport(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self.transport = httpx.AsyncHTTPTransport(**transport_options)
+
+        async def handle_async_request(self, request):
+            key = request_key(request.method, str(request.url), request.content)
+            if mode == "replay":
+                entry = store.get(key)
+                if entry is None:
+                    raise FixtureNotFoundError(request.method, str(request.url), key)
+                status, content_type, body = entry
+                return httpx.Response(
+                    status,
+                    headers={"Content-Type": content_type or "application/json"},
+                    content=body,
+                )
+
+            response = await self.transport.handle_async_request(request)
+            body = await httpx.Response(
+                response.status_code,
+                headers=response.headers,
+                stream=response.stream,
+            ).aread()
+            status = response.status_code
+            content_type = response.headers.get("Content-Type")
+            if status < 400:
+                store.put(
+                    key, request.method, str(request.url), status, content_type, body
+                )
+            # Keep the upstream headers (Retry-After on a 429, ...); the body is
+            # already decoded, so drop the ones describing its wire encoding
+            headers = [
+                (name, value)
+                for name, value in response.headers.multi_items()
+                if name.lower() not in _WIRE_HEADERS
+            ]
+            return httpx.Response(status, headers=headers, content=body)
+
+        async def aclose(self):
+            await self.transport.aclose()
+
+    return FixtureTransport()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_fixture_store():
+    """Returns the process-wide fixture store."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = FixtureStore()
+        return _default_store
@@ -4,19 +4,94 @@
 
 
 import os
-import requests
 import json
+import functools
+import contextlib
 from datetime import datetime
-from local_settings import ELEVENLABS_API_KEY, OPENROUTER_API_KEY
+
+import tracing
+
+# Heavy dependencies (requests, bs4) and credentials are loaded on first use so
+# that importing this module stays cheap for Shiny workers and CLI invocations.
 
 # Initialize the OpenAI client
 # client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-chalktalk_demo = open("assets/chalktalk_demo_for_llm.qmd").read()
+CHALKTALK_DEMO_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "assets", "chalktalk_demo_for_llm.qmd"
+)
 
 
-def generate_slides(topic: str, title: str, num_slides: int, chalktalk_demo: str):
-    prompt = f"""
+@functools.lru_cache(maxsize=None)
+def load_chalktalk_demo():
+    """Returns the demo deck used as a formatting example in the LLM prompt."""
+    with open(CHALKTALK_DEMO_PATH, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def __getattr__(name):
+    # Keep `presentation_utils.chalktalk_demo` working without reading it at import
+    if name == "chalktalk_demo":
+        return load_chalktalk_demo()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io/v1")
+# "record" or "replay" provider traffic (see http_fixtures)
+HTTP_FIXTURES = os.getenv("CHALKTALK_HTTP_FIXTURES") or None
+
+_http_session = None
+
+
+def get_http_session():
+    """
+    Returns a process-wide requests.Session so repeated API calls reuse
+    keep-alive connections instead of paying a TCP+TLS handshake each time.
+    With CHALKTALK_HTTP_FIXTURES set, responses are recorded or replayed.
+    """
+    global _http_session
+    if _http_session is None:
+        import requests
+
+        session = requests.Session()
+        if HTTP_FIXTURES:
+            from http_fixtures import fixture_adapter
+
+            adapter = fixture_adapter(HTTP_FIXTURES, pool_connections=4, pool_maxsize=32)
+        else:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_session = session
+    return _http_session
+
+
+def get_api_key(name):
+    """
+    Resolves an API key from the environment, falling back to local_settings.py.
+
+    Parameters:
+    - name (str): Setting name, e.g. "ELEVENLABS_API_KEY".
+
+    Returns:
+    - str: The key, or None if it is not configured anywhere.
+    """
+    value = os.getenv(name)
+    if value:
+        return value
+    try:
+        import local_settings
+    except ImportError:
+        return None
+    return getattr(local_settings, name, None)
+
+
+OPENROUTER_MODEL = "anthropic/claude-sonnet-4"
+
+
+def build_slides_prompt(topic: str, title: str, num_slides: int, chalktalk_demo: str):
+    return f"""
 Please create a presentation titled "{title}" on the topic described below: "{topic}". It should consist of {num_slides} slides.
 
 Each slide should have a title and content formatted as per the following chalktalk demo:
@@ -30,37 +105,116 @@ Important:
 
 Please provide the output directly in the required format, without any additional explanations or JSON formatting.
 """
-    # completion = client.chat.completions.create(
-    #     model="o1",
-    #     messages=[{"role": "user", "content": prompt}]
-    # )
-    # return completion.choices[0].message.content
 
+
+def _openrouter_request_args(prompt, stream=False):
     # Add OpenRouter API call
-    openrouter_api_key = OPENROUTER_API_KEY
+    openrouter_api_key = get_api_key("OPENROUTER_API_KEY")
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    url = f"{OPENROUTER_BASE_URL}/chat/completions"
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {openrouter_api_key}",
     }
     payload = {
-        "model": "anthropic/claude-sonnet-4",
+        "model": OPENROUTER_MODEL,
         "messages": [{"role": "user", "content": prompt}],
     }
+    if stream:
+        payload["stream"] = True
+    return url, headers, payload
 
-    response = requests.post(url, headers=headers, data=json.dumps(payload))
-    response.raise_for_status()
 
-    reply = response.json()
-    content = reply.get("choices", [{}])[0].get("message", {}).get("content")
+def generate_slides(topic: str, title: str, num_slides: int, chalktalk_demo: str):
+    prompt = build_slides_prompt(topic, title, num_slides, chalktalk_demo)
+    # completion = client.chat.completions.create(
+    #     model="o1",
+    #     messages=[{"role": "user", "content": prompt}]
+    # )
+    # return completion.choices[0].message.content
+
+    url, headers, payload = _openrouter_request_args(prompt)
 
-    if content is None:
-        raise ValueError("Failed to extract content from OpenRouter API response.")
+    def post():
+        response = get_http_session().post(
+            url, headers=headers, data=json.dumps(payload)
+        )
+        response.raise_for_status()
+        return response.json()
+
+    # Retries 429/5xx with backoff under the shared OpenRouter budget
+    with tracing.span(
+        "llm.generate", model=OPENROUTER_MODEL, num_slides=num_slides, stream=False
+    ) as span:
+        reply = get_scheduler("openrouter").call(post)
+        content = reply.get("choices", [{}])[0].get("message", {}).get("content")
+
+        if content is None:
+            raise ValueError("Failed to extract content from OpenRouter API response.")
+        span.set(characters=len(content))
 
     return content
 
 
+def generate_slides_stream(
+    topic: str, title: str, num_slides: int, chalktalk_demo: str
+):
+    """
+    Streaming variant of generate_slides.
+
+    Consumes OpenRouter's server-sent events and yields the slide markdown piece
+    by piece as tokens arrive, so callers can show partial output immediately.
+
+    Yields:
+    - str: Text deltas; their concatenation equals generate_slides' result.
+    """
+    prompt = build_slides_prompt(topic, title, num_slides, chalktalk_demo)
+    url, headers, payload = _openrouter_request_args(prompt, stream=True)
+
+    def connect():
+        response = get_http_session().post(
+            url, headers=headers, data=json.dumps(payload), stream=True
+        )
+        response.raise_for_status()
+        return response
+
+    # Only establishing the stream is retried; a dropped stream fails the call.
+    # The span is only current while a delta is being read, so work the caller
+    # does between deltas is not attributed to the LLM
+    yield from tracing.trace_iter(
+        "llm.generate",
+        lambda span: _stream_deltas(get_scheduler("openrouter").call(connect), span),
+        model=OPENROUTER_MODEL,
+        num_slides=num_slides,
+        stream=True,
+    )
+
+
+def _stream_deltas(response, span):
+    received = 0
+    with response:
+        # SSE is UTF-8; requests would otherwise yield bytes without a charset
+        response.encoding = "utf-8"
+        for line in response.iter_lines(decode_unicode=True):
+            # Blank lines separate events; lines starting with ':' are keep-alives
+            if not line or line.startswith(":") or not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            if "error" in event:
+                raise ValueError(f"OpenRouter stream error: {event['error']}")
+            delta = event.get("choices", [{}])[0].get("delta", {}).get("content")
+            if delta:
+                received += len(delta)
+                span.set(characters=received)
+                yield delta
+
+    if not received:
+        raise ValueError("Failed to extract content from OpenRouter API response.")
+
+
 def format_presentation_for_qmd(presentation):
     """Assuming presentation.content[0].text contains the markdown content."""
     qmd_content = """---
@@ -94,14 +248,89 @@ format:
 
 
 # | eval: false
-from subprocess import call
+import subprocess
+import threading
+from concurrent.futures import CancelledError
+from asset_store import dedupe_rendered_assets, release_rendered_assets
 
 # call(["quarto", "render", "test_presentation.qmd"])
 
+
+def render_qmd(qmd_file, cancel_event=None, share_assets=True, execute_daemon=None):
+    """
+    Renders a QMD file with Quarto.
+
+    The app renders through render_service.get_render_service(), which queues
+    calls to this function and keeps Jupyter kernels warm.
+
+    Parameters:
+    - qmd_file (str): Path to the QMD file.
+    - cancel_event (threading.Event): When set, the Quarto process is terminated.
+    - share_assets (bool): Hardlink the deck's reveal.js files into the shared
+      asset store instead of keeping a private copy.
+    - execute_daemon (int): Keep the Jupyter kernel alive for this many seconds
+      after the render (quarto render --execute-daemon).
+
+    Raises:
+    - subprocess.CalledProcessError: If Quarto fails.
+    - concurrent.futures.CancelledError: If cancel_event was set.
+    """
+    if share_assets:
+        # Never let Quarto rewrite files other decks link to
+        release_rendered_assets(qmd_file)
+
+    command = ["quarto", "render", qmd_file]
+    if execute_daemon:
+        command += ["--execute-daemon", str(execute_daemon)]
+    with tracing.span(
+        "quarto.render", qmd=qmd_file, warm_kernel=bool(execute_daemon)
+    ):
+        process = subprocess.Popen(command)
+        while True:
+            try:
+                returncode = process.wait(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel_event is not None and cancel_event.is_set():
+                    process.terminate()
+                    process.wait()
+                    raise CancelledError()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command)
+
+    if share_assets:
+        report = dedupe_rendered_assets(qmd_file)
+        print(
+            f"Shared {report['linked']} of {report['files']} deck assets, "
+            f"saved {report['bytes_saved'] / 1e6:.1f} MB"
+        )
+
+
 # %%
 import uuid
 import re
 import base64
+import hashlib
+import shutil
+import tempfile
+import concurrent.futures
+from audio_cache import AudioCache, get_default_cache
+from audio_utils import (
+    alignment_duration,
+    audio_mime_type,
+    get_audio_duration,
+    mp3_bytes_duration,
+    read_clip_metadata,
+    write_clip_metadata,
+)
+from render_manifest import RenderManifest
+from audio_transcode import ClipTranscoder, DEFAULT_FORMAT as DEFAULT_AUDIO_FORMAT
+from tts_scheduler import TTSError, get_scheduler
+from tts_providers import clip_path, get_provider, group_lines, restore_cached_clip
+from render_service import get_render_service
+
+DEFAULT_VOICE = "TX3LPaxmHKxFdv7VOQHJ"
+DEFAULT_MODEL = "eleven_multilingual_v2"
 
 
 def create_presentation_directory(title: str) -> tuple[str, str]:
@@ -133,17 +362,131 @@ def create_presentation_directory(title: str) -> tuple[str, str]:
     return base_dir, media_dir
 
 
+def tts_cache_key(text, voice, model, voice_settings=None):
+    """Returns the audio cache key for an ElevenLabs TTS request."""
+    return AudioCache.key(
+        provider="elevenlabs",
+        text=text,
+        voice=voice,
+        model=model,
+        voice_settings=voice_settings,
+    )
+
+
+def _elevenlabs_request_args(text, api_key, voice, model, voice_settings=None):
+    url = f"{ELEVENLABS_BASE_URL}/text-to-speech/{voice}/with-timestamps"
+    headers = {
+        "Content-Type": "application/json",
+        "xi-api-key": api_key,
+    }
+    payload = {
+        "text": text,
+        "model_id": model,
+    }
+    if voice_settings:
+        payload["voice_settings"] = voice_settings
+    return url, headers, payload
+
+
+def request_elevenlabs_tts(text, api_key, voice, model, voice_settings=None):
+    """
+    Sends one request to the ElevenLabs /with-timestamps endpoint.
+
+    Returns:
+    - dict: The JSON reply (audio_base64, alignment, normalized_alignment).
+    """
+    url, headers, payload = _elevenlabs_request_args(
+        text, api_key, voice, model, voice_settings
+    )
+    response = get_http_session().post(url, headers=headers, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+async def request_elevenlabs_tts_async(
+    client, text, api_key, voice, model, voice_settings=None
+):
+    """Async counterpart of request_elevenlabs_tts using a pooled httpx.AsyncClient."""
+    url, headers, payload = _elevenlabs_request_args(
+        text, api_key, voice, model, voice_settings
+    )
+    response = await client.post(url, headers=headers, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+def _voiceover_clip_path(audio_dir, line, key):
+    # Name the clip after its cache key so identical requests map to one file
+    return clip_path(audio_dir, line, key)
+
+
+def _restore_cached_clip(cache, key, file_path):
+    """Materializes a cached clip and its sidecar; returns False on a miss."""
+    return restore_cached_clip(cache, key, file_path, get_audio_duration)
+
+
+def _save_elevenlabs_clip(reply, file_path, line, voice, model, key, cache):
+    """Writes a /with-timestamps reply to file_path with its sidecar and caches it."""
+    # Decode the base64 audio content
+    audio_data = base64.b64decode(reply["audio_base64"])
+
+    # Save to local file (unlink first: it may be a hardlink into the cache)
+    with tracing.span("file.write", path=file_path, bytes=len(audio_data)):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        with open(file_path, "wb") as f:
+            f.write(audio_data)
+
+    # Time the clip from its frames (the bytes are already in memory); the
+    # alignment ends at the last character, before any trailing silence, so it
+    # is only a fallback
+    alignment = reply.get("alignment") or reply.get("normalized_alignment")
+    duration_sec = mp3_bytes_duration(audio_data)
+    if duration_sec is None:
+        duration_sec = alignment_duration(alignment)
+    if duration_sec is None:
+        duration_sec = get_audio_duration(file_path)
+    metadata = {
+        "text": line,
+        "voice": voice,
+        "model": model,
+        "duration_ms": int(duration_sec * 1000),
+        "alignment": alignment,
+    }
+    write_clip_metadata(file_path, metadata)
+
+    if cache:
+        cache.put(key, file_path, metadata=metadata)
+
+
+def _raise_for_failures(script_lines, failures):
+    for idx, error in failures.items():
+        print(f"Error processing line {idx}: {error}")
+    if failures:
+        raise TTSError(
+            f"{len(failures)} of {len(script_lines)} voiceover lines failed",
+            failures={script_lines[idx]: error for idx, error in failures.items()},
+        )
+
+
 def fetch_voiceover_elevenlabs(
     script_lines,
     output_dir,  # This will now be the media/audio directory
     api_key=None,
-    voice="TX3LPaxmHKxFdv7VOQHJ",  # voice ID
-    model="eleven_multilingual_v2",
-    max_workers=1,
+    voice=DEFAULT_VOICE,  # voice ID
+    model=DEFAULT_MODEL,
+    max_workers=None,
+    voice_settings=None,
+    cache=None,
+    scheduler=None,
+    on_clip=None,
+    cancel_event=None,
 ):
     """
     Fetches voiceover audio files from ElevenLabs API for each line in script_lines.
-    Uses concurrent processing to speed up the fetch operations.
+    Requests go through the shared ElevenLabs scheduler, which bounds the request
+    rate and concurrency, honours 429 Retry-After and retries transient errors.
+    Clips already present in the shared audio cache are reused without an API call.
 
     Parameters:
     - script_lines (list of str): Lines of text to convert to speech.
@@ -151,66 +494,278 @@ def fetch_voiceover_elevenlabs(
     - api_key (str): ElevenLabs API key.
     - voice (str): Voice ID for ElevenLabs TTS.
     - model (str): ElevenLabs model ID.
-    - max_workers (int): Maximum number of workers for concurrent processing.
+    - max_workers (int): Deprecated; concurrency is set by the scheduler
+      (CHALKTALK_ELEVENLABS_CONCURRENCY).
+    - voice_settings (dict): Optional ElevenLabs voice settings (stability, etc.).
+    - cache (AudioCache): Audio cache to consult; defaults to the shared cache.
+      Pass False to always call the API.
+    - scheduler (ProviderScheduler): Defaults to the shared ElevenLabs scheduler.
+    - on_clip (callable): Called with each clip path as soon as it is ready
+      (from worker threads).
+    - cancel_event (threading.Event): When set, lines not yet started are skipped.
 
     Returns:
-    - list of str: Paths to the generated audio files.
+    - list of str: Paths to the generated audio files (None for empty lines).
+
+    Raises:
+    - TTSError: If any line still fails after retries. Clips that succeeded are
+      cached, so a second attempt only requests the failed lines.
+    - concurrent.futures.CancelledError: If cancel_event was set.
     """
     if api_key is None:
-        api_key = os.getenv("ELEVENLABS_API_KEY", ELEVENLABS_API_KEY)
+        api_key = get_api_key("ELEVENLABS_API_KEY")
+    if cache is None:
+        cache = get_default_cache()
+    if scheduler is None:
+        scheduler = get_scheduler("elevenlabs")
 
     audio_dir = os.path.join(output_dir, "audio")
     os.makedirs(audio_dir, exist_ok=True)
 
-    file_paths = [None] * len(script_lines)
+    def fetch_and_save(line):
+        if not line:
+            return None
+        if cancel_event is not None and cancel_event.is_set():
+            raise CancelledError()
+
+        key = tts_cache_key(line, voice, model, voice_settings)
+        file_path = _voiceover_clip_path(audio_dir, line, key)
+        with tracing.span(
+            "tts.clip", provider="elevenlabs", characters=len(line)
+        ) as span:
+            cached = _restore_cached_clip(cache, key, file_path)
+            span.set(cache="hit" if cached else "miss")
+            if not cached:
+                with tracing.span(
+                    "tts.request", provider="elevenlabs", characters=len(line)
+                ) as request_span:
+                    reply = scheduler.call(
+                        request_elevenlabs_tts,
+                        line,
+                        api_key,
+                        voice,
+                        model,
+                        voice_settings,
+                    )
+                    request_span.set(bytes=len(reply.get("audio_base64") or "") * 3 // 4)
+                _save_elevenlabs_clip(reply, file_path, line, voice, model, key, cache)
+
+        if on_clip:
+            on_clip(file_path)
+        return file_path
+
+    # Identical lines share a clip file, so each one is requested once
+    unique, positions = group_lines(
+        script_lines, lambda line: tts_cache_key(line, voice, model, voice_settings)
+    )
+    outcomes = scheduler.map(fetch_and_save, unique)
+    outcomes = [(None, None) if pos is None else outcomes[pos] for pos in positions]
+
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError()
+    failures = {idx: error for idx, (_, error) in enumerate(outcomes) if error}
+    _raise_for_failures(script_lines, failures)
+
+    return [file_path for file_path, _ in outcomes]
+
+
+async def fetch_voiceover_elevenlabs_async(
+    script_lines,
+    output_dir,
+    api_key=None,
+    voice=DEFAULT_VOICE,
+    model=DEFAULT_MODEL,
+    voice_settings=None,
+    cache=None,
+    scheduler=None,
+    client=None,
+):
+    """
+    Async variant of fetch_voiceover_elevenlabs for use inside an event loop.
+
+    All lines are fanned out at once over a pooled keep-alive httpx.AsyncClient;
+    the number of requests in flight is bounded by the shared ElevenLabs scheduler
+    (CHALKTALK_ELEVENLABS_CONCURRENCY). File and cache I/O run in worker threads so
+    the event loop (e.g. the Shiny server) is never blocked.
+
+    Parameters:
+    - client (httpx.AsyncClient): Client to reuse across calls; a pooled client is
+      created and closed for this call if omitted.
+    - Other parameters as in fetch_voiceover_elevenlabs.
+
+    Returns:
+    - list of str: Paths to the generated audio files (None for empty lines).
+
+    Raises:
+    - TTSError: If any line still fails after retries.
+    """
+    import asyncio
+    import httpx
+
+    if api_key is None:
+        api_key = get_api_key("ELEVENLABS_API_KEY")
+    if cache is None:
+        cache = get_default_cache()
+    if scheduler is None:
+        scheduler = get_scheduler("elevenlabs")
+
+    audio_dir = os.path.join(output_dir, "audio")
+    os.makedirs(audio_dir, exist_ok=True)
 
-    def fetch_and_save(args):
-        idx, line = args
+    async def fetch_and_save(line):
         if not line:
-            return idx, None
-
-        # Create filename
-        sanitized = re.sub(r"[^\w\s]", "", line)[:20].replace(" ", "_")
-        file_name = f"{sanitized}_{uuid.uuid4()}.mp3"
-        file_path = os.path.join(audio_dir, file_name)
-
-        try:
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice}/with-timestamps"
-            headers = {
-                "Content-Type": "application/json",
-                "xi-api-key": api_key,
-            }
-            payload = {
-                "text": line,
-                "model_id": model,
-            }
+            return None
+
+        key = tts_cache_key(line, voice, model, voice_settings)
+        file_path = _voiceover_clip_path(audio_dir, line, key)
+        with tracing.span(
+            "tts.clip", provider="elevenlabs", characters=len(line)
+        ) as span:
+            if await asyncio.to_thread(_restore_cached_clip, cache, key, file_path):
+                span.set(cache="hit")
+                return file_path
+            span.set(cache="miss")
+
+            with tracing.span(
+                "tts.request", provider="elevenlabs", characters=len(line)
+            ) as request_span:
+                reply = await scheduler.call_async(
+                    request_elevenlabs_tts_async,
+                    client,
+                    line,
+                    api_key,
+                    voice,
+                    model,
+                    voice_settings,
+                )
+                request_span.set(bytes=len(reply.get("audio_base64") or "") * 3 // 4)
+            await asyncio.to_thread(
+                tracing.bind(_save_elevenlabs_clip),
+                reply,
+                file_path,
+                line,
+                voice,
+                model,
+                key,
+                cache,
+            )
+        return file_path
+
+    owns_client = client is None
+    if owns_client:
+        limits = httpx.Limits(
+            max_connections=scheduler.max_concurrent,
+            max_keepalive_connections=scheduler.max_concurrent,
+        )
+        transport = None
+        if HTTP_FIXTURES:
+            from http_fixtures import fixture_transport
+
+            transport = fixture_transport(HTTP_FIXTURES, limits=limits)
+        client = httpx.AsyncClient(
+            limits=limits, timeout=httpx.Timeout(120.0), transport=transport
+        )
+    unique, positions = group_lines(
+        script_lines, lambda line: tts_cache_key(line, voice, model, voice_settings)
+    )
+    try:
+        outcomes = await asyncio.gather(
+            *(fetch_and_save(line) for line in unique), return_exceptions=True
+        )
+    finally:
+        if owns_client:
+            await client.aclose()
+    outcomes = [None if pos is None else outcomes[pos] for pos in positions]
+
+    failures = {
+        idx: outcome
+        for idx, outcome in enumerate(outcomes)
+        if isinstance(outcome, BaseException)
+    }
+    _raise_for_failures(script_lines, failures)
+
+    return list(outcomes)
+
+
+class VoiceoverPrewarmer:
+    """
+    Synthesizes narration in the background so clips are already in the audio
+    cache when the deck is voiced.
 
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
+    Used to overlap TTS with slow upstream steps (LLM generation, Quarto
+    rendering): scripts are submitted as soon as they are known, and the later
+    voicing pass finds every finished clip as a cache hit. Failures are only
+    reported; the voicing pass retries them.
 
-            # Decode the base64 audio content
-            audio_data = base64.b64decode(response.json()["audio_base64"])
+    Parameters:
+    - voice (str): Voice (must match the later voicing pass); defaults to the
+      provider's default voice.
+    - model (str): ElevenLabs model ID (must match the later voicing pass).
+    - cache (AudioCache): Cache to fill; defaults to the shared cache.
+    - provider (str or TTSProvider): TTS provider; ElevenLabs by default.
+    """
 
-            # Save to local file
-            with open(file_path, "wb") as f:
-                f.write(audio_data)
+    def __init__(self, voice=None, model=DEFAULT_MODEL, cache=None, provider=None):
+        self.provider = get_provider(provider, model=model)
+        self.voice = voice or self.provider.default_voice
+        self.cache = cache if cache is not None else get_default_cache()
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.provider.max_concurrent,
+            thread_name_prefix="tts-prewarm",
+        )
+        # Clips are hardlinked into a scratch directory; the cache keeps them
+        self.scratch_dir = tempfile.mkdtemp(prefix="chalktalk_prewarm_")
+        self.futures = {}
+
+    def submit(self, script):
+        if not script or script in self.futures:
+            return
+        self.futures[script] = self.executor.submit(
+            tracing.bind(self.provider.synthesize),
+            [script],
+            self.scratch_dir,
+            voice=self.voice,
+            cache=self.cache,
+        )
+
+    @property
+    def total(self):
+        return len(self.futures)
+
+    @property
+    def done(self):
+        return sum(1 for future in self.futures.values() if future.done())
+
+    def wait(self, progress=None):
+        """
+        Waits for all submitted scripts.
 
-            return idx, file_path
+        Parameters:
+        - progress (callable): Optional progress(done, total) callback.
+
+        Returns:
+        - int: Number of scripts that failed.
+        """
+        failed = 0
+        for count, future in enumerate(
+            concurrent.futures.as_completed(list(self.futures.values())), start=1
+        ):
+            if future.exception() is not None:
+                failed += 1
+                print(f"Prewarm failed: {future.exception()}")
+            if progress:
+                progress(count, self.total)
+        return failed
 
-        except Exception as e:
-            print(f"Error processing line {idx}: {e}")
-            return idx, None
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(fetch_and_save, (idx, line))
-            for idx, line in enumerate(script_lines)
-        ]
-        for future in concurrent.futures.as_completed(futures):
-            idx, file_path = future.result()
-            file_paths[idx] = file_path
+    def __enter__(self):
+        return self
 
-    return file_paths
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 # Voiceover
@@ -223,11 +778,7 @@ def fetch_voiceover_elevenlabs(
 import os
 import re
 import uuid
-import requests
 from tempfile import gettempdir
-import concurrent.futures
-import time
-import random
 
 
 # %%
@@ -236,7 +787,52 @@ import random
 import os
 import re
 import uuid
-from bs4 import BeautifulSoup
+
+
+# BeautifulSoup backend for rendered decks; set to "lxml" (if installed) for faster parsing
+HTML_PARSER = os.getenv("CHALKTALK_HTML_PARSER", "html.parser")
+
+
+def parse_html(html_content, parser=None):
+    """Parses HTML with the configured BeautifulSoup backend."""
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html_content, parser or HTML_PARSER)
+
+
+def serialize_html(soup):
+    """Serializes a parsed document the way every post-processing step expects."""
+    return soup.prettify(formatter="html")
+
+
+def tag_media_fragments(soup):
+    """
+    Adds a unique data-tts-id to every TTS fragment of a parsed document.
+
+    IDs are derived from each fragment's position and script, so re-rendering
+    the same deck (e.g. finalizing a draft) keeps them stable.
+
+    Returns:
+    - list of tuples: Each tuple contains (script_text, fragment_element, unique_id, media_type).
+    """
+    fragments = []
+
+    with tracing.span("html.extract_fragments") as span:
+        # Find fragments with data-tts
+        tts_fragments = soup.find_all(
+            "div", class_="fragment", attrs={"data-tts": True}
+        )
+        for idx, fragment in enumerate(tts_fragments):
+            script_text = fragment.get("data-tts")
+            script_hash = hashlib.sha256(
+                (script_text or "").encode("utf-8")
+            ).hexdigest()
+            unique_id = f"tts_{idx}_{script_hash[:8]}"
+            fragment["data-tts-id"] = unique_id  # Add unique ID to the fragment
+            fragments.append((script_text, fragment, unique_id, "tts"))
+        span.set(fragments=len(fragments))
+
+    return fragments
 
 
 def extract_media_fragments(html_content):
@@ -250,19 +846,11 @@ def extract_media_fragments(html_content):
     - list of tuples: Each tuple contains (script_text, fragment_element, unique_id, media_type).
     - str: Modified HTML content with unique IDs added to fragments.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    fragments = []
-
-    # Find fragments with data-tts
-    tts_fragments = soup.find_all("div", class_="fragment", attrs={"data-tts": True})
-    for idx, fragment in enumerate(tts_fragments):
-        script_text = fragment.get("data-tts")
-        unique_id = f"tts_{idx}_{uuid.uuid4().hex[:8]}"
-        fragment["data-tts-id"] = unique_id  # Add unique ID to the fragment
-        fragments.append((script_text, fragment, unique_id, "tts"))
+    soup = parse_html(html_content)
+    fragments = tag_media_fragments(soup)
 
     # Convert the modified soup back to a string with proper encoding
-    modified_html_content = soup.prettify(formatter="html")
+    modified_html_content = serialize_html(soup)
     return fragments, modified_html_content
 
 
@@ -288,52 +876,108 @@ def extract_media_fragments(html_content):
 
 
 # %%
-def process_media_fragments(fragments, output_dir, html_dir, max_workers=3):
+def process_media_fragments(
+    fragments,
+    output_dir,
+    html_dir,
+    max_workers=None,
+    voice=None,
+    model=DEFAULT_MODEL,
+    voice_settings=None,
+    cache=None,
+    on_clip=None,
+    cancel_event=None,
+    provider=None,
+):
     """
-    Processes TTS scripts with ElevenLabs and returns media paths along with fragment elements and unique IDs.
+    Processes TTS scripts and returns media paths along with fragment elements and unique IDs.
+    Scripts are voiced by provider (a tts_providers name or instance; ElevenLabs
+    by default) with voice, or the provider's default voice.
+    The shared audio cache is consulted first, so unchanged fragments never reach the API.
+    All scripts are submitted as one batch to the provider;
+    max_workers is deprecated (see CHALKTALK_ELEVENLABS_CONCURRENCY); on_clip and
+    cancel_event are passed through to the provider.
 
     Returns:
     - list of tuples: Each tuple contains (absolute_media_path, relative_media_path, fragment_element, unique_id, media_type).
+
+    Raises:
+    - TTSError: If any fragment could not be voiced after retries.
     """
 
-    def process_fragment(frag_tuple):
-        script, fragment, unique_id, media_type = frag_tuple
-        if script:
-            try:
-                # Add small delay to help with rate limiting
-                time.sleep(random.uniform(0.5, 1.5))
+    if cache is None:
+        cache = get_default_cache()
+
+    provider = get_provider(provider, model=model, voice_settings=voice_settings)
+    tts_fragments = _tts_fragments(fragments)
+    media_paths = provider.synthesize(
+        [script for script, *_ in tts_fragments],
+        output_dir,
+        voice=voice,
+        cache=cache,
+        on_clip=on_clip,
+        cancel_event=cancel_event,
+    )
+    return _fragment_results(tts_fragments, media_paths, html_dir, cache)
+
+
+async def process_media_fragments_async(
+    fragments,
+    output_dir,
+    html_dir,
+    voice=DEFAULT_VOICE,
+    model=DEFAULT_MODEL,
+    voice_settings=None,
+    cache=None,
+    client=None,
+):
+    """
+    Async variant of process_media_fragments built on fetch_voiceover_elevenlabs_async.
 
-                if media_type == "tts":
-                    media_paths = fetch_voiceover_elevenlabs(
-                        [script], output_dir=output_dir
-                    )
-                else:
-                    return None
-
-                if media_paths and media_paths[0]:
-                    absolute_media_path = media_paths[0]
-                    # Calculate relative path from HTML file to media file
-                    relative_media_path = os.path.relpath(absolute_media_path, html_dir)
-                    return (
-                        absolute_media_path,
-                        relative_media_path,
-                        fragment,
-                        unique_id,
-                        media_type,
-                    )
-            except Exception as e:
-                print(f"Error processing fragment {unique_id}: {e}")
-        return None
+    Returns:
+    - list of tuples: Same as process_media_fragments.
+    """
+    if cache is None:
+        cache = get_default_cache()
+
+    tts_fragments = _tts_fragments(fragments)
+    media_paths = await fetch_voiceover_elevenlabs_async(
+        [script for script, *_ in tts_fragments],
+        output_dir=output_dir,
+        voice=voice,
+        model=model,
+        voice_settings=voice_settings,
+        cache=cache,
+        client=client,
+    )
+    return _fragment_results(tts_fragments, media_paths, html_dir, cache)
+
+
+def _tts_fragments(fragments):
+    return [
+        frag_tuple
+        for frag_tuple in fragments
+        if frag_tuple[0] and frag_tuple[3] == "tts"
+    ]
 
+
+def _fragment_results(tts_fragments, media_paths, html_dir, cache):
     results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(process_fragment, frag_tuple) for frag_tuple in fragments
-        ]
-        for future in concurrent.futures.as_completed(futures):
-            result = future.result()
-            if result:
-                results.append(result)
+    for (script, fragment, unique_id, media_type), absolute_media_path in zip(
+        tts_fragments, media_paths
+    ):
+        # Calculate relative path from HTML file to media file
+        relative_media_path = os.path.relpath(absolute_media_path, html_dir)
+        results.append(
+            (absolute_media_path, relative_media_path, fragment, unique_id, media_type)
+        )
+
+    if cache:
+        stats = cache.stats()
+        print(
+            f"TTS cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evictions"
+        )
 
     return results
 
@@ -353,18 +997,24 @@ def process_media_fragments(fragments, output_dir, html_dir, max_workers=3):
 # %%
 
 import os
-import librosa
-from bs4 import BeautifulSoup
 
 
-def insert_media_elements(html_content, processed_fragments):
+def attach_media_elements(soup, processed_fragments, durations=None):
     """
-    Inserts audio elements into the HTML using unique identifiers for precise matching.
+    Inserts audio elements into a parsed document using the fragments' unique IDs.
 
-    Returns:
-    - str: Modified HTML content with media elements inserted.
+    Parameters:
+    - soup (BeautifulSoup): Document previously tagged by tag_media_fragments.
+    - processed_fragments (list): Tuples returned by process_media_fragments.
+    - durations (dict): Optional map of absolute media path -> duration in ms.
+      Known durations are used as-is; probed durations are added to the map.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
+    # Index fragments once instead of searching the whole tree per clip
+    fragments_by_id = {}
+    for media_type in {item[4] for item in processed_fragments}:
+        attr = f"data-{media_type}-id"
+        for elem in soup.find_all("div", attrs={attr: True}):
+            fragments_by_id[(media_type, elem[attr])] = elem
 
     for (
         absolute_media_path,
@@ -375,20 +1025,24 @@ def insert_media_elements(html_content, processed_fragments):
     ) in processed_fragments:
 
         # Find the corresponding fragment using the unique ID
-        matching_fragment = soup.find("div", attrs={f"data-{media_type}-id": unique_id})
+        matching_fragment = fragments_by_id.get((media_type, unique_id))
 
         if matching_fragment:
             # Get actual media duration
-            if os.path.isfile(absolute_media_path):
+            if durations and absolute_media_path in durations:
+                duration_ms = durations[absolute_media_path]
+            elif os.path.isfile(absolute_media_path):
                 if media_type == "tts":
-                    duration_sec = librosa.get_duration(path=absolute_media_path)
+                    duration_sec = get_audio_duration(absolute_media_path)
                 else:
                     print(f"Unknown media type: {media_type}")
                     continue
+                duration_ms = int(duration_sec * 1000)
+                if durations is not None:
+                    durations[absolute_media_path] = duration_ms
             else:
                 print(f"Media file not found: {absolute_media_path}")
                 continue
-            duration_ms = int(duration_sec * 1000)
 
             # Set the autoslide attribute
             matching_fragment["data-autoslide"] = f"{int(duration_ms)}"
@@ -397,7 +1051,11 @@ def insert_media_elements(html_content, processed_fragments):
                 # Create audio element
                 media_tag = soup.new_tag("audio", attrs={"data-autoplay": ""})
                 source = soup.new_tag(
-                    "source", attrs={"src": relative_media_path, "type": "audio/mpeg"}
+                    "source",
+                    attrs={
+                        "src": relative_media_path,
+                        "type": audio_mime_type(relative_media_path),
+                    },
                 )
                 media_tag.append(source)
             else:
@@ -410,7 +1068,146 @@ def insert_media_elements(html_content, processed_fragments):
                 f"Added {media_type} {relative_media_path} with duration {duration_ms}ms to fragment ID: {unique_id}"
             )
 
-    return soup.prettify(formatter="html")
+
+
+# Plays each slide's joined clip, seeking to the cue of the fragment being shown
+SECTION_AUDIO_SCRIPT = """
+    document.addEventListener("DOMContentLoaded", function () {
+      function sectionAudio(fragment) {
+        const section = fragment.closest("section");
+        return section && section.querySelector(":scope > audio[data-section-audio]");
+      }
+
+      Reveal.on("fragmentshown", event => {
+        const fragment = event.fragment;
+        if (!fragment.hasAttribute("data-cue-start")) return;
+        const audio = sectionAudio(fragment);
+        if (!audio) return;
+        const start = parseFloat(fragment.getAttribute("data-cue-start"));
+        // Consecutive fragments play straight through; only seek on a jump
+        if (Math.abs(audio.currentTime - start) > 0.3) audio.currentTime = start;
+        audio.play();
+      });
+
+      Reveal.on("fragmenthidden", event => {
+        const audio = sectionAudio(event.fragment);
+        if (audio) audio.pause();
+      });
+
+      Reveal.on("slidechanged", event => {
+        if (!event.previousSlide) return;
+        event.previousSlide.querySelectorAll("audio[data-section-audio]").forEach(audio => audio.pause());
+      });
+
+      Reveal.on("autoslidepaused", () => {
+        const audio = Reveal.getCurrentSlide().querySelector("audio[data-section-audio]");
+        if (audio) audio.pause();
+      });
+    });
+    """
+
+
+def attach_section_audio(
+    soup, processed_fragments, media_dir, html_dir, durations=None
+):
+    """
+    Joins the clips of each slide into one audio file with a cue table.
+
+    Each <section> gets a single preloaded <audio data-section-audio> and its
+    fragments get data-cue-start/data-cue-end offsets (seconds) into it; the
+    injected player seeks to the cue when a fragment is shown. One request per
+    slide instead of one per fragment, and no load gap between fragments.
+    Slides whose clips cannot be joined without re-encoding keep one <audio>
+    per fragment.
+
+    Parameters:
+    - soup (BeautifulSoup): Document previously tagged by tag_media_fragments.
+    - processed_fragments (list): Tuples returned by process_media_fragments.
+    - media_dir (str): Media directory; joined files go to its audio/ folder.
+    - html_dir (str): Directory relative media paths are resolved from.
+    - durations (dict): Optional map of absolute media path -> duration in ms,
+      filled in for every clip as in attach_media_elements.
+    """
+    from audio_utils import concat_mp3
+
+    fragments_by_id = {
+        elem["data-tts-id"]: elem
+        for elem in soup.find_all("div", attrs={"data-tts-id": True})
+    }
+
+    # Group clips by slide, keeping document order within each slide
+    sections = {}
+    for item in processed_fragments:
+        absolute_media_path, _, _, unique_id, media_type = item
+        fragment = fragments_by_id.get(unique_id) if media_type == "tts" else None
+        if fragment is None:
+            continue
+        if not os.path.isfile(absolute_media_path):
+            print(f"Media file not found: {absolute_media_path}")
+            continue
+        section = fragment.find_parent("section")
+        sections.setdefault(id(section), (section, []))[1].append((item, fragment))
+
+    joined = 0
+    for section, items in sections.values():
+        clip_paths = [item[0] for item, _ in items]
+        digest = hashlib.sha256(
+            "\n".join(os.path.basename(path) for path in clip_paths).encode("utf-8")
+        ).hexdigest()[:16]
+        section_path = os.path.join(media_dir, "audio", f"section_{digest}.mp3")
+        cues = concat_mp3(clip_paths, section_path) if section is not None else None
+
+        if cues is None:
+            fallback = [item for item, _ in items]
+            attach_media_elements(soup, fallback, durations=durations)
+            continue
+
+        for (item, fragment), (start, end) in zip(items, cues):
+            duration_ms = int((end - start) * 1000)
+            if durations is not None:
+                durations.setdefault(item[0], duration_ms)
+            fragment["data-autoslide"] = f"{duration_ms}"
+            fragment["data-cue-start"] = f"{start:.3f}"
+            fragment["data-cue-end"] = f"{end:.3f}"
+
+        media_tag = soup.new_tag(
+            "audio", attrs={"data-section-audio": "", "preload": "auto"}
+        )
+        media_tag.append(
+            soup.new_tag(
+                "source",
+                attrs={
+                    "src": os.path.relpath(section_path, html_dir),
+                    "type": "audio/mpeg",
+                },
+            )
+        )
+        section.append(media_tag)
+        joined += 1
+        print(f"Joined {len(items)} clips into {section_path}")
+
+    if joined:
+        script = soup.new_tag("script")
+        script.string = SECTION_AUDIO_SCRIPT
+        body_tag = soup.find("body")
+        if body_tag:
+            body_tag.append(script)
+
+
+def insert_media_elements(html_content, processed_fragments, durations=None):
+    """
+    Inserts audio elements into the HTML using unique identifiers for precise matching.
+
+    Parameters:
+    - durations (dict): Optional map of absolute media path -> duration in ms.
+      Known durations are used as-is; probed durations are added to the map.
+
+    Returns:
+    - str: Modified HTML content with media elements inserted.
+    """
+    soup = parse_html(html_content)
+    attach_media_elements(soup, processed_fragments, durations=durations)
+    return serialize_html(soup)
 
 
 # Example usage:
@@ -425,19 +1222,135 @@ def insert_media_elements(html_content, processed_fragments):
 # %%
 
 
-from bs4 import BeautifulSoup
 import re
 
 
-def modify_html_for_autoslide_and_controls(html_content):
+# Audio prefetch window, in clips ahead of the current fragment and total bytes held
+PREFETCH_AHEAD = int(os.getenv("CHALKTALK_PREFETCH_AHEAD", "3"))
+PREFETCH_BUDGET_BYTES = int(
+    os.getenv("CHALKTALK_PREFETCH_BUDGET_BYTES", str(16 * 1024 * 1024))
+)
+
+# Fetches the next clips into Blob URLs ahead of playback (falling back to
+# preload="auto" where fetch is not allowed, e.g. file://), drops clips already
+# played once over budget, and times fragments from the loaded audio duration.
+# A clip that started playing before its fetch finished keeps streaming from
+# its original source. Joined section audio is left to its own preload="auto".
+PREFETCH_SCRIPT = """
+    document.addEventListener("DOMContentLoaded", function () {
+      const AHEAD = %(ahead)d;
+      const BUDGET_BYTES = %(budget)d;
+      const clips = Array.from(
+        document.querySelectorAll(".reveal .slides audio:not([data-section-audio])")
+      );
+      const held = new Map(); // audio element -> bytes held as a Blob URL
+      let heldBytes = 0;
+
+      // Swapping the source of a started clip would abort and rewind it
+      function started(audio) {
+        return !audio.paused || audio.currentTime > 0;
+      }
+
+      function sourceOf(audio) {
+        const source = audio.querySelector("source[src]");
+        return source && !source.src.startsWith("blob:") ? source : null;
+      }
+
+      function release(audio) {
+        const source = audio.querySelector("source");
+        URL.revokeObjectURL(source.src);
+        source.src = source.dataset.originalSrc;
+        heldBytes -= held.get(audio);
+        held.delete(audio);
+        audio.preload = "none";
+        audio.load();
+      }
+
+      function makeRoom(bytes, position) {
+        // Only evict clips behind the playback position, oldest first
+        for (const audio of held.keys()) {
+          if (heldBytes + bytes <= BUDGET_BYTES) break;
+          if (clips.indexOf(audio) < position && audio.paused) release(audio);
+        }
+        return heldBytes + bytes <= BUDGET_BYTES;
+      }
+
+      function prefetch(audio, position) {
+        const source = sourceOf(audio);
+        if (!source || audio.dataset.prefetch) return;
+        audio.dataset.prefetch = "pending";
+        fetch(source.src)
+          .then(response => {
+            if (!response.ok) throw new Error(response.status);
+            return response.blob();
+          })
+          .then(blob => {
+            if (started(audio)) return;
+            if (!makeRoom(blob.size, position)) {
+              audio.preload = "auto";
+              return;
+            }
+            source.dataset.originalSrc = source.getAttribute("src");
+            source.src = URL.createObjectURL(blob);
+            held.set(audio, blob.size);
+            heldBytes += blob.size;
+            audio.load();
+          })
+          .catch(() => {
+            audio.preload = "auto";
+            if (!started(audio)) audio.load();
+          })
+          .finally(() => {
+            audio.dataset.prefetch = "done";
+          });
+      }
+
+      function positionOf(element) {
+        const index = clips.findIndex(audio =>
+          element.contains(audio) ||
+          element.compareDocumentPosition(audio) & Node.DOCUMENT_POSITION_FOLLOWING
+        );
+        return index < 0 ? clips.length : index;
+      }
+
+      function prefetchFrom(element) {
+        if (!element) return;
+        const position = positionOf(element);
+        clips.slice(position, position + AHEAD).forEach(audio => prefetch(audio, position));
+      }
+
+      // Time each fragment from its clip's real duration once it is known
+      clips.forEach(audio => {
+        audio.addEventListener("loadedmetadata", () => {
+          const fragment = audio.closest(".fragment");
+          if (!fragment || !audio.hasAttribute("data-autoplay") || !isFinite(audio.duration)) return;
+          const duration = Math.round(audio.duration * 1000);
+          fragment.setAttribute("data-original-autoslide", duration);
+          fragment.setAttribute("data-autoslide", Math.round(duration / (audio.playbackRate || 1)));
+        });
+      });
+
+      if (Reveal.isReady()) prefetchFrom(Reveal.getCurrentSlide());
+      else Reveal.on("ready", event => prefetchFrom(event.currentSlide));
+      Reveal.on("slidechanged", event => prefetchFrom(event.currentSlide));
+      Reveal.on("fragmentshown", event => prefetchFrom(event.fragment));
+    });
     """
-    Modifies the HTML content to:
+
+
+def add_autoslide_and_controls(
+    soup, prefetch_ahead=PREFETCH_AHEAD, prefetch_budget_bytes=PREFETCH_BUDGET_BYTES
+):
+    """
+    Modifies a parsed document in place to:
     - Set data-autoslide="0" on the first slide.
     - Add a 'Start Presentation' button to the first slide.
     - Ensure subsequent slides auto-advance.
     - Add playback speed and volume control JavaScript code.
+    - Prefetch the audio of the next prefetch_ahead clips, holding at most
+      prefetch_budget_bytes, and time fragments from the loaded clip durations.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
+    from bs4 import BeautifulSoup
 
     # Add empty fragment to beginning of each section (except the first one)
     sections = soup.find_all("section")
@@ -583,8 +1496,34 @@ def modify_html_for_autoslide_and_controls(html_content):
         body_tag.append(speed_button)
         body_tag.append(volume_slider)
 
+    # Step 7: Let the prefetcher decide when clips load instead of the browser;
+    # joined section audio keeps preload="auto" (see attach_section_audio)
+    if prefetch_ahead > 0:
+        for audio in soup.find_all("audio"):
+            if not audio.has_attr("data-section-audio"):
+                audio["preload"] = "none"
+        prefetch_script = soup.new_tag("script")
+        prefetch_script.string = PREFETCH_SCRIPT % {
+            "ahead": prefetch_ahead,
+            "budget": prefetch_budget_bytes,
+        }
+        if body_tag:
+            body_tag.append(prefetch_script)
+
+
+def modify_html_for_autoslide_and_controls(html_content):
+    """
+    Modifies the HTML content to:
+    - Set data-autoslide="0" on the first slide.
+    - Add a 'Start Presentation' button to the first slide.
+    - Ensure subsequent slides auto-advance.
+    - Add playback speed and volume control JavaScript code.
+    """
+    soup = parse_html(html_content)
+    add_autoslide_and_controls(soup)
+
     # Return the modified HTML
-    return soup.prettify(formatter="html")
+    return serialize_html(soup)
 
 
 # Example usage:
@@ -600,54 +1539,345 @@ def modify_html_for_autoslide_and_controls(html_content):
 # %%
 
 
-def create_presentation_from_prompt(
-    prompt: str, title: str = None, name: str = "presentation", num_slides: int = 5
+def voice_presentation_html(
+    html_file,
+    base_dir,
+    media_dir,
+    output_html,
+    incremental=True,
+    progress=None,
+    voice=None,
+    model=DEFAULT_MODEL,
+    cancel_event=None,
+    join_audio=False,
+    audio_format=DEFAULT_AUDIO_FORMAT,
+    provider=None,
 ):
     """
-    Complete workflow to create a voiced presentation from a prompt.
-    Now uses dedicated directories for each presentation.
-    """
-    # Use prompt as title if none provided
-    if title is None:
-        title = prompt[:50]  # Use first 50 chars of prompt as title
+    Adds voiceover audio, autoslide and player controls to a rendered presentation.
 
-    # Create unique directory for this presentation
-    base_dir, media_dir = create_presentation_directory(title)
+    In incremental mode the fragment manifest in base_dir is diffed against the
+    deck's fragments: clips of unchanged fragments are reused together with their
+    recorded durations, and only new or edited fragments are synthesized.
 
-    # Generate and save QMD
-    presentation = generate_slides(
-        topic=prompt, title=title, num_slides=num_slides, chalktalk_demo=chalktalk_demo
-    )
+    Parameters:
+    - html_file (str): HTML rendered by Quarto.
+    - base_dir (str): Presentation directory (relative media paths start here).
+    - media_dir (str): Media directory of the presentation.
+    - output_html (str): Where to write the final HTML.
+    - incremental (bool): Reuse clips recorded in the fragment manifest.
+    - progress (callable): Optional progress(message, value) callback, value in 0-100.
+    - voice (str): Provider voice; defaults to the provider's default voice.
+    - model (str): ElevenLabs model ID.
+    - cancel_event (threading.Event): Stops the render between fragments/stages.
+    - join_audio (bool): Join each slide's clips into one file with a cue table
+      (see attach_section_audio) instead of one <audio> per fragment.
+    - audio_format (str): Normalize loudness and transcode clips to this format
+      (see audio_transcode.AUDIO_FORMATS); None keeps the provider's clips.
+    - provider (str or TTSProvider): TTS provider (see tts_providers); the
+      default comes from CHALKTALK_TTS_PROVIDER. "draft" renders silent
+      placeholders in seconds; voicing again with a real provider finalizes
+      the deck, keeping fragment IDs.
 
-    qmd_content = format_presentation_for_qmd(presentation)
-    qmd_file = os.path.join(base_dir, f"{name}.qmd")
-    with open(qmd_file, "w") as f:
-        f.write(qmd_content)
+    Returns:
+    - str: Path to the final HTML.
+    """
 
-    # Render QMD to HTML
-    call(["quarto", "render", qmd_file])
+    def report(message, value):
+        if cancel_event is not None and cancel_event.is_set():
+            raise CancelledError()
+        if progress:
+            progress(message, value)
+
+    provider = get_provider(provider, model=model)
+    voice = voice or provider.default_voice
 
-    # Process HTML with media
-    html_file = qmd_file.replace(".qmd", ".html")
     with open(html_file, "r", encoding="utf-8") as f:
         html_content = f.read()
 
-    fragments, modified_html = extract_media_fragments(html_content)
-    processed_fragments = process_media_fragments(
-        fragments, media_dir, base_dir  # Use base_dir as html_dir for relative paths
+    # Parse once; every post-processing step below edits the same tree
+    report("Extracting fragments", 30)
+    with tracing.span("html.parse", bytes=len(html_content)):
+        soup = parse_html(html_content)
+    fragments = tag_media_fragments(soup)
+
+    manifest = RenderManifest(base_dir)
+    if not incremental:
+        manifest.fragments = {}
+
+    # Diff the deck's fragments against the manifest
+    fragment_hashes = [
+        provider.cache_key(script, voice) for script, *_ in fragments
+    ]
+    reused, pending, durations = [], [], {}
+    for frag_tuple, fragment_hash in zip(fragments, fragment_hashes):
+        script, fragment, unique_id, media_type = frag_tuple
+        entry = manifest.lookup(fragment_hash) if script else None
+        if entry:
+            relative_media_path = os.path.relpath(entry["path"], base_dir)
+            reused.append(
+                (entry["path"], relative_media_path, fragment, unique_id, media_type)
+            )
+            durations[entry["path"]] = entry["duration_ms"]
+        else:
+            pending.append(frag_tuple)
+    print(
+        f"Reusing {len(reused)} of {len(fragments)} fragments, "
+        f"synthesizing {len(pending)}"
+    )
+
+    report(f"Generating audio for {len(pending)} fragments", 40)
+    voiced = []
+    voiced_lock = threading.Lock()
+    # Transcoding runs in worker processes alongside synthesis
+    transcoder = (
+        ClipTranscoder(audio_format)
+        if audio_format and not provider.placeholder
+        else None
     )
 
-    modified_html = insert_media_elements(modified_html, processed_fragments)
-    final_html = modify_html_for_autoslide_and_controls(modified_html)
+    def on_clip(path):
+        if transcoder:
+            transcoder.submit(path)
+        # Checkpoint every clip as it lands so an interrupted render resumes here
+        metadata = read_clip_metadata(path)
+        if metadata.get("text") and metadata.get("duration_ms") is not None:
+            manifest.record(
+                provider.cache_key(metadata["text"], voice),
+                metadata["text"],
+                path,
+                metadata["duration_ms"],
+            )
+            manifest.save()
+        with voiced_lock:
+            voiced.append(path)
+            done = len(voiced)
+        report(
+            f"Voiced {done}/{len(pending)} fragments",
+            40 + 40 * done / max(1, len(pending)),
+        )
+
+    with transcoder or contextlib.nullcontext():
+        with tracing.span(
+            "tts.synthesize", provider=provider.name, fragments=len(pending)
+        ):
+            processed_fragments = reused + process_media_fragments(
+                pending,
+                media_dir,
+                base_dir,  # Use base_dir as html_dir for relative paths
+                voice=voice,
+                provider=provider,
+                on_clip=on_clip,
+                cancel_event=cancel_event,
+            )
+
+        if transcoder:
+            report(f"Transcoding audio to {audio_format}", 80)
+            clip_paths = [item[0] for item in processed_fragments]
+            with tracing.span("audio.transcode", format=audio_format) as span:
+                transcoded = transcoder.results(clip_paths)
+                span.set(**(transcoder.last_report or {}))
+            processed_fragments = [
+                (
+                    transcoded[absolute_media_path],
+                    os.path.relpath(transcoded[absolute_media_path], base_dir),
+                    *rest,
+                )
+                for absolute_media_path, _, *rest in processed_fragments
+            ]
+
+    report("Finalizing presentation", 80)
+    with tracing.span("html.attach_audio", joined=join_audio):
+        if join_audio:
+            attach_section_audio(
+                soup, processed_fragments, media_dir, base_dir, durations=durations
+            )
+        else:
+            attach_media_elements(soup, processed_fragments, durations=durations)
+    with tracing.span("html.autoslide"):
+        add_autoslide_and_controls(soup)
+    with tracing.span("html.serialize"):
+        final_html = serialize_html(soup)
 
     # Save final HTML
-    output_html = os.path.join(base_dir, f"{name}_final.html")
-    with open(output_html, "w", encoding="utf-8") as f:
-        f.write(final_html)
+    with tracing.span("file.write", path=output_html, bytes=len(final_html)):
+        with open(output_html, "w", encoding="utf-8") as f:
+            f.write(final_html)
+
+    # Record every clip that made it into the deck for the next re-render
+    for absolute_media_path, _, fragment, _, _ in processed_fragments:
+        if absolute_media_path in durations:
+            script = fragment.get("data-tts")
+            manifest.record(
+                provider.cache_key(script, voice),
+                script,
+                absolute_media_path,
+                durations[absolute_media_path],
+            )
+    manifest.prune(fragment_hashes)
+    manifest.mark_stage(
+        "voice",
+        output=os.path.relpath(output_html, base_dir),
+        provider=provider.name,
+    )
+    manifest.save()
 
     return output_html
 
 
+def render_and_voice_qmd(
+    qmd_file,
+    base_dir,
+    media_dir,
+    output_html,
+    incremental=True,
+    progress=None,
+    voice=None,
+    model=DEFAULT_MODEL,
+    cancel_event=None,
+    join_audio=False,
+    audio_format=DEFAULT_AUDIO_FORMAT,
+    provider=None,
+):
+    """
+    Renders a QMD file with Quarto while its narration is synthesized.
+
+    Fragments are read from the QMD source, so TTS starts right away instead of
+    after the render. Clips land in the audio cache under their fragment hash;
+    the HTML pass then attaches them as cache hits, keeping the Quarto render
+    off the critical path.
+
+    Parameters:
+    - qmd_file (str): QMD file to render.
+    - base_dir, media_dir, output_html, incremental, progress, voice, model,
+      cancel_event, join_audio, audio_format, provider: As for
+      voice_presentation_html.
+
+    Returns:
+    - str: Path to the final HTML.
+    """
+    from qmd_fragments import parse_qmd_fragments
+
+    def report(message, value):
+        if cancel_event is not None and cancel_event.is_set():
+            raise CancelledError()
+        if progress:
+            progress(message, value)
+
+    provider = get_provider(provider, model=model)
+    voice = voice or provider.default_voice
+
+    with open(qmd_file, "r", encoding="utf-8") as f:
+        qmd_content = f.read()
+    with tracing.span("qmd.parse_fragments") as span:
+        fragments = parse_qmd_fragments(qmd_content)
+        span.set(fragments=len(fragments))
+    qmd_hash = hashlib.sha256(qmd_content.encode("utf-8")).hexdigest()
+    html_file = os.path.splitext(qmd_file)[0] + ".html"
+
+    # Clips recorded in the manifest are reused as-is by the HTML pass
+    manifest = RenderManifest(base_dir)
+    scripts = [
+        fragment.tts
+        for fragment in fragments
+        if not (
+            incremental
+            and manifest.lookup(provider.cache_key(fragment.tts, voice))
+        )
+    ]
+
+    with VoiceoverPrewarmer(voice=voice, provider=provider) as prewarmer:
+        for script in scripts:
+            prewarmer.submit(script)
+
+        # Render QMD to HTML while the clips are synthesized, unless the
+        # checkpoint shows this exact QMD was already rendered
+        checkpoint = manifest.stage("render") or {}
+        if checkpoint.get("qmd_hash") == qmd_hash and os.path.isfile(html_file):
+            print("QMD unchanged since the last render; skipping Quarto")
+        else:
+            report(f"Rendering QMD to HTML ({len(scripts)} fragments voicing)", 10)
+            get_render_service().render(qmd_file, cancel_event=cancel_event)
+            manifest.mark_stage("render", qmd_hash=qmd_hash)
+            manifest.save()
+
+        with tracing.span("tts.prewarm_wait", fragments=len(scripts)):
+            prewarmer.wait(
+                lambda done, total: report(
+                    f"Voiced {done}/{total} fragments", 20 + 20 * done / total
+                )
+            )
+
+    # Process HTML with media; prewarmed fragments are cache hits
+    return voice_presentation_html(
+        html_file,
+        base_dir,
+        media_dir,
+        output_html,
+        incremental=incremental,
+        progress=progress,
+        voice=voice,
+        model=model,
+        cancel_event=cancel_event,
+        join_audio=join_audio,
+        audio_format=audio_format,
+        provider=provider,
+    )
+
+
+def create_presentation_from_prompt(
+    prompt: str,
+    title: str = None,
+    name: str = "presentation",
+    num_slides: int = 5,
+    base_dir: str = None,
+):
+    """
+    Complete workflow to create a voiced presentation from a prompt.
+    Now uses dedicated directories for each presentation.
+
+    Pass the base_dir of an earlier, interrupted run to resume it: stages
+    recorded in its checkpoint are skipped and clips already synthesized are
+    reused.
+    """
+    # Use prompt as title if none provided
+    if title is None:
+        title = prompt[:50]  # Use first 50 chars of prompt as title
+
+    if base_dir is None:
+        # Create unique directory for this presentation
+        base_dir, media_dir = create_presentation_directory(title)
+    else:
+        media_dir = os.path.join(base_dir, "media")
+        os.makedirs(os.path.join(media_dir, "audio"), exist_ok=True)
+
+    qmd_file = os.path.join(base_dir, f"{name}.qmd")
+    manifest = RenderManifest(base_dir)
+
+    # Every stage below is timed into base_dir/run_report.json
+    with tracing.trace("create_presentation", tracing.report_path(base_dir)):
+        if manifest.stage("generate") and os.path.isfile(qmd_file):
+            print(f"Resuming {base_dir}: slides already generated")
+        else:
+            # Generate and save QMD
+            presentation = generate_slides(
+                topic=prompt,
+                title=title,
+                num_slides=num_slides,
+                chalktalk_demo=load_chalktalk_demo(),
+            )
+
+            qmd_content = format_presentation_for_qmd(presentation)
+            with open(qmd_file, "w") as f:
+                f.write(qmd_content)
+            manifest.mark_stage("generate", prompt=prompt, title=title)
+            manifest.save()
+
+        # Render QMD to HTML and voice it, synthesizing during the render
+        output_html = os.path.join(base_dir, f"{name}_final.html")
+        return render_and_voice_qmd(qmd_file, base_dir, media_dir, output_html)
+
+
 # %%
 # Example usage:
 # if __name__ == "__main__":
@@ -0,0 +1,138 @@
+"""
+Extracts TTS fragments straight from QMD source.
+
+Fragments are fenced divs such as
+
+    ::: {.fragment tts="Text to speak"}
+    Content shown on the slide
+    :::
+
+Parsing the source (instead of Quarto's rendered HTML) lets narration start
+before the deck is rendered, or even while an LLM is still writing it.
+FragmentStream accepts text incrementally and reports each fragment as soon as
+its closing fence arrives.
+"""
+
+import re
+from dataclasses import dataclass
+
+_FENCE_OPEN = re.compile(r"^(:{3,})\s*(\{(?P<attrs>.*)\}|\S.*)\s*$")
+_FENCE_CLOSE = re.compile(r"^:{3,}\s*$")
+_CODE_FENCE = re.compile(r"^\s*(`{3,}|~{3,})")
+_ATTR = re.compile(
+    r"""(?P<key>[\w-]+)=(?:"(?P<dq>(?:[^"\\]|\\.)*)"|'(?P<sq>(?:[^'\\]|\\.)*)'|(?P<bare>[^\s}]+))"""
+)
+_CLASS = re.compile(r"(?:^|\s)\.([\w-]+)")
+
+
+@dataclass
+class QmdFragment:
+    """A TTS fragment found in QMD source, numbered in document order."""
+
+    index: int
+    tts: str
+    start_line: int
+    end_line: int
+
+
+def parse_attributes(attrs):
+    """
+    Parses a Pandoc attribute block body, e.g. '.fragment tts="Hi \\"you\\""'.
+
+    Returns:
+    - tuple: (set of classes, dict of key/value attributes)
+    """
+    values = {}
+    for match in _ATTR.finditer(attrs):
+        raw = match.group("dq")
+        if raw is None:
+            raw = match.group("sq")
+        if raw is None:
+            raw = match.group("bare")
+        values[match.group("key")] = re.sub(r"\\(.)", r"\1", raw)
+    # Drop quoted values before looking for classes so dots inside text don't count
+    bare = _ATTR.sub(" ", attrs)
+    classes = set(_CLASS.findall(bare))
+    return classes, values
+
+
+class FragmentStream:
+    """
+    Incremental QMD fragment parser.
+
+    Feed text chunks in order with feed(); each call returns the fragments whose
+    closing fence was completed by that chunk. Call close() at the end to flush
+    a final line without a trailing newline.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._line_no = 0
+        self._stack = []  # open fenced divs: (tts or None, start_line)
+        self._code_fence = None
+        self._count = 0
+
+    def feed(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        completed = []
+        for line in lines:
+            fragment = self._line(line)
+            if fragment:
+                completed.append(fragment)
+        return completed
+
+    def close(self):
+        completed = []
+        if self._buffer:
+            fragment = self._line(self._buffer)
+            self._buffer = ""
+            if fragment:
+                completed.append(fragment)
+        return completed
+
+    def _line(self, line):
+        self._line_no += 1
+
+        # Colons inside code blocks are not fences
+        code = _CODE_FENCE.match(line)
+        if self._code_fence:
+            if code and code.group(1)[0] == self._code_fence[0] and len(
+                code.group(1)
+            ) >= len(self._code_fence):
+                self._code_fence = None
+            return None
+        if code:
+            self._code_fence = code.group(1)
+            return None
+
+        if _FENCE_CLOSE.match(line):
+            if not self._stack:
+                return None
+            tts, start_line = self._stack.pop()
+            if tts is None:
+                return None
+            fragment = QmdFragment(self._count, tts, start_line, self._line_no)
+            self._count += 1
+            return fragment
+
+        opening = _FENCE_OPEN.match(line)
+        if opening:
+            tts = None
+            if opening.group("attrs") is not None:
+                classes, values = parse_attributes(opening.group("attrs"))
+                if "fragment" in classes and values.get("tts"):
+                    tts = values["tts"]
+            self._stack.append((tts, self._line_no))
+        return None
+
+
+def parse_qmd_fragments(qmd_text):
+    """
+    Returns every complete TTS fragment in a QMD document, in document order.
+
+    Returns:
+    - list of QmdFragment
+    """
+    stream = FragmentStream()
+    return stream.feed(qmd_text) + stream.close()
@@ -0,0 +1,189 @@
+"""
+Background job queue for slide generation and rendering.
+
+Jobs run on a process-wide worker pool so a reactive handler only submits work
+and returns immediately; sessions poll job snapshots for progress. Each job
+carries a cancel event that the pipeline checks between fragments and stages.
+The pool size is set with CHALKTALK_RENDER_WORKERS.
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+import traceback
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+
+class RenderJob:
+    """
+    State of one background job, safe to read from any thread via snapshot().
+
+    Parameters:
+    - kind (str): Job type, e.g. "generate" or "render".
+    - title (str): Human-readable label shown in the status view.
+    """
+
+    def __init__(self, kind, title):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.title = title
+        self.state = QUEUED
+        self.progress = 0
+        self.message = "Queued"
+        self.result = None
+        self.partial = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, message, value=None):
+        """
+        Records progress. Usable directly as the pipeline's progress callback.
+
+        Raises:
+        - concurrent.futures.CancelledError: If the job has been cancelled.
+        """
+        with self._lock:
+            self.message = message
+            if value is not None:
+                self.progress = max(0, min(100, int(value)))
+        self.check_cancelled()
+
+    def set_partial(self, value):
+        """Publishes an intermediate result (e.g. streamed text) to pollers."""
+        with self._lock:
+            self.partial = value
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise concurrent.futures.CancelledError()
+
+    def cancel(self):
+        with self._lock:
+            if self.state in FINISHED_STATES:
+                return False
+            if self.state == QUEUED:
+                self._finish(CANCELLED, "Cancelled before start")
+            self.cancel_event.set()
+            return True
+
+    def _finish(self, state, message):
+        self.state = state
+        self.message = message
+        self.finished = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "title": self.title,
+                "state": self.state,
+                "progress": self.progress,
+                "message": self.message,
+                "error": self.error,
+                "partial": self.partial,
+                "elapsed": end - self.started if self.started else 0.0,
+            }
+
+
+class JobQueue:
+    """
+    Thread pool running RenderJobs.
+
+    Parameters:
+    - max_workers (int): Number of jobs that may run at the same time.
+    - keep_finished (int): Finished jobs kept around for status queries.
+    """
+
+    def __init__(self, max_workers=4, keep_finished=200):
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="render-job"
+        )
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, title, fn, *args, **kwargs):
+        """
+        Queues fn(job, *args, **kwargs); its return value becomes job.result.
+
+        Returns:
+        - RenderJob: The queued job.
+        """
+        job = RenderJob(kind, title)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        with job._lock:
+            if job.state == CANCELLED:
+                return
+            job.state = RUNNING
+            job.message = "Starting"
+            job.started = time.time()
+        try:
+            result = fn(job, *args, **kwargs)
+        except concurrent.futures.CancelledError:
+            with job._lock:
+                job._finish(CANCELLED, "Cancelled")
+        except Exception as e:
+            traceback.print_exc()
+            with job._lock:
+                job.error = str(e)
+                job._finish(FAILED, f"Failed: {e}")
+        else:
+            with job._lock:
+                job.result = result
+                job.progress = 100
+                job._finish(DONE, "Complete")
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.state in FINISHED_STATES]
+        excess = len(finished) - self.keep_finished
+        for job in sorted(finished, key=lambda j: j.finished or 0)[: max(0, excess)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        return job.cancel() if job else False
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for j in self.jobs.values() if j.state in (QUEUED, RUNNING))
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Returns the process-wide job queue shared by all sessions."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                max_workers=int(os.getenv("CHALKTALK_RENDER_WORKERS", "4"))
+            )
+        return _job_queue
@@ -0,0 +1,159 @@
+"""
+Per-presentation manifest of synthesized fragments.
+
+The manifest lives next to the rendered deck and maps each fragment's TTS hash
+to the clip that was generated for it and the clip's duration. On re-render the
+new fragment list is diffed against it so only new or edited narration is sent
+to the TTS provider and durations of unchanged clips are not probed again.
+
+It doubles as the presentation's checkpoint: clips are recorded as soon as they
+are synthesized and finished pipeline stages (generate, render, voice) are
+marked, so an interrupted run resumes where it stopped. gc_audio() removes
+clips that neither a final HTML nor the checkpoint refers to.
+"""
+
+import glob
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+MANIFEST_NAME = "fragments.json"
+
+
+class RenderManifest:
+    """
+    Fragment hash -> {text, audio, duration_ms} map stored in base_dir.
+
+    Audio paths are stored relative to base_dir so presentation directories can
+    be moved or copied without invalidating the manifest.
+
+    Parameters:
+    - base_dir (str): The presentation directory.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, MANIFEST_NAME)
+        self.fragments = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        self.fragments = data.get("fragments", {})
+        self.stages = data.get("stages", {})
+
+    def lookup(self, fragment_hash):
+        """
+        Returns the entry for fragment_hash if its clip still exists on disk.
+
+        Returns:
+        - dict or None: Entry with an extra absolute 'path' key, or None.
+        """
+        entry = self.fragments.get(fragment_hash)
+        if not entry:
+            return None
+        path = os.path.join(self.base_dir, entry["audio"])
+        if not os.path.isfile(path):
+            return None
+        return {**entry, "path": path}
+
+    def record(self, fragment_hash, text, audio_path, duration_ms):
+        with self._lock:
+            self.fragments[fragment_hash] = {
+                "text": text,
+                "audio": os.path.relpath(audio_path, self.base_dir),
+                "duration_ms": duration_ms,
+            }
+
+    def prune(self, keep_hashes):
+        """Drops entries for fragments no longer present in the deck."""
+        keep = set(keep_hashes)
+        with self._lock:
+            self.fragments = {h: e for h, e in self.fragments.items() if h in keep}
+
+    def stage(self, name):
+        """Returns the checkpoint info of a finished stage, or None."""
+        return self.stages.get(name)
+
+    def mark_stage(self, name, **info):
+        """Records a finished pipeline stage; call save() to persist it."""
+        with self._lock:
+            self.stages[name] = {"completed_at": time.time(), **info}
+
+    def clear_stage(self, name):
+        with self._lock:
+            self.stages.pop(name, None)
+
+    def save(self):
+        with self._lock:
+            data = {"fragments": self.fragments, "stages": self.stages}
+            tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+_MEDIA_REF = re.compile(r"""(?:src|href)=["']([^"'#?]+)""")
+
+
+def referenced_media(base_dir):
+    """Returns absolute paths of the files referenced by the deck's final HTML."""
+    referenced = set()
+    for html_path in glob.glob(os.path.join(base_dir, "*_final.html")):
+        with open(html_path, "r", encoding="utf-8") as f:
+            html = f.read()
+        for ref in _MEDIA_REF.findall(html):
+            referenced.add(os.path.normpath(os.path.join(base_dir, ref)))
+    return referenced
+
+
+def gc_audio(base_dir, keep_checkpoint=True, dry_run=False):
+    """
+    Deletes clips in base_dir/media/audio that nothing refers to anymore.
+
+    Parameters:
+    - base_dir (str): The presentation directory.
+    - keep_checkpoint (bool): Also keep clips recorded in the manifest (needed
+      to resume an interrupted render); when False only the final HTML counts.
+    - dry_run (bool): Only report what would be deleted.
+
+    Returns:
+    - dict: files and bytes removed (or removable on a dry run).
+    """
+    keep = referenced_media(base_dir)
+    manifest = RenderManifest(base_dir)
+    if keep_checkpoint:
+        for entry in manifest.fragments.values():
+            keep.add(os.path.normpath(os.path.join(base_dir, entry["audio"])))
+
+    removed = {"files": 0, "bytes": 0}
+    audio_dir = os.path.join(base_dir, "media", "audio")
+    for path in sorted(glob.glob(os.path.join(audio_dir, "*"))):
+        path = os.path.normpath(path)
+        if path.endswith(".json") or path in keep or not os.path.isfile(path):
+            continue
+        sidecar = os.path.splitext(path)[0] + ".json"
+        for doomed in (path, sidecar):
+            if not os.path.isfile(doomed):
+                continue
+            removed["bytes"] += os.path.getsize(doomed)
+            if not dry_run:
+                os.remove(doomed)
+        removed["files"] += 1
+
+    if not dry_run and not keep_checkpoint and os.path.isfile(manifest.path):
+        # Forget checkpointed clips that were just deleted
+        manifest.prune(
+            h for h, entry in manifest.fragments.items()
+            if os.path.isfile(os.path.join(base_dir, entry["audio"]))
+        )
+        manifest.save()
+    return removed
@@ -0,0 +1,176 @@
+"""
+Queued Quarto renders with warm Jupyter kernels.
+
+A plain `quarto render` starts Quarto, Pandoc and, for decks with Python
+chunks, a fresh Jupyter kernel every time. The render service runs all renders
+of the process through one queue and passes Quarto's --execute-daemon option,
+so the kernel of a Jupyter deck stays alive between renders and a re-render
+only pays for executing the cells. Decks with R chunks run through knitr,
+which Quarto cannot keep warm; they are still queued but start R each time.
+
+The queue also bounds how many Quarto processes run at once and coalesces
+repeated requests: rendering a deck that is already waiting in the queue joins
+that job instead of rendering twice. A joined render is only cancelled once
+every caller waiting on it has cancelled; a caller that cancels earlier stops
+waiting but leaves the render to the others.
+
+Configuration defaults come from the environment:
+- CHALKTALK_QUARTO_CONCURRENCY: renders running at the same time (default 2)
+- CHALKTALK_QUARTO_DAEMON_SECONDS: kernel keep-alive in seconds (default 600,
+  0 disables the daemon)
+"""
+
+import concurrent.futures
+import os
+import re
+import threading
+import time
+
+import tracing
+
+DEFAULT_CONCURRENCY = int(os.getenv("CHALKTALK_QUARTO_CONCURRENCY", "2"))
+DEFAULT_DAEMON_SECONDS = int(os.getenv("CHALKTALK_QUARTO_DAEMON_SECONDS", "600"))
+
+_CHUNK_RE = re.compile(r"^\s*```+\s*\{(\w+)", re.MULTILINE)
+_ENGINE_RE = re.compile(r"^engine:\s*knitr\b", re.MULTILINE)
+
+
+def uses_jupyter(qmd_content):
+    """Checks whether Quarto will execute a document with a Jupyter kernel."""
+    engines = {match.lower() for match in _CHUNK_RE.findall(qmd_content)}
+    if "r" in engines or _ENGINE_RE.search(qmd_content):
+        return False
+    return bool(engines & {"python", "julia"})
+
+
+class _JoinedCancel:
+    """Cancel event of a coalesced render: set once every caller's event is set."""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def join(self, cancel_event):
+        with self._lock:
+            self.events.append(cancel_event)
+
+    def is_set(self):
+        with self._lock:
+            # A caller without a cancel event keeps the render alive
+            return all(event is not None and event.is_set() for event in self.events)
+
+
+class RenderService:
+    """
+    Runs Quarto renders from a queue, keeping Jupyter kernels warm between them.
+
+    Parameters:
+    - max_workers (int): Renders running at the same time.
+    - daemon_seconds (int): Kernel keep-alive passed to --execute-daemon; 0
+      renders every deck cold.
+    """
+
+    def __init__(
+        self, max_workers=DEFAULT_CONCURRENCY, daemon_seconds=DEFAULT_DAEMON_SECONDS
+    ):
+        self.daemon_seconds = daemon_seconds
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="quarto"
+        )
+        self.queued = {}
+        self.renders = 0
+        self.render_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def submit(self, qmd_file, cancel_event=None, share_assets=True):
+        """
+        Queues a render.
+
+        Returns:
+        - concurrent.futures.Future: Resolves when the deck is rendered.
+        """
+        qmd_file = os.path.abspath(qmd_file)
+        with self._lock:
+            # A deck already waiting in the queue will pick up the latest QMD
+            if qmd_file in self.queued:
+                future, cancel = self.queued[qmd_file]
+                cancel.join(cancel_event)
+                return future
+            cancel = _JoinedCancel()
+            cancel.join(cancel_event)
+            future = self.executor.submit(
+                tracing.bind(self._render), qmd_file, cancel, share_assets
+            )
+            self.queued[qmd_file] = (future, cancel)
+            return future
+
+    def render(self, qmd_file, cancel_event=None, share_assets=True):
+        """
+        Queues a render and waits for it.
+
+        Raises:
+        - subprocess.CalledProcessError: If Quarto fails.
+        - concurrent.futures.CancelledError: If cancel_event was set.
+        """
+        future = self.submit(qmd_file, cancel_event, share_assets)
+        if cancel_event is None:
+            return future.result()
+        # The render may be shared, so this caller stops waiting on its own
+        # cancel_event even while others keep the render running
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except concurrent.futures.TimeoutError:
+                if cancel_event.is_set():
+                    raise concurrent.futures.CancelledError()
+
+    def _render(self, qmd_file, cancel_event, share_assets):
+        from presentation_utils import render_qmd
+
+        with self._lock:
+            self.queued.pop(qmd_file, None)
+        if cancel_event.is_set():
+            raise concurrent.futures.CancelledError()
+        with open(qmd_file, "r", encoding="utf-8") as f:
+            warm = self.daemon_seconds > 0 and uses_jupyter(f.read())
+
+        start = time.perf_counter()
+        render_qmd(
+            qmd_file,
+            cancel_event=cancel_event,
+            share_assets=share_assets,
+            execute_daemon=self.daemon_seconds if warm else None,
+        )
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.renders += 1
+            self.render_seconds += elapsed
+        print(
+            f"Rendered {os.path.basename(os.path.dirname(qmd_file))} in "
+            f"{elapsed:.1f} s{' (warm kernel)' if warm else ''}"
+        )
+        return qmd_file
+
+    def stats(self):
+        with self._lock:
+            return {
+                "renders": self.renders,
+                "render_seconds": self.render_seconds,
+                "queued": len(self.queued),
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+_default_service = None
+_default_service_lock = threading.Lock()
+
+
+def get_render_service():
+    """Returns the process-wide render service, creating it on first use."""
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = RenderService()
+        return _default_service
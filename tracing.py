@@ -0,0 +1,382 @@
+"""
+Pipeline tracing and metrics.
+
+Stages of the pipeline (LLM generation, Quarto renders, fragment extraction,
+TTS requests, duration probes, HTML post-processing, file writes) run inside
+spans:
+
+    with tracing.span("tts.request", characters=len(line)) as s:
+        reply = ...
+        s.set(bytes=len(audio))
+
+Spans nest through a context variable, so a stage called from another one is
+recorded as its child. Work handed to a thread pool keeps its parent when the
+callable is wrapped with bind(). Generators are traced with trace_iter(), which
+makes the span current only while the generator runs, not while the caller
+handles what it yielded.
+
+Two outputs:
+- A run report: trace() opens the root span of a run and, on exit, writes the
+  span tree plus per-stage totals to a JSON file (run_report.json in the deck's
+  directory).
+- Process-wide Prometheus metrics, for the long-running Shiny server: span
+  counts and duration histograms per stage, and totals of the bytes,
+  characters and retries attributes. render_metrics() returns them in the
+  Prometheus text format; the app serves them at /metrics.
+
+Set CHALKTALK_TRACING=0 to turn spans into no-ops.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+ENABLED = os.getenv("CHALKTALK_TRACING", "1") != "0"
+
+# Span attributes that are summed into counters and report totals
+COUNTED_ATTRS = ("bytes", "characters", "retries")
+
+# Histogram buckets in seconds, from fast HTML steps to multi-minute renders
+DURATION_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 180, 600)
+
+REPORT_NAME = "run_report.json"
+
+_current = contextvars.ContextVar("chalktalk_span", default=None)
+
+
+def report_path(base_dir):
+    """Returns where the run report of a presentation directory is written."""
+    return os.path.join(base_dir, REPORT_NAME)
+
+
+class Span:
+    """
+    One timed stage of the pipeline.
+
+    Parameters:
+    - name (str): Stage name, e.g. "quarto.render".
+    - attrs (dict): Attributes recorded with the span.
+    - parent (Span): Enclosing span, or None for a root.
+    """
+
+    def __init__(self, name, attrs=None, parent=None):
+        self.name = name
+        self.attrs = dict(attrs or {})
+        self.parent = parent
+        self.children = []
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self.status = "ok"
+        # Children may be added from worker threads
+        self._lock = parent._lock if parent is not None else threading.Lock()
+        if parent is not None:
+            with self._lock:
+                parent.children.append(self)
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attrs):
+        """Sets attributes on the span."""
+        with self._lock:
+            self.attrs.update(attrs)
+
+    def add(self, attr, amount=1):
+        """Increments a numeric attribute (e.g. retries)."""
+        with self._lock:
+            self.attrs[attr] = self.attrs.get(attr, 0) + amount
+
+    def to_dict(self):
+        with self._lock:
+            children = list(self.children)
+            attrs = dict(self.attrs)
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "seconds": round(self.duration, 6),
+            "status": self.status,
+            "attrs": attrs,
+            "children": [child.to_dict() for child in children],
+        }
+
+
+class _NullSpan:
+    """Stands in for a span when tracing is disabled."""
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, attr, amount=1):
+        pass
+
+
+def current_span():
+    """Returns the innermost active span, or None."""
+    return _current.get()
+
+
+def add(attr, amount=1):
+    """Increments an attribute of the current span, if any (e.g. retries)."""
+    span_ = _current.get()
+    if span_ is not None:
+        span_.add(attr, amount)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """
+    Times the enclosed block as a child of the current span.
+
+    Exceptions propagate; the span is marked "error" (or "cancelled") and the
+    exception type is recorded.
+    """
+    if not ENABLED:
+        yield _NullSpan()
+        return
+
+    span_ = Span(name, attrs, parent=_current.get())
+    token = _current.set(span_)
+    try:
+        yield span_
+    except BaseException as e:
+        _fail(span_, e)
+        raise
+    finally:
+        span_.end = time.perf_counter()
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # a generator finished in another context than it started in
+        get_metrics().observe(span_)
+
+
+def _fail(span_, error):
+    span_.status = "cancelled" if "Cancelled" in type(error).__name__ else "error"
+    span_.set(error=type(error).__name__)
+
+
+def trace_iter(name, make_iterator, **attrs):
+    """
+    Traces a generator, yielding its items.
+
+    The span is the current span only inside each step of the generator, so
+    work the caller does between items (e.g. submitting TTS for a streamed
+    fragment) is not recorded as its child. The span's duration is the time
+    spent producing items, not the time the caller held the generator open.
+
+    Parameters:
+    - name (str): Stage name, e.g. "llm.generate".
+    - make_iterator (callable): Called with the span on the first step;
+      returns the iterator to trace.
+    """
+    if not ENABLED:
+        yield from make_iterator(_NullSpan())
+        return
+
+    span_ = Span(name, attrs, parent=_current.get())
+    iterator = None
+    busy = 0.0
+    try:
+        while True:
+            token = _current.set(span_)
+            start = time.perf_counter()
+            try:
+                if iterator is None:
+                    iterator = iter(make_iterator(span_))
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                busy += time.perf_counter() - start
+                _current.reset(token)
+            yield item
+    except GeneratorExit:
+        # The caller stopped consuming early
+        span_.status = "cancelled"
+        raise
+    except BaseException as e:
+        _fail(span_, e)
+        raise
+    finally:
+        if iterator is not None and hasattr(iterator, "close"):
+            iterator.close()
+        span_.end = span_.start + busy
+        get_metrics().observe(span_)
+
+
+@contextlib.contextmanager
+def trace(name, report_path=None, **attrs):
+    """
+    Traces a run and writes its report.
+
+    Opens a root span; if a run is already being traced (e.g. a render started
+    from create_presentation_from_prompt), this is just a nested span and the
+    outer run writes the report.
+
+    Parameters:
+    - name (str): Run name, e.g. "render".
+    - report_path (str): Where to write the JSON run report.
+    """
+    nested = _current.get() is not None
+    root = None
+    try:
+        with span(name, **attrs) as root:
+            yield root
+    finally:
+        # Written after the span closed, so failed runs report their error too
+        if report_path and not nested and isinstance(root, Span):
+            write_report(root, report_path)
+
+
+def bind(fn):
+    """
+    Wraps fn so it runs under the spans active where bind() was called.
+
+    Use when handing work to a thread pool; each call runs in its own copy of
+    the captured context, so concurrent calls are safe.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+def _walk(span_dict):
+    yield span_dict
+    for child in span_dict["children"]:
+        yield from _walk(child)
+
+
+def build_report(root):
+    """
+    Summarizes a finished root span.
+
+    Returns:
+    - dict: The span tree plus per-stage totals (count, errors, total and max
+      seconds, and summed COUNTED_ATTRS).
+    """
+    tree = root.to_dict()
+    stages = {}
+    for node in _walk(tree):
+        stage = stages.setdefault(
+            node["name"],
+            {"count": 0, "errors": 0, "seconds_total": 0.0, "seconds_max": 0.0},
+        )
+        stage["count"] += 1
+        stage["errors"] += node["status"] != "ok"
+        stage["seconds_total"] += node["seconds"]
+        stage["seconds_max"] = max(stage["seconds_max"], node["seconds"])
+        for attr in COUNTED_ATTRS:
+            if isinstance(node["attrs"].get(attr), (int, float)):
+                stage[attr] = stage.get(attr, 0) + node["attrs"][attr]
+    for stage in stages.values():
+        stage["seconds_total"] = round(stage["seconds_total"], 6)
+    return {
+        "name": tree["name"],
+        "started_at": tree["started_at"],
+        "seconds": tree["seconds"],
+        "status": tree["status"],
+        "stages": stages,
+        "spans": tree,
+    }
+
+
+def write_report(root, path):
+    report = build_report(root)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"Run report: {path} ({report['seconds']:.1f} s)")
+    return report
+
+
+class Metrics:
+    """Process-wide counters and duration histograms per span name."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.spans = {}  # (name, status) -> count
+        self.histograms = {}  # name -> [bucket counts..., +Inf count, sum]
+        self.totals = {}  # (attr, name) -> sum
+        self._lock = threading.Lock()
+
+    def observe(self, span_):
+        seconds = span_.duration
+        with self._lock:
+            key = (span_.name, span_.status)
+            self.spans[key] = self.spans.get(key, 0) + 1
+            histogram = self.histograms.setdefault(
+                span_.name, [0] * (len(self.buckets) + 1) + [0.0]
+            )
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+            for attr in COUNTED_ATTRS:
+                value = span_.attrs.get(attr)
+                if isinstance(value, (int, float)):
+                    key = (attr, span_.name)
+                    self.totals[key] = self.totals.get(key, 0) + value
+
+    def render(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP chalktalk_spans_total Pipeline stages run, by outcome.",
+                "# TYPE chalktalk_spans_total counter",
+            ]
+            for (name, status), count in sorted(self.spans.items()):
+                lines.append(
+                    f'chalktalk_spans_total{{span="{name}",status="{status}"}} {count}'
+                )
+
+            lines += [
+                "# HELP chalktalk_span_duration_seconds Pipeline stage latency.",
+                "# TYPE chalktalk_span_duration_seconds histogram",
+            ]
+            for name, histogram in sorted(self.histograms.items()):
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append(
+                        f'chalktalk_span_duration_seconds_bucket{{span="{name}",'
+                        f'le="{bound}"}} {count}'
+                    )
+                count = histogram[len(self.buckets)]
+                lines += [
+                    f'chalktalk_span_duration_seconds_bucket{{span="{name}",'
+                    f'le="+Inf"}} {count}',
+                    f'chalktalk_span_duration_seconds_sum{{span="{name}"}} '
+                    f"{histogram[-1]:.6f}",
+                    f'chalktalk_span_duration_seconds_count{{span="{name}"}} {count}',
+                ]
+
+            for attr in COUNTED_ATTRS:
+                metric = f"chalktalk_{attr}_total"
+                lines += [
+                    f"# HELP {metric} Sum of the {attr} recorded on pipeline stages.",
+                    f"# TYPE {metric} counter",
+                ]
+                for (total_attr, name), value in sorted(self.totals.items()):
+                    if total_attr == attr:
+                        lines.append(f'{metric}{{span="{name}"}} {value}')
+            return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+def render_metrics():
+    """Returns the process-wide metrics in the Prometheus text format."""
+    return _metrics.render()
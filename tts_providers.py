@@ -0,0 +1,446 @@
+"""
+Text-to-speech providers.
+
+A provider turns a batch of script lines into audio clips in a media
+directory, writes each clip's metadata sidecar (text, voice, duration) and
+shares clips through the audio cache. Everything downstream (fragment
+manifest, durations, autoslide) only relies on that contract, so providers are
+interchangeable per render:
+
+- "elevenlabs": the ElevenLabs API (default).
+- "local": espeak-ng on the local CPU. No network and no per-character cost,
+  and its output is deterministic, which makes it useful for drafts and for
+  benchmarking the pipeline.
+- "draft": silent placeholder clips sized to how long each line would take to
+  speak, for checking layout and timing in seconds. Rendering again with a
+  real provider ("finalizing") swaps in real audio for the same fragments.
+
+The default provider is set with CHALKTALK_TTS_PROVIDER.
+"""
+
+import concurrent.futures
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+import tracing
+from audio_cache import AudioCache, get_default_cache
+from audio_utils import silent_mp3, wav_duration, write_clip_metadata
+from tts_scheduler import TTSError
+
+DEFAULT_PROVIDER = os.getenv("CHALKTALK_TTS_PROVIDER", "elevenlabs")
+
+# Used by the draft provider until the cache holds enough clips to calibrate on
+DEFAULT_WORDS_PER_MINUTE = 150
+DEFAULT_CLIP_OVERHEAD_SEC = 0.3
+
+
+def clip_path(audio_dir, line, key, extension=".mp3"):
+    """Names a clip after its text and cache key so identical requests share a file."""
+    sanitized = re.sub(r"[^\w\s]", "", line)[:20].replace(" ", "_")
+    return os.path.join(audio_dir, f"{sanitized}_{key[:16]}{extension}")
+
+
+def group_lines(script_lines, cache_key):
+    """
+    Groups lines that share a cache key so each clip is synthesized once.
+
+    Identical lines map to the same clip file, so synthesizing them separately
+    would both repeat the request and have workers writing one file at once.
+
+    Parameters:
+    - script_lines (list of str): Lines to speak.
+    - cache_key (callable): Returns the cache key of a line.
+
+    Returns:
+    - tuple: (unique lines, and for each input line the index of its unique
+      line, or None for empty lines).
+    """
+    unique, slots, positions = [], {}, []
+    for line in script_lines:
+        if not line:
+            positions.append(None)
+            continue
+        key = cache_key(line)
+        if key not in slots:
+            slots[key] = len(unique)
+            unique.append(line)
+        positions.append(slots[key])
+    return unique, positions
+
+
+def restore_cached_clip(cache, key, file_path, probe_duration):
+    """
+    Materializes a cached clip and its sidecar.
+
+    Returns:
+    - bool: False on a miss (or when caching is disabled).
+    """
+    if not cache:
+        return False
+    metadata = cache.get(key, file_path)
+    if metadata is None:
+        return False
+    # Entries cached before durations were recorded get probed once
+    if metadata.get("duration_ms") is None:
+        metadata["duration_ms"] = int(probe_duration(file_path) * 1000)
+    write_clip_metadata(file_path, metadata)
+    return True
+
+
+class TTSProvider:
+    """
+    Interface of a TTS backend.
+
+    Subclasses set name, default_voice and max_concurrent and implement
+    cache_key() and synthesize().
+    """
+
+    name = None
+    default_voice = None
+    max_concurrent = 1
+    # Placeholder clips are not worth transcoding or caching
+    placeholder = False
+
+    def cache_key(self, text, voice):
+        """Returns the audio cache / fragment manifest key of a line."""
+        raise NotImplementedError
+
+    def synthesize(
+        self, script_lines, output_dir, voice=None, cache=None, on_clip=None,
+        cancel_event=None,
+    ):
+        """
+        Synthesizes every line into output_dir/audio.
+
+        Parameters:
+        - script_lines (list of str): Lines to speak.
+        - output_dir (str): Media directory; clips go to its audio/ folder.
+        - voice (str): Provider-specific voice; defaults to default_voice.
+        - cache (AudioCache): Defaults to the shared cache; False disables it.
+        - on_clip (callable): Called with each clip path as soon as it is ready.
+        - cancel_event (threading.Event): When set, lines not yet started are skipped.
+
+        Returns:
+        - list of str: Clip paths in input order (None for empty lines).
+
+        Raises:
+        - TTSError: If any line failed.
+        - concurrent.futures.CancelledError: If cancel_event was set.
+        """
+        raise NotImplementedError
+
+
+class ElevenLabsProvider(TTSProvider):
+    """
+    ElevenLabs API, through the shared rate-limited scheduler.
+
+    Parameters:
+    - model (str): ElevenLabs model ID.
+    - voice_settings (dict): Optional ElevenLabs voice settings.
+    """
+
+    name = "elevenlabs"
+
+    def __init__(self, model=None, voice_settings=None):
+        import presentation_utils as pu
+        from tts_scheduler import get_scheduler
+
+        self.model = model or pu.DEFAULT_MODEL
+        self.voice_settings = voice_settings
+        self.default_voice = pu.DEFAULT_VOICE
+        self.max_concurrent = get_scheduler("elevenlabs").max_concurrent
+
+    def cache_key(self, text, voice):
+        import presentation_utils as pu
+
+        return pu.tts_cache_key(
+            text, voice or self.default_voice, self.model, self.voice_settings
+        )
+
+    def synthesize(
+        self, script_lines, output_dir, voice=None, cache=None, on_clip=None,
+        cancel_event=None,
+    ):
+        import presentation_utils as pu
+
+        return pu.fetch_voiceover_elevenlabs(
+            script_lines,
+            output_dir,
+            voice=voice or self.default_voice,
+            model=self.model,
+            voice_settings=self.voice_settings,
+            cache=cache,
+            on_clip=on_clip,
+            cancel_event=cancel_event,
+        )
+
+
+class LocalProvider(TTSProvider):
+    """
+    Offline synthesis with espeak-ng (or espeak), writing WAV clips.
+
+    Parameters:
+    - words_per_minute (int): Speaking rate passed to espeak-ng.
+    - max_workers (int): Parallel espeak-ng processes; defaults to the CPU count.
+    """
+
+    name = "local"
+    default_voice = "en-us"
+
+    def __init__(self, words_per_minute=None, max_workers=None, **_):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        self.words_per_minute = words_per_minute or int(
+            os.getenv("CHALKTALK_LOCAL_TTS_WPM", "165")
+        )
+        self.max_concurrent = max_workers or os.cpu_count() or 2
+
+    def cache_key(self, text, voice):
+        return AudioCache.key(
+            provider="espeak-ng",
+            text=text,
+            voice=voice or self.default_voice,
+            words_per_minute=self.words_per_minute,
+        )
+
+    def _speak(self, line, voice, file_path):
+        # Write to a temporary name so a killed process never leaves half a clip
+        fd, tmp_path = tempfile.mkstemp(
+            suffix=".wav", dir=os.path.dirname(file_path)
+        )
+        os.close(fd)
+        try:
+            subprocess.run(
+                [
+                    self.binary,
+                    "-v", voice,
+                    "-s", str(self.words_per_minute),
+                    "-w", tmp_path,
+                    "--", line,
+                ],
+                check=True,
+                capture_output=True,
+            )
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def synthesize(
+        self, script_lines, output_dir, voice=None, cache=None, on_clip=None,
+        cancel_event=None,
+    ):
+        if self.binary is None:
+            raise TTSError("Local TTS needs espeak-ng (or espeak) on the PATH")
+        voice = voice or self.default_voice
+        if cache is None:
+            cache = get_default_cache()
+        audio_dir = os.path.join(output_dir, "audio")
+        os.makedirs(audio_dir, exist_ok=True)
+
+        def speak_and_save(line):
+            if not line:
+                return None
+            if cancel_event is not None and cancel_event.is_set():
+                raise concurrent.futures.CancelledError()
+
+            key = self.cache_key(line, voice)
+            file_path = clip_path(audio_dir, line, key, extension=".wav")
+            with tracing.span(
+                "tts.clip", provider=self.name, characters=len(line)
+            ) as span:
+                cached = restore_cached_clip(cache, key, file_path, wav_duration)
+                span.set(cache="hit" if cached else "miss")
+                if not cached:
+                    if os.path.exists(file_path):
+                        os.remove(file_path)  # may be a hardlink into the cache
+                    with tracing.span(
+                        "tts.request", provider=self.name, characters=len(line)
+                    ) as request_span:
+                        self._speak(line, voice, file_path)
+                        request_span.set(bytes=os.path.getsize(file_path))
+                    metadata = {
+                        "text": line,
+                        "voice": voice,
+                        "model": "espeak-ng",
+                        "provider": self.name,
+                        "duration_ms": int(wav_duration(file_path) * 1000),
+                    }
+                    write_clip_metadata(file_path, metadata)
+                    if cache:
+                        cache.put(key, file_path, metadata=metadata)
+
+            if on_clip:
+                on_clip(file_path)
+            return file_path
+
+        unique, positions = group_lines(
+            script_lines, lambda line: self.cache_key(line, voice)
+        )
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_concurrent, thread_name_prefix="local-tts"
+        ) as pool:
+            run = tracing.bind(speak_and_save)
+            futures = [pool.submit(run, line) for line in unique]
+            concurrent.futures.wait(futures)
+
+        if cancel_event is not None and cancel_event.is_set():
+            raise concurrent.futures.CancelledError()
+        paths, failures = [], {}
+        for line, future in zip(unique, futures):
+            error = future.exception()
+            if error:
+                print(f"Local TTS failed for {line[:40]!r}: {error}")
+                failures[line] = error
+            paths.append(None if error else future.result())
+        paths = [None if pos is None else paths[pos] for pos in positions]
+        if failures:
+            raise TTSError(
+                f"{len(failures)} of {len(script_lines)} voiceover lines failed",
+                failures=failures,
+            )
+        return paths
+
+
+def calibrate_speech_rate(cache, voice=None, min_samples=5, max_samples=500):
+    """
+    Fits clip duration against word count on real clips in the audio cache.
+
+    Uses the clips recorded for voice when there are enough of them, otherwise
+    every real clip, and falls back to DEFAULT_WORDS_PER_MINUTE.
+
+    Returns:
+    - tuple: (seconds per word, fixed seconds per clip).
+    """
+    default = (60 / DEFAULT_WORDS_PER_MINUTE, DEFAULT_CLIP_OVERHEAD_SEC)
+    if not cache:
+        return default
+
+    samples, voice_samples = [], []
+    for metadata in cache.iter_metadata():
+        if metadata.get("provider") == DraftProvider.name:
+            continue
+        words = len((metadata.get("text") or "").split())
+        if not words or metadata.get("duration_ms") is None:
+            continue
+        sample = (words, metadata["duration_ms"] / 1000)
+        samples.append(sample)
+        if voice and metadata.get("voice") == voice:
+            voice_samples.append(sample)
+        if len(samples) >= max_samples:
+            break
+    if len(voice_samples) >= min_samples:
+        samples = voice_samples
+    if len(samples) < min_samples:
+        return default
+
+    # Least-squares line: seconds = overhead + words * per_word
+    n = len(samples)
+    mean_words = sum(w for w, _ in samples) / n
+    mean_seconds = sum(sec for _, sec in samples) / n
+    spread = sum((w - mean_words) ** 2 for w, _ in samples)
+    if not spread:
+        return mean_seconds / mean_words, 0.0
+    per_word = (
+        sum((w - mean_words) * (sec - mean_seconds) for w, sec in samples) / spread
+    )
+    if per_word <= 0:
+        return default
+    return per_word, max(0.0, mean_seconds - per_word * mean_words)
+
+
+class DraftProvider(TTSProvider):
+    """
+    Instant silent clips whose durations are estimated from word count.
+
+    The speaking rate is calibrated once per provider on real clips in the
+    audio cache (see calibrate_speech_rate), so draft timing tracks the voice
+    the deck will be finalized with.
+
+    Parameters:
+    - words_per_minute (int): Fixed rate instead of calibrating.
+    """
+
+    name = "draft"
+    placeholder = True
+    max_concurrent = 1
+
+    def __init__(self, words_per_minute=None, **_):
+        self.words_per_minute = words_per_minute
+        self._rate = None
+
+    def cache_key(self, text, voice):
+        return AudioCache.key(provider=self.name, text=text)
+
+    def estimate_duration(self, text, voice=None, cache=None):
+        """Returns the estimated spoken length of text in seconds."""
+        if self._rate is None:
+            if self.words_per_minute:
+                self._rate = (60 / self.words_per_minute, DEFAULT_CLIP_OVERHEAD_SEC)
+            else:
+                self._rate = calibrate_speech_rate(
+                    get_default_cache() if cache is None else cache, voice
+                )
+        per_word, overhead = self._rate
+        return max(0.5, overhead + per_word * len(text.split()))
+
+    def synthesize(
+        self, script_lines, output_dir, voice=None, cache=None, on_clip=None,
+        cancel_event=None,
+    ):
+        audio_dir = os.path.join(output_dir, "audio")
+        os.makedirs(audio_dir, exist_ok=True)
+        paths = []
+        for line in script_lines:
+            if cancel_event is not None and cancel_event.is_set():
+                raise concurrent.futures.CancelledError()
+            if not line:
+                paths.append(None)
+                continue
+            key = self.cache_key(line, voice)
+            file_path = clip_path(audio_dir, line, key)
+            seconds = self.estimate_duration(line, voice, cache)
+            with open(file_path, "wb") as f:
+                f.write(silent_mp3(seconds))
+            write_clip_metadata(
+                file_path,
+                {
+                    "text": line,
+                    "voice": voice,
+                    "model": None,
+                    "provider": self.name,
+                    "duration_ms": int(seconds * 1000),
+                },
+            )
+            if on_clip:
+                on_clip(file_path)
+            paths.append(file_path)
+        return paths
+
+
+PROVIDERS = {
+    ElevenLabsProvider.name: ElevenLabsProvider,
+    LocalProvider.name: LocalProvider,
+    DraftProvider.name: DraftProvider,
+}
+
+
+def get_provider(provider=None, **options):
+    """
+    Resolves a provider name (or None for the default) to a provider instance.
+
+    Instances are passed through unchanged; options go to the constructor.
+
+    Raises:
+    - ValueError: If the name is unknown.
+    """
+    if isinstance(provider, TTSProvider):
+        return provider
+    name = provider or DEFAULT_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(
+            f"Unknown TTS provider {name!r}; choose from {', '.join(PROVIDERS)}"
+        )
+    return PROVIDERS[name](**options)
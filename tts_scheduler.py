@@ -0,0 +1,286 @@
+"""
+Shared, rate-limit-aware scheduler for calls to external speech/LLM providers.
+
+One scheduler exists per provider per process. It enforces a requests-per-second
+budget (token bucket) and a cap on in-flight requests, retries transient failures
+with exponential backoff, and honours 429 Retry-After by pausing every caller of
+that provider, so throughput is bounded by the provider quota rather than by
+fixed sleeps.
+
+Limits are configured per provider with environment variables, e.g.
+CHALKTALK_ELEVENLABS_RPS=5 and CHALKTALK_ELEVENLABS_CONCURRENCY=3.
+"""
+
+import concurrent.futures
+import os
+import random
+import threading
+import time
+import weakref
+
+import tracing
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Defaults per provider: (requests per second, concurrent requests)
+DEFAULT_LIMITS = {
+    "elevenlabs": (5.0, 3),
+    "openrouter": (1.0, 4),
+}
+
+
+class TTSError(Exception):
+    """Raised when one or more requests still fail after all retries."""
+
+    def __init__(self, message, failures=None):
+        super().__init__(message)
+        self.failures = failures or {}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Parameters:
+    - rate (float): Tokens added per second.
+    - capacity (float): Maximum burst size.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def delay(self):
+        """Takes a token if one is available, otherwise returns seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stops handing out tokens for the given time (e.g. after a 429)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+def _is_network_error(exc):
+    if isinstance(exc, (OSError, TimeoutError)):
+        return True
+    # httpx transport errors do not derive from OSError
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(exc, httpx.TransportError)
+
+
+def retry_delay(exc, attempt, base=1.0, maximum=30.0):
+    """
+    Decides whether a failed request should be retried.
+
+    Returns:
+    - tuple: (retryable, delay_seconds, retry_after_seconds or None)
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+
+    if status is not None:
+        if status not in RETRYABLE_STATUS:
+            return False, 0.0, None
+        retry_after = None
+        headers = getattr(response, "headers", None) or {}
+        value = headers.get("Retry-After")
+        if value:
+            try:
+                retry_after = float(value)
+            except ValueError:
+                retry_after = None
+        if retry_after is not None:
+            return True, retry_after, retry_after
+    elif not _is_network_error(exc):
+        # No HTTP response and not a network error: a bug, not a transient failure
+        return False, 0.0, None
+
+    # Exponential backoff with full jitter
+    return True, random.uniform(0, min(maximum, base * 2**attempt)), None
+
+
+class ProviderScheduler:
+    """
+    Rate limiter, concurrency limiter and retry loop for one provider.
+
+    Parameters:
+    - name (str): Provider name, used in log messages.
+    - requests_per_second (float): Sustained request budget.
+    - max_concurrent (int): Maximum number of requests in flight.
+    - max_retries (int): Retries per request for transient failures.
+    - backoff_base (float): First backoff delay in seconds.
+    - backoff_max (float): Upper bound on a single backoff delay.
+    """
+
+    def __init__(
+        self,
+        name,
+        requests_per_second=2.0,
+        max_concurrent=3,
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_max=30.0,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(requests_per_second)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        # Keyed weakly, so finished event loops are not kept alive
+        self._async_slots = weakref.WeakKeyDictionary()
+        self._async_slots_lock = threading.Lock()
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Runs fn within the provider budget, retrying transient failures.
+
+        Raises:
+        - The last exception if the request is not retryable or retries run out.
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            with self._slots:
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                    retryable, delay, retry_after = retry_delay(
+                        e, attempt, self.backoff_base, self.backoff_max
+                    )
+                    if not retryable or attempt >= self.max_retries:
+                        raise
+            if retry_after is not None:
+                # The quota is shared, so every caller of this provider backs off
+                self.bucket.pause(retry_after)
+            tracing.add("retries")
+            print(
+                f"{self.name}: retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{self.max_retries}): {error}"
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    def _loop_slots(self):
+        # asyncio semaphores are bound to the loop they are used on
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with self._async_slots_lock:
+            slots = self._async_slots.get(loop)
+            if slots is None:
+                slots = self._async_slots[loop] = asyncio.Semaphore(self.max_concurrent)
+            return slots
+
+    async def call_async(self, fn, *args, **kwargs):
+        """
+        Awaits fn(*args, **kwargs) within the provider budget, retrying transient failures.
+
+        The token bucket is shared with synchronous callers; waiting never blocks
+        the event loop.
+        """
+        import asyncio
+
+        slots = self._loop_slots()
+        attempt = 0
+        while True:
+            wait = self.bucket.delay()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self.bucket.delay()
+            async with slots:
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                    retryable, delay, retry_after = retry_delay(
+                        e, attempt, self.backoff_base, self.backoff_max
+                    )
+                    if not retryable or attempt >= self.max_retries:
+                        raise
+            if retry_after is not None:
+                self.bucket.pause(retry_after)
+            tracing.add("retries")
+            print(
+                f"{self.name}: retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{self.max_retries}): {error}"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def map(self, fn, items):
+        """
+        Applies fn to every item concurrently and returns results in input order.
+
+        fn is expected to use call() for the actual provider request; work that
+        needs no request (e.g. cache hits) is not rate limited.
+
+        Returns:
+        - list of tuples: (result, exception) per item; one of them is None.
+        """
+        items = list(items)
+        outcomes = [(None, None)] * len(items)
+        if not items:
+            return outcomes
+        workers = min(self.max_concurrent, len(items))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            # Requests are traced as children of the caller's span
+            run = tracing.bind(fn)
+            futures = {executor.submit(run, item): idx for idx, item in enumerate(items)}
+            for future in concurrent.futures.as_completed(futures):
+                idx = futures[future]
+                try:
+                    outcomes[idx] = (future.result(), None)
+                except Exception as e:
+                    outcomes[idx] = (None, e)
+        return outcomes
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider):
+    """Returns the process-wide scheduler for a provider, creating it on first use."""
+    with _schedulers_lock:
+        if provider not in _schedulers:
+            rps, concurrency = DEFAULT_LIMITS.get(provider, (1.0, 2))
+            prefix = f"CHALKTALK_{provider.upper()}"
+            _schedulers[provider] = ProviderScheduler(
+                provider,
+                requests_per_second=float(os.getenv(f"{prefix}_RPS", rps)),
+                max_concurrent=int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+                max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", 5)),
+            )
+        return _schedulers[provider]
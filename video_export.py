@@ -0,0 +1,431 @@
+"""
+MP4 export of voiced presentations.
+
+The finished deck is replayed in a headless browser (playwright, optional) to
+capture one screenshot per slide/fragment state, together with the clip that
+plays in that state and how long the state lasts (the same data-autoslide
+durations the HTML player uses). Each state is captured exactly once.
+
+Slides are then encoded independently: every slide becomes one MP4 segment
+(still frames plus its clips, padded with silence to the state durations),
+encoded by ffmpeg in a process pool. Segments share codec parameters, so the
+final video is a lossless concat (-c copy) that costs about as much as a file
+copy. ffmpeg is used directly rather than moviepy, whose per-frame Python
+loop is far slower than encoding still images natively.
+
+Segments are kept in the deck's media/video/segments folder, named after a
+hash of the slide's HTML, the bytes of its clips, the deck's <head> and the
+encoding settings (see slide_segment_keys). Re-exporting after an edit only
+captures and encodes the slides whose content or narration changed; every
+other slide is reused from its segment file as-is.
+"""
+
+import concurrent.futures
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from urllib.parse import unquote, urlparse
+
+from audio_utils import get_audio_duration, read_clip_metadata, write_clip_metadata
+
+DEFAULT_SIZE = (1280, 720)
+DEFAULT_FPS = int(os.getenv("CHALKTALK_VIDEO_FPS", "24"))
+# Slides without narration are held this long so they can be read
+DEFAULT_STILL_SECONDS = 2.0
+# States shorter than this (the player's 10/100 ms hops) are not shown
+_TRANSITIONAL_SECONDS = 0.2
+# Bump when the encoding pipeline changes so old segments are not reused
+_SEGMENT_FORMAT = 1
+
+# Freeze the deck: no autoplay, transitions or on-screen chrome
+SETUP_JS = """
+() => new Promise(resolve => {
+  const style = document.createElement("style");
+  style.textContent = `
+    .reveal .slides section, .reveal .slides section .fragment { transition: none !important; }
+    #startPresentationButton, .reveal .controls, .reveal .progress { display: none !important; }
+  `;
+  document.head.appendChild(style);
+  const setup = () => {
+    Reveal.configure({
+      autoSlide: 0, transition: "none", backgroundTransition: "none",
+      controls: false, progress: false, slideNumber: false,
+    });
+    document.querySelectorAll("audio").forEach(audio => audio.muted = true);
+    Reveal.slide(0, 0, -1);
+    resolve();
+  };
+  if (Reveal.isReady()) setup(); else Reveal.on("ready", setup);
+})
+"""
+
+# Describes the state on screen: indices, duration and the clip that plays
+STATE_JS = """
+() => {
+  const slide = Reveal.getCurrentSlide();
+  const shown = slide.querySelectorAll(".fragment.current-fragment");
+  const fragment = shown.length ? shown[shown.length - 1] : null;
+  const timed = fragment && fragment.hasAttribute("data-autoslide") ? fragment : slide;
+  const state = {
+    slide: Reveal.getSlides().indexOf(slide),
+    indices: Reveal.getIndices(),
+    autoslide: parseInt(timed.getAttribute("data-autoslide") || "0", 10),
+    clip: null, start: 0, end: null,
+  };
+  if (!fragment) return state;
+  const source = fragment.querySelector("audio source");
+  const sectionSource = slide.querySelector("audio[data-section-audio] source");
+  if (source) {
+    state.clip = source.src;
+  } else if (sectionSource && fragment.hasAttribute("data-cue-start")) {
+    state.clip = sectionSource.src;
+    state.start = parseFloat(fragment.getAttribute("data-cue-start"));
+    state.end = parseFloat(fragment.getAttribute("data-cue-end"));
+  }
+  return state;
+}
+"""
+
+
+def _file_path(url):
+    return unquote(urlparse(url).path)
+
+
+def slide_segment_keys(html_path, size=DEFAULT_SIZE, fps=DEFAULT_FPS,
+                       still_seconds=DEFAULT_STILL_SECONDS):
+    """
+    Returns the segment cache key of every slide, in Reveal.getSlides() order.
+
+    A key covers the slide's section HTML (data-tts scripts, clip paths and
+    durations), the bytes of the clips it plays, the deck's
+    <head> (theme and styles) and the encoding settings.
+    """
+    from presentation_utils import parse_html
+
+    base_dir = os.path.dirname(os.path.abspath(html_path))
+    with open(html_path, "r", encoding="utf-8") as f:
+        soup = parse_html(f.read())
+
+    deck = hashlib.sha256()
+    deck.update(str(soup.head).encode("utf-8"))
+    deck.update(repr((_SEGMENT_FORMAT, tuple(size), fps, still_seconds)).encode())
+
+    clip_digests = {}
+    keys = []
+    # Slides are the sections that do not contain other sections (not stacks)
+    for section in soup.select(".reveal .slides section"):
+        if section.find("section"):
+            continue
+        # Fragment IDs carry a deck-wide position; inserting a fragment on one
+        # slide must not invalidate the slides after it
+        for fragment in section.find_all(attrs={"data-tts-id": True}):
+            del fragment["data-tts-id"]
+        digest = deck.copy()
+        digest.update(str(section).encode("utf-8"))
+        for source in section.find_all("source", src=True):
+            path = os.path.join(base_dir, source["src"])
+            if path not in clip_digests:
+                try:
+                    with open(path, "rb") as f:
+                        clip_digests[path] = hashlib.sha256(f.read()).hexdigest()
+                except FileNotFoundError:
+                    clip_digests[path] = None
+            digest.update(f"{source['src']}={clip_digests[path]}".encode("utf-8"))
+        keys.append(digest.hexdigest())
+    return keys
+
+
+def capture_states(html_path, frames_dir, size=DEFAULT_SIZE, skip_slides=()):
+    """
+    Steps through every slide and fragment of a deck, screenshotting each state.
+
+    Parameters:
+    - skip_slides (set of int): Slides (Reveal.getSlides() positions) that are
+      stepped over without screenshots, e.g. because their segment is cached.
+
+    Returns:
+    - list of dict: One per captured state with slide position, image path,
+      clip path (or None), clip offset and duration in seconds.
+
+    Raises:
+    - RuntimeError: If playwright is not installed.
+    """
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        raise RuntimeError(
+            "Video export needs playwright: "
+            "pip install playwright && playwright install chromium"
+        )
+
+    states = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        page = browser.new_page(viewport={"width": size[0], "height": size[1]})
+        page.goto("file://" + os.path.abspath(html_path))
+        page.evaluate(SETUP_JS)
+
+        seen = set()
+        while True:
+            state = page.evaluate(STATE_JS)
+            indices = state["indices"]
+            key = (indices["h"], indices.get("v") or 0, indices.get("f"))
+            if key in seen:
+                break  # Reveal.next() did not move: end of the deck
+            seen.add(key)
+            if state["slide"] in skip_slides:
+                page.evaluate("Reveal.next()")
+                continue
+
+            page.wait_for_load_state("networkidle")
+            image = os.path.join(frames_dir, f"state_{len(states):04d}.png")
+            page.screenshot(path=image)
+
+            clip = _file_path(state["clip"]) if state["clip"] else None
+            if clip and state["end"] is not None:
+                duration = state["end"] - state["start"]
+            elif clip:
+                duration = get_audio_duration(clip)
+            else:
+                duration = state["autoslide"] / 1000
+            states.append(
+                {
+                    "slide": state["slide"],
+                    "image": image,
+                    "clip": clip,
+                    "offset": state["start"],
+                    "duration": duration,
+                }
+            )
+            page.evaluate("Reveal.next()")
+        browser.close()
+    return states
+
+
+def plan_segments(states, still_seconds=DEFAULT_STILL_SECONDS):
+    """
+    Groups states into per-slide segments and settles how long each is shown.
+
+    Returns:
+    - list of list of dict: States of each slide, in order.
+    """
+    segments = []
+    for state in states:
+        if segments and segments[-1][0]["slide"] == state["slide"]:
+            segments[-1].append(state)
+        else:
+            segments.append([state])
+
+    planned = []
+    for segment in segments:
+        shown = [
+            state
+            for state in segment
+            if state["clip"] or state["duration"] >= _TRANSITIONAL_SECONDS
+        ]
+        if not any(state["clip"] for state in segment):
+            # No narration: hold the slide's final state instead of skipping it
+            last = segment[-1]
+            shown = [dict(last, duration=max(still_seconds, last["duration"]))]
+        planned.append(shown or segment[-1:])
+    return planned
+
+
+def encode_segment(states, output_path, fps=DEFAULT_FPS):
+    """
+    Encodes one slide's states into an MP4 segment with ffmpeg.
+
+    Runs in a worker process. Every segment uses the same codec parameters so
+    segments can be concatenated without re-encoding.
+
+    Returns:
+    - str: output_path.
+
+    Raises:
+    - subprocess.CalledProcessError: If ffmpeg fails.
+    """
+    inputs, filters, pairs = [], [], []
+    next_input = 0
+    for i, state in enumerate(states):
+        duration = f"{state['duration']:.3f}"
+        video_input = next_input
+        next_input += 2 if state["clip"] else 1
+        inputs += [
+            "-loop", "1", "-framerate", str(fps), "-t", duration,
+            "-i", state["image"],
+        ]
+        filters.append(
+            f"[{video_input}:v]scale=trunc(iw/2)*2:trunc(ih/2)*2,"
+            f"format=yuv420p,setsar=1,fps={fps}[v{i}]"
+        )
+        if state["clip"]:
+            inputs += [
+                "-ss", f"{state['offset']:.3f}", "-t", duration,
+                "-i", state["clip"],
+            ]
+            # Clips shorter than the state are padded with silence
+            filters.append(
+                f"[{video_input + 1}:a]aresample=44100,aformat=channel_layouts=mono,"
+                f"apad,atrim=duration={duration}[a{i}]"
+            )
+        else:
+            filters.append(
+                f"anullsrc=r=44100:cl=mono,atrim=duration={duration}[a{i}]"
+            )
+        pairs.append(f"[v{i}][a{i}]")
+    filters.append(f"{''.join(pairs)}concat=n={len(states)}:v=1:a=1[v][a]")
+
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        *inputs,
+        "-filter_complex", ";".join(filters),
+        "-map", "[v]", "-map", "[a]",
+        "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+        "-r", str(fps), "-g", str(fps * 10),
+        "-c:a", "aac", "-b:a", "128k", "-ar", "44100", "-ac", "1",
+        output_path,
+    ]
+    subprocess.run(command, check=True, capture_output=True)
+    return output_path
+
+
+def concat_segments(segment_paths, output_path):
+    """Joins MP4 segments without re-encoding (ffmpeg concat demuxer)."""
+    list_path = f"{output_path}.segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        subprocess.run(
+            [
+                "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-c", "copy", "-movflags", "+faststart",
+                output_path,
+            ],
+            check=True,
+            capture_output=True,
+        )
+    finally:
+        os.remove(list_path)
+    return output_path
+
+
+def export_video(
+    html_path,
+    output_path=None,
+    size=DEFAULT_SIZE,
+    fps=DEFAULT_FPS,
+    max_workers=None,
+    still_seconds=DEFAULT_STILL_SECONDS,
+    incremental=True,
+):
+    """
+    Exports a voiced presentation as an MP4 video.
+
+    Parameters:
+    - html_path (str): The deck's final HTML (e.g. presentation_final.html).
+    - output_path (str): Defaults to <name>.mp4 next to html_path.
+    - size (tuple): Video width and height in pixels.
+    - fps (int): Output frame rate.
+    - max_workers (int): Parallel segment encoders; defaults to the CPU count.
+    - still_seconds (float): How long slides without narration are shown.
+    - incremental (bool): Reuse the segments of unchanged slides from an
+      earlier export.
+
+    Returns:
+    - dict: output path, video duration, slide and state counts, slides
+      reused and encoded, capture and encode seconds, and the real-time
+      factor (video seconds per second of export).
+
+    Raises:
+    - RuntimeError: If playwright or ffmpeg is missing.
+    - subprocess.CalledProcessError: If ffmpeg fails.
+    """
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("Video export needs ffmpeg on the PATH")
+    if output_path is None:
+        output_path = os.path.splitext(html_path)[0] + ".mp4"
+
+    start = time.perf_counter()
+    segment_dir = os.path.join(
+        os.path.dirname(os.path.abspath(html_path)), "media", "video", "segments"
+    )
+    os.makedirs(segment_dir, exist_ok=True)
+    keys = slide_segment_keys(html_path, size=size, fps=fps, still_seconds=still_seconds)
+    segment_paths = [os.path.join(segment_dir, f"segment_{key[:20]}.mp4") for key in keys]
+    cached = {
+        slide
+        for slide, path in enumerate(segment_paths)
+        if incremental and os.path.isfile(path)
+    }
+
+    with tempfile.TemporaryDirectory(prefix="chalktalk-video-") as work_dir:
+        states = capture_states(html_path, work_dir, size=size, skip_slides=cached)
+        segments = plan_segments(states, still_seconds=still_seconds)
+        captured = time.perf_counter()
+        if any(segment[0]["slide"] >= len(keys) for segment in segments):
+            raise RuntimeError(
+                f"{html_path}: the browser found more slides than the HTML has sections"
+            )
+        print(
+            f"Captured {len(states)} states on {len(segments)} slides, "
+            f"reusing {len(cached)} encoded slides"
+        )
+
+        # Encode to temporary names so an interrupted export never leaves a
+        # truncated segment that would be reused next time
+        tmp_paths = [
+            os.path.join(work_dir, f"segment_{segment[0]['slide']:04d}.mp4")
+            for segment in segments
+        ]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(encode_segment, segments, tmp_paths, [fps] * len(segments)))
+        for segment, tmp_path in zip(segments, tmp_paths):
+            path = segment_paths[segment[0]["slide"]]
+            shutil.move(tmp_path, path)
+            duration = sum(state["duration"] for state in segment)
+            write_clip_metadata(path, {"duration_ms": int(duration * 1000)})
+
+    missing = [path for path in segment_paths if not os.path.isfile(path)]
+    if missing:
+        raise RuntimeError(
+            f"{html_path}: {len(missing)} slides were not reached in the browser"
+        )
+    concat_segments(segment_paths, output_path)
+
+    # Segments of slides that no longer exist in this form are dropped; only
+    # segment files and their sidecars are touched, never other media
+    used = {os.path.splitext(os.path.basename(path))[0] for path in segment_paths}
+    for name in os.listdir(segment_dir):
+        stem, ext = os.path.splitext(name)
+        if stem.startswith("segment_") and ext in (".mp4", ".json") and stem not in used:
+            os.remove(os.path.join(segment_dir, name))
+
+    elapsed = time.perf_counter() - start
+    duration = sum(
+        read_clip_metadata(path).get("duration_ms", 0) / 1000 for path in segment_paths
+    )
+    report = {
+        "output": output_path,
+        "duration": duration,
+        "slides": len(segment_paths),
+        "slides_reused": len(cached),
+        "slides_encoded": len(segments),
+        "states": len(states),
+        "capture_seconds": captured - start,
+        "encode_seconds": elapsed - (captured - start),
+        "elapsed": elapsed,
+        "realtime_factor": duration / elapsed if elapsed else 0.0,
+    }
+    print(
+        f"Exported {output_path}: {duration:.1f} s of video in {elapsed:.1f} s "
+        f"({report['realtime_factor']:.1f}x real time; {len(segments)} slides "
+        f"encoded, {len(cached)} reused; capture {report['capture_seconds']:.1f} s, "
+        f"encode {report['encode_seconds']:.1f} s)"
+    )
+    return report